@@ -87,7 +87,7 @@ if __name__ == "__main__":
         sys.path.insert(0, os.path.join(base_path, 'models'))
 
         # 4. Загружаем шрифты
-        from PyQt6.QtGui import QFontDatabase, QFont
+        from PyQt6.QtGui import QFont
         from PyQt6.QtCore import Qt
 
         # Ищем шрифты в нескольких возможных местах
@@ -104,43 +104,29 @@ if __name__ == "__main__":
                 print(f"Папка со шрифтами: {font_dir}")
                 break
 
-        if font_dir and os.path.exists(font_dir):
-            # Загружаем все .ttf файлы Roboto
-            for font_file in os.listdir(font_dir):
-                if font_file.endswith('.ttf') and 'Roboto' in font_file:
-                    font_path = os.path.join(font_dir, font_file)
-                    font_id = QFontDatabase.addApplicationFont(font_path)
-                    if font_id != -1:
-                        families = QFontDatabase.applicationFontFamilies(font_id)
-                        print(f"Загружен: {font_file} -> {families}")
-
-        # 5. Проверяем, какие шрифты Roboto доступны
-        all_families = QFontDatabase.families()
-        roboto_families = [f for f in all_families if 'roboto' in f.lower()]
-        print(f"\nДоступные шрифты Roboto: {roboto_families}")
-
-        # 6. Устанавливаем шрифт приложения
-        font_names_to_try = ["Roboto", "Roboto Regular", "Roboto-Regular", "Roboto Regular"]
-        selected_font = None
-
-        for font_name in font_names_to_try:
-            test_font = QFont(font_name, 10)
-            if test_font.family() == font_name or font_name in test_font.family():
-                selected_font = test_font
-                print(f"✓ Используется шрифт: {font_name}")
-                break
-
-        if not selected_font and roboto_families:
+        # Загружаем только начертания, нужные стилям; остальные - по требованию
+        # (views.fonts.load_font), например если нужных стилям в папке нет
+        from views.fonts import FAMILY, init_fonts, load_fallback_font
+        roboto_families = init_fonts(font_dir) if font_dir else []
+        if font_dir and not roboto_families:
+            roboto_families = load_fallback_font()
+        print(f"\nЗагруженные шрифты Roboto: {roboto_families}")
+
+        # 5. Устанавливаем шрифт приложения
+        if FAMILY in roboto_families:
+            selected_font = QFont(FAMILY, 10)
+            print(f"✓ Используется шрифт: {FAMILY}")
+        elif roboto_families:
             selected_font = QFont(roboto_families[0], 10)
             print(f"✓ Используется первый доступный Roboto: {roboto_families[0]}")
-        elif not selected_font:
+        else:
             selected_font = QFont("Segoe UI", 10)
             print("✗ Roboto не найден, используется Segoe UI")
 
         app.setFont(selected_font)
         app.setLayoutDirection(Qt.LayoutDirection.LeftToRight)
 
-        # 7. Импортируем и создаем главное окно
+        # 6. Импортируем и создаем главное окно
         from views.main_window import MainWindow
         from controllers.main_controller import MainController
 
@@ -0,0 +1,185 @@
+"""
+Командная строка MedPredict.
+
+    python cli.py score patients.csv -o results.csv --rejects rejects.csv
+    python cli.py reports patients.csv -d reports/ --doctor "Иванова А.А." -j 4
+    python cli.py cohort patients.csv -o screening.pdf --doctor "Иванова А.А."
+"""
+import argparse
+import sys
+
+from services.batch import DEFAULT_MODEL_KEY, run_score
+from services.parallel import BACKENDS, ThroughputStats
+
+
+def positive_int(text: str) -> int:
+    """Тип argparse: целое не меньше 1"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается целое число: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"должно быть не меньше 1: {value}")
+    return value
+
+
+def _open_output(path, default):
+    if path is None or path == "-":
+        return default
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def cmd_score(args) -> int:
+    stats = ThroughputStats()
+    output = _open_output(args.output, sys.stdout)
+    rejects = _open_output(args.rejects, sys.stderr)
+    try:
+        accepted, rejected = run_score(args.input, output, rejects,
+                                       model_key=args.model,
+                                       delimiter=args.delimiter,
+                                       workers=args.workers,
+                                       chunk_size=args.chunk_size,
+                                       backend=args.backend,
+                                       stats=stats)
+    finally:
+        for stream in (output, rejects):
+            if stream not in (sys.stdout, sys.stderr):
+                stream.close()
+    print(f"Обработано: {accepted}, отклонено: {rejected}", file=sys.stderr)
+    if stats.workers:
+        print("Пропускная способность по рабочим:", file=sys.stderr)
+        print(stats.format(), file=sys.stderr)
+    return 0
+
+
+def cmd_reports(args) -> int:
+    from services.reports import run_reports
+
+    def progress(written, failed, filename, error):
+        if error is not None:
+            print(f"✗ {filename}: {error}", file=sys.stderr)
+        elif written % args.progress_every == 0:
+            print(f"Готово: {written}, ошибок: {failed}", file=sys.stderr)
+
+    try:
+        result = run_reports(args.input, args.output_dir, name_template=args.name,
+                             model_key=args.model, doctor_name=args.doctor,
+                             delimiter=args.delimiter, workers=args.workers,
+                             progress=progress, zip_path=args.zip,
+                             overwrite=args.overwrite)
+    except FileExistsError:
+        print(f"✗ Архив уже существует: {args.zip} (перезаписать: --overwrite)",
+              file=sys.stderr)
+        return 1
+    for failure in result.rejected[:20]:
+        print(f"✗ {failure.filename}: {failure.error}", file=sys.stderr)
+    if len(result.rejected) > 20:
+        print(f"... и ещё {len(result.rejected) - 20} строк с ошибками", file=sys.stderr)
+    rate = result.written / result.seconds if result.seconds else 0.0
+    print(f"Отчётов: {result.written}, ошибок построения: {len(result.failed)}, "
+          f"отклонено строк: {len(result.rejected)} "
+          f"({result.seconds:.1f} с, {rate:.1f} отчётов/с)", file=sys.stderr)
+    return 1 if result.failed and not result.written else 0
+
+
+def cmd_cohort(args) -> int:
+    from models.cohort_report import COHORT_TITLE
+    from services.reports import run_cohort_report
+
+    rejects = []
+    summary = run_cohort_report(args.input, args.output, model_key=args.model,
+                                doctor_name=args.doctor, delimiter=args.delimiter,
+                                title=args.title or COHORT_TITLE, rejects=rejects)
+    for failure in rejects[:20]:
+        print(f"✗ {failure.filename}: {failure.error}", file=sys.stderr)
+    if len(rejects) > 20:
+        print(f"... и ещё {len(rejects) - 20} строк с ошибками", file=sys.stderr)
+    print(f"Пациентов в отчёте: {summary.total} (высокий риск: {summary.high_risk}, "
+          f"средний: {summary.medium_risk}, низкий: {summary.low_risk}), "
+          f"отклонено строк: {len(rejects)}", file=sys.stderr)
+    return 0
+
+
+def cmd_serve(args) -> int:
+    import asyncio
+    from services.http_service import ScoringService
+
+    service = ScoringService(model_key=args.model, max_batch=args.max_batch,
+                             max_wait_ms=args.max_wait_ms, queue_size=args.queue_size)
+    print(f"MedPredict слушает http://{args.host}:{args.port} (POST /score, GET /metrics)",
+          file=sys.stderr)
+    try:
+        asyncio.run(service.run(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="medpredict",
+                                     description="MedPredict без графического интерфейса")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="пакетный расчёт CSV/TSV-файла пациентов")
+    score.add_argument("input", help="CSV/TSV-файл пациентов ('-' - stdin)")
+    score.add_argument("-o", "--output", help="файл результатов (по умолчанию stdout)")
+    score.add_argument("--rejects", help="файл отклонённых строк (по умолчанию stderr)")
+    score.add_argument("--model", default=DEFAULT_MODEL_KEY, help="ключ модели")
+    score.add_argument("--delimiter", help="разделитель входного файла (по умолчанию определяется)")
+    score.add_argument("-j", "--workers", type=positive_int, default=1,
+                       help="число рабочих процессов (по умолчанию 1 - без пула)")
+    score.add_argument("--chunk-size", type=positive_int, default=1000,
+                       help="строк в одной порции для рабочего процесса")
+    score.add_argument("--backend", choices=BACKENDS, default="auto",
+                       help="способ выполнения: auto выбирает потоки на сборке без GIL, "
+                            "иначе процессы")
+    score.set_defaults(func=cmd_score)
+
+    reports = commands.add_parser("reports", help="PDF-отчёт на каждого пациента файла")
+    reports.add_argument("input", help="CSV/TSV-файл пациентов ('-' - stdin)")
+    reports.add_argument("-d", "--output-dir", default="reports", help="каталог отчётов")
+    reports.add_argument("--zip", help="сложить отчёты в zip-архив вместо каталога")
+    reports.add_argument("--name", default="{patient_id}.pdf",
+                         help="шаблон имени файла: {patient_id}, {line}, {index}, {risk_level}")
+    reports.add_argument("--overwrite", action="store_true",
+                         help="перезаписывать существующие файлы (по умолчанию к имени "
+                              "добавляется номер)")
+    reports.add_argument("--doctor", default="", help="ФИО врача для отчётов")
+    reports.add_argument("--model", default=DEFAULT_MODEL_KEY, help="ключ модели")
+    reports.add_argument("--delimiter", help="разделитель входного файла (по умолчанию определяется)")
+    reports.add_argument("-j", "--workers", type=positive_int, default=None,
+                         help="число рабочих процессов (по умолчанию - число ядер)")
+    reports.add_argument("--progress-every", type=positive_int, default=100,
+                         help="печатать ход выгрузки каждые N отчётов")
+    reports.set_defaults(func=cmd_reports)
+
+    cohort = commands.add_parser("cohort", help="один сводный PDF-отчёт по всем пациентам файла")
+    cohort.add_argument("input", help="CSV/TSV-файл пациентов ('-' - stdin)")
+    cohort.add_argument("-o", "--output", required=True, help="PDF-файл отчёта")
+    cohort.add_argument("--title", help="заголовок отчёта")
+    cohort.add_argument("--doctor", default="", help="ФИО врача")
+    cohort.add_argument("--model", default=DEFAULT_MODEL_KEY, help="ключ модели")
+    cohort.add_argument("--delimiter", help="разделитель входного файла (по умолчанию определяется)")
+    cohort.set_defaults(func=cmd_cohort)
+
+    serve = commands.add_parser("serve", help="локальный HTTP-сервис расчёта")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--model", default=DEFAULT_MODEL_KEY, help="ключ модели")
+    serve.add_argument("--max-batch", type=int, default=64,
+                       help="максимальный размер микропакета")
+    serve.add_argument("--max-wait-ms", type=float, default=5.0,
+                       help="максимальное ожидание добора пакета, мс")
+    serve.add_argument("--queue-size", type=int, default=1024,
+                       help="длина очереди; при переполнении ответ 503")
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from models.pdf_exporter import ReportData, get_report_template
+from models.report_cache import ReportCache
+
+
+class ExportCancelled(Exception):
+    """Экспорт отменён пользователем"""
+
+
+class ExportSignals(QObject):
+    # Сигналы испускаются из потока пула и доставляются в главный поток очередью
+    progress = pyqtSignal(int)      # проценты
+    finished = pyqtSignal(str)      # имя записанного файла
+    failed = pyqtSignal(str)        # текст ошибки
+    cancelled = pyqtSignal()
+
+
+class ExportJob(QRunnable):
+    """Экспорт одного PDF-отчёта в потоке QThreadPool.
+
+    Отчёт пишется во временный файл рядом с целевым и переименовывается
+    только после успешного построения, поэтому отмена или ошибка не
+    оставляют недописанный PDF. Отмена проверяется между элементами отчёта.
+    Если задан кэш и отчёт с теми же данными и датой уже строился, файл
+    берётся из кэша без построения.
+    """
+
+    def __init__(self, filename: str, report: ReportData, generated_at: datetime,
+                 cache: Optional[ReportCache] = None):
+        super().__init__()
+        # Задание живёт, пока на него ссылается контроллер
+        self.setAutoDelete(False)
+        self.filename = filename
+        self.report = report
+        self.generated_at = generated_at
+        self.cache = cache
+        self.signals = ExportSignals()
+        self._cancel = threading.Event()
+        self._total = 1
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _on_progress(self, kind: str, value: int):
+        if self._cancel.is_set():
+            raise ExportCancelled()
+        if kind == "SIZE_EST":
+            self._total = max(value, 1)
+        elif kind == "PROGRESS":
+            # Последние проценты - запись файла на диск
+            self.signals.progress.emit(min(95, value * 95 // self._total))
+
+    def run(self):
+        tmp_path = self.filename + ".part"
+        try:
+            self.signals.progress.emit(0)
+            key = None if self.cache is None else self.cache.key(self.report, self.generated_at)
+            if key is None or not self.cache.link(key, self.filename):
+                self._build(tmp_path, key)
+        except ExportCancelled:
+            self._discard(tmp_path)
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self._discard(tmp_path)
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.progress.emit(100)
+        self.signals.finished.emit(self.filename)
+
+    def _build(self, tmp_path: str, key: Optional[str]):
+        get_report_template().render(tmp_path, self.report, self.generated_at,
+                                     progress=self._on_progress)
+        if self._cancel.is_set():
+            raise ExportCancelled()
+        if key is not None:
+            self._store(key, tmp_path)
+        os.replace(tmp_path, self.filename)
+
+    def _store(self, key: str, path: str):
+        # Ошибка кэша не мешает экспорту
+        try:
+            with open(path, "rb") as f:
+                self.cache.put(key, f.read())
+        except OSError as e:
+            print(f"Не удалось сохранить отчёт в кэш: {e}")
+
+    @staticmethod
+    def _discard(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
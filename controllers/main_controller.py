@@ -1,8 +1,16 @@
+import os
+from datetime import datetime
 from typing import Dict, Optional
+from PyQt6.QtCore import QStandardPaths, QThreadPool
 from PyQt6.QtWidgets import QApplication, QMessageBox
-from models import (MedicalModel, ModelRepository, ModelConfig,
-                    DiagnosticResult, PDFExporter)
+from models import (MedicalModel, ModelConfig, DiagnosticResult,
+                    PDFExporter, get_model_registry)
+from models.pdf_exporter import ReportData
+from models.report_cache import ReportCache
+from models.html_report import get_html_template
+from models.validation import parse_number, validate_inputs
 from views import MainWindow
+from .export_worker import ExportJob
 
 
 class MainController:
@@ -10,12 +18,20 @@ class MainController:
         self.view = view
         self.app = app
 
-        self.model_repo = ModelRepository.get_all_models()
+        self.model_registry = get_model_registry()
         self.pdf_exporter = PDFExporter()
 
+        # Экспорт идёт в пуле потоков; одновременно - не больше одного задания
+        self.thread_pool = QThreadPool.globalInstance()
+        self._export_job: Optional[ExportJob] = None
+        self._pending_export: Optional[ReportData] = None
+        self.report_cache = self._create_report_cache()
+
         self.current_model: Optional[ModelConfig] = None
         self.medical_model: Optional[MedicalModel] = None  # Новый MedicalModel
         self.last_result: Optional[DiagnosticResult] = None
+        # Время расчёта - дата в отчёте; повторный экспорт того же результата берётся из кэша
+        self.result_time: Optional[datetime] = None
 
         self._setup_connections()  # Изменено на _setup_connections (с подчеркиванием)
         self._initialize_ui()      # Изменено на _initialize_ui (с подчеркиванием)
@@ -26,17 +42,21 @@ class MainController:
         self.view.calculate_requested.connect(self.on_calculate_requested)
         self.view.clear_requested.connect(self.on_clear_requested)
         self.view.export_requested.connect(self.on_export_requested)
+        self.view.cancel_export_requested.connect(self.on_cancel_export_requested)
+        self.view.doctor_name_changed.connect(self.update_preview)
 
     def _initialize_ui(self):  # Добавлен метод
         """Инициализация пользовательского интерфейса"""
-        self.view.set_model_options(self.model_repo)
-        if self.model_repo:
-            first_key = next(iter(self.model_repo))
+        # Конфигурации не собираются: для списка достаточно названий
+        titles = self.model_registry.titles()
+        self.view.set_model_options(titles)
+        if titles:
+            first_key = next(iter(titles))
             self.view.model_combo.setCurrentIndex(0)
             self.on_model_changed(first_key)
 
     def on_model_changed(self, model_key: str):
-        self.current_model = self.model_repo[model_key]
+        self.current_model = self.model_registry.get(model_key)
 
         # Определяем тип модели для MedicalModel
         # Проверяем, есть ли "endometriosis" в ключе модели
@@ -44,6 +64,7 @@ class MainController:
 
         # Создаем MedicalModel с правильным типом
         self.medical_model = MedicalModel(model_type=model_type)
+        self.medical_model.enable_cache(maxsize=256, fields=self.current_model.fields)
 
         self.view.set_model_description(self.current_model.description)
         self.view.create_input_fields(self.current_model.fields)
@@ -72,15 +93,12 @@ class MainController:
 
         try:
             clean_values = {
-                k: float(v.replace(",", ".")) for k, v in raw_values.items()
+                k: parse_number(v) for k, v in raw_values.items()
             }
 
-            # Теперь передаем ВСЕ данные в calculate_probability
-            z = self.medical_model.calculate_z(clean_values)
-            p = self.medical_model.calculate_probability(clean_values)
-
-            diagnosis, risk_level = self.medical_model.get_diagnosis(
-                p, self.current_model.threshold,
+            # Один проход: z, p, диагноз и статус биомаркеров
+            evaluation = self.medical_model.evaluate(
+                clean_values, self.current_model.threshold,
                 self.current_model.high_risk,
                 self.current_model.low_risk
             )
@@ -90,14 +108,16 @@ class MainController:
                 input_values[key] = (label, clean_values[key])
 
             result = DiagnosticResult(
-                z_value=z,
-                p_value=p,
-                conclusion=diagnosis,
-                risk_level=risk_level,
+                z_value=evaluation.z_value,
+                p_value=evaluation.p_value,
+                conclusion=evaluation.conclusion,
+                risk_level=evaluation.risk_level,
                 input_values=input_values
             )
             self.last_result = result
+            self.result_time = datetime.now()
             self.view.display_result(result)
+            self.update_preview()
 
         except Exception as e:
             self.view.show_message(
@@ -111,17 +131,16 @@ class MainController:
                 self.errors = {}
 
         res = ValidationResult()
-        for key, raw in raw_values.items():
-            s = raw.strip().replace(",", ".")
-            if not s:
-                res.errors[key] = "Заполните поле"
-                continue
-            try:
-                float(s)
-            except ValueError:
-                res.errors[key] = "Введите число (напр. 12.34)"
+        res.errors = validate_inputs(raw_values)
         return res
 
+    def update_preview(self, *_):
+        """Перерисовывает HTML-предпросмотр отчёта по последнему результату"""
+        if not self.last_result or not self.current_model:
+            return
+        report = self._current_report(self.view.get_doctor_name())
+        self.view.set_report_preview(get_html_template().render(report, self.result_time))
+
     def on_clear_requested(self):
         self.view.clear_input_fields()
         self.view.clear_results()
@@ -134,6 +153,10 @@ class MainController:
             self.view.show_message("Нет данных", "Сначала выполните расчёт.", "warning")
             return
 
+        if self._export_job is not None:
+            self._coalesce_export()
+            return
+
         doctor_name = self.view.get_doctor_name()
         if not doctor_name:
             msg = QMessageBox(self.view)
@@ -152,17 +175,71 @@ class MainController:
         if not filename:
             return
 
+        self._start_export(filename, self._current_report(doctor_name))
+
+    @staticmethod
+    def _create_report_cache() -> Optional[ReportCache]:
+        location = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+        if not location:
+            return None
         try:
-            self.pdf_exporter.export_results(
-                filename=filename,
-                model_name=self.current_model.name,
-                doctor_name=doctor_name,
-                input_values=self.last_result.input_values,
-                z_value=self.last_result.z_value,
-                p_value=self.last_result.p_value,
-                conclusion=self.last_result.conclusion,
-                formula=self.current_model.z_formula,
-            )
+            return ReportCache(os.path.join(location, "reports"))
+        except OSError as e:
+            print(f"Кэш отчётов недоступен: {e}")
+            return None
+
+    def _current_report(self, doctor_name: str) -> ReportData:
+        return ReportData(
+            model_name=self.current_model.name,
+            doctor_name=doctor_name,
+            input_values=self.last_result.input_values,
+            z_value=self.last_result.z_value,
+            p_value=self.last_result.p_value,
+            conclusion=self.last_result.conclusion,
+            formula=self.current_model.z_formula,
+        )
+
+    def _coalesce_export(self):
+        """Повторное нажатие во время экспорта.
+
+        Новое задание не ставится: если данные не изменились, идущий экспорт
+        уже пишет нужный отчёт; иначе он отменяется и файл перестраивается
+        по последним данным. Несколько нажатий подряд дают одну перестройку.
+        """
+        job = self._export_job
+        report = self._current_report(self.view.get_doctor_name())
+        if report == (self._pending_export or job.report):
+            return
+        self._pending_export = report
+        job.cancel()
+
+    def _start_export(self, filename: str, report: ReportData):
+        job = ExportJob(filename, report, self.result_time, self.report_cache)
+        job.signals.progress.connect(self.view.set_export_progress)
+        job.signals.finished.connect(lambda name: self._on_export_done(job, name, None))
+        job.signals.failed.connect(lambda error: self._on_export_done(job, None, error))
+        job.signals.cancelled.connect(lambda: self._on_export_done(job, None, None))
+        self._export_job = job
+        self.view.set_export_progress(0)
+        self.thread_pool.start(job)
+
+    def on_cancel_export_requested(self):
+        if self._export_job is not None:
+            self._pending_export = None
+            self._export_job.cancel()
+
+    def _on_export_done(self, job: ExportJob, filename: Optional[str], error: Optional[str]):
+        if job is not self._export_job:
+            return
+        self._export_job = None
+        pending, self._pending_export = self._pending_export, None
+        if pending is not None and error is None:
+            # Отчёт по последним данным в тот же файл
+            self._start_export(job.filename, pending)
+            return
+
+        self.view.set_export_progress(-1)
+        if error is not None:
+            self.view.show_message("Ошибка экспорта", error, "error")
+        elif filename:
             self.view.show_message("Успешно", f"Результаты сохранены в: \n{filename}")
-        except Exception as e:
-            self.view.show_message("Ошибка экспорта", f"{e}", "error")
\ No newline at end of file
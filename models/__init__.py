@@ -1,12 +1,16 @@
 from .medical_model import MedicalModel
 from .model_config import ModelConfig, ModelRepository
-from .diagnostic_result import DiagnosticResult
+from .registry import ModelRegistry, get_model_registry
+from .diagnostic_result import DiagnosticResult, ModelEvaluation
 from .pdf_exporter import PDFExporter
 
 __all__ = [
     'MedicalModel',
     'ModelConfig',
     'ModelRepository',
+    'ModelRegistry',
+    'get_model_registry',
     'DiagnosticResult',
+    'ModelEvaluation',
     'PDFExporter'
 ]
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Хранилища архива результатов диагностики.
+
+Хранилище принимает записи (dict из asdict(DiagnosticResult)) методами
+append/extend и отдаёт их лениво при итерации.
+"""
+import os
+
+from .jsonl import JsonlArchive, iter_json_array, migrate_json_archive
+from .sharded import ShardedArchive, ShardInfo, read_shard
+from .sqlite import SqliteArchive
+from .writer import ArchiveWriter
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+def is_sqlite_path(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS
+
+
+def store_kind(path: str) -> str:
+    """Тип хранилища по пути: "sqlite" (*.db), "sharded" (каталог или путь
+    без расширения) или "jsonl"
+    """
+    if is_sqlite_path(path):
+        return "sqlite"
+    if os.path.isdir(path) or not os.path.splitext(path)[1]:
+        return "sharded"
+    return "jsonl"
+
+
+def open_store(path: str, fsync: bool = False):
+    """Открывает хранилище архива по пути (см. store_kind).
+
+    fsync=True - каждый вызов extend() дожидается записи на диск.
+    """
+    kind = store_kind(path)
+    if kind == "sqlite":
+        return SqliteArchive(path, fsync=fsync)
+    if kind == "sharded":
+        return ShardedArchive(path, fsync=fsync)
+    return JsonlArchive(path, fsync=fsync)
+
+
+__all__ = [
+    'ArchiveWriter',
+    'JsonlArchive',
+    'ShardInfo',
+    'ShardedArchive',
+    'SqliteArchive',
+    'is_sqlite_path',
+    'iter_json_array',
+    'migrate_json_archive',
+    'open_store',
+    'read_shard',
+    'store_kind',
+]
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, TextIO
+
+READ_CHUNK = 64 * 1024
+
+
+class JsonlArchive:
+    """Архив в формате JSON Lines: одна запись - одна строка, только дозапись.
+
+    Дозапись стоит O(размер записи), чтение идёт построчно. Строка,
+    оборванная при сбое (без завершающего перевода строки), отрезается
+    при открытии архива.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.recovered_bytes = self._recover()
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+
+    def _recover(self) -> int:
+        """Отрезает недописанную последнюю строку; возвращает число отрезанных байт"""
+        try:
+            f = open(self.path, "r+b")
+        except FileNotFoundError:
+            return 0
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - READ_CHUNK)
+                f.seek(start)
+                block = f.read(end - start)
+                if end == size and block.endswith(b"\n"):
+                    return 0
+                newline = block.rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            f.truncate(end)
+            return size - end
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def append(self, record: Dict[str, Any]):
+        self.extend((record,))
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Дописывает записи одной операцией записи; возвращает их число"""
+        lines = [self._encode(record) for record in records]
+        if not lines:
+            return 0
+        with self._lock:
+            self._file.write(b"".join(lines))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        return len(lines)
+
+    def sync(self):
+        """Сбрасывает буферы и дожидается записи на диск"""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Лениво читает записи; строку, которая ещё дописывается, пропускает"""
+        self.flush()
+        with open(self.path, "rb") as f:
+            yield from read_jsonl(f, self.path)
+
+    def __len__(self) -> int:
+        self.flush()
+        with open(self.path, "rb") as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(READ_CHUNK), b""))
+
+
+def read_jsonl(f: BinaryIO, name: str = "") -> Iterator[Dict[str, Any]]:
+    """Записи из открытого двоичного JSONL-потока; недописанная строка в конце пропускается"""
+    for number, line in enumerate(f, 1):
+        if not line.endswith(b"\n"):
+            return
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"{name}:{number}: повреждённая запись ({e})") from None
+
+
+def iter_json_array(stream: TextIO, chunk_size: int = READ_CHUNK) -> Iterator[Any]:
+    """Потоково разбирает JSON-массив, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def read_more() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+        return not eof
+
+    def peek() -> str:
+        """Следующий значимый символ ("" в конце файла)"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not read_more():
+                return ""
+
+    first = peek()
+    if not first:
+        return
+    if first != "[":
+        raise ValueError("Ожидается JSON-массив")
+    pos += 1
+    if peek() == "]":
+        return
+
+    while True:
+        if not peek():
+            raise ValueError("Неожиданный конец JSON-массива")
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if not read_more():
+                raise
+            continue
+        if end == len(buffer) and not eof:
+            # Значение на границе порции (например, число) могло быть неполным
+            read_more()
+            continue
+        yield item
+        pos = end
+
+        separator = peek()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError("Ожидается ',' или ']' в JSON-массиве")
+        pos += 1
+
+
+def migrate_json_archive(json_path: str, jsonl_path: str) -> Optional[int]:
+    """Однократно переносит JSON-архив (save_archive) в JSON Lines.
+
+    Записи переносятся потоково во временный файл, который затем атомарно
+    переименовывается. Возвращает число перенесённых записей или None,
+    если переносить нечего (нет JSON-файла или JSONL-архив уже есть).
+    """
+    if os.path.exists(jsonl_path) or not os.path.exists(json_path):
+        return None
+    tmp_path = jsonl_path + ".tmp"
+    count = 0
+    with open(json_path, "r", encoding="utf-8") as src, open(tmp_path, "wb") as dst:
+        for record in iter_json_array(src):
+            dst.write(JsonlArchive._encode(record))
+            count += 1
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp_path, jsonl_path)
+    return count
@@ -0,0 +1,319 @@
+import gzip
+import json
+import lzma
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .jsonl import JsonlArchive, read_jsonl
+
+MANIFEST = "manifest.json"
+COMPRESSION = {"gzip": (".gz", gzip.open), "xz": (".xz", lzma.open)}
+_MONTH = re.compile(r"\d{4}-\d{2}")
+
+
+@dataclass
+class ShardInfo:
+    """Запись манифеста об одном месячном шарде"""
+    month: str
+    file: str
+    count: int = 0
+    min_date: Optional[str] = None
+    max_date: Optional[str] = None
+    closed: bool = False
+
+    def add(self, date: str):
+        self.count += 1
+        if self.min_date is None or date < self.min_date:
+            self.min_date = date
+        if self.max_date is None or date > self.max_date:
+            self.max_date = date
+
+    def overlaps(self, date_from: Optional[str], date_to: Optional[str]) -> bool:
+        if self.count == 0:
+            return False
+        return ((date_from is None or self.max_date >= date_from) and
+                (date_to is None or self.min_date < date_to))
+
+    def inside(self, date_from: Optional[str], date_to: Optional[str]) -> bool:
+        return ((date_from is None or self.min_date >= date_from) and
+                (date_to is None or self.max_date < date_to))
+
+
+def month_of(record: Dict[str, Any]) -> str:
+    month = str(record.get("date") or "")[:7]
+    if not _MONTH.fullmatch(month):
+        raise ValueError(f"Некорректная дата записи архива: {record.get('date')!r}")
+    return month
+
+
+def _opener(path: str) -> Callable:
+    for suffix, opener in COMPRESSION.values():
+        if path.endswith(suffix):
+            return opener
+    return open
+
+
+def open_shard(path: str) -> BinaryIO:
+    """Открывает шард на чтение с учётом сжатия"""
+    return _opener(path)(path, "rb")
+
+
+def read_shard(path: str, date_from: Optional[str] = None,
+               date_to: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Записи шарда в диапазоне date_from <= date < date_to"""
+    with open_shard(path) as f:
+        for record in read_jsonl(f, path):
+            date = record.get("date") or ""
+            if (date_from is None or date >= date_from) and (date_to is None or date < date_to):
+                yield record
+
+
+def _scan_shard(func: Callable, path: str, date_from: Optional[str], date_to: Optional[str]):
+    return func(read_shard(path, date_from, date_to))
+
+
+class ShardedArchive:
+    """Архив, разбитый по месяцам: каталог с шардами YYYY-MM.jsonl и манифестом.
+
+    Шарды прошедших месяцев закрываются rotate() и сжимаются (gzip или
+    xz). Манифест хранит для каждого шарда число записей и минимальную и
+    максимальную дату, поэтому выборка за период открывает только нужные
+    шарды. Поздние записи в закрытый месяц дописываются в сжатый шард
+    новым сжатым блоком.
+    """
+
+    def __init__(self, directory: str, compression: str = "gzip", fsync: bool = False):
+        if compression not in COMPRESSION:
+            raise ValueError(f"Неизвестный способ сжатия: {compression}")
+        self.path = directory
+        self.compression = compression
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._open: Dict[str, JsonlArchive] = {}
+        os.makedirs(directory, exist_ok=True)
+        self.shards: Dict[str, ShardInfo] = self._load_manifest()
+
+    # === Манифест ===
+
+    def _load_manifest(self) -> Dict[str, ShardInfo]:
+        try:
+            with open(os.path.join(self.path, MANIFEST), "r", encoding="utf-8") as f:
+                shards = {entry["month"]: ShardInfo(**entry) for entry in json.load(f)["shards"]}
+        except FileNotFoundError:
+            shards = {}
+
+        # Открытые шарды пересчитываются по файлам: манифест мог отстать при сбое
+        for name in sorted(os.listdir(self.path)):
+            month, ext = name[:7], name[7:]
+            if ext != ".jsonl" or not _MONTH.fullmatch(month):
+                continue
+            info = shards.get(month)
+            if info is not None and info.closed:
+                # Сбой после сжатия и записи манифеста, но до удаления исходника
+                os.remove(os.path.join(self.path, name))
+                continue
+            for suffix, _ in COMPRESSION.values():
+                leftover = os.path.join(self.path, name + suffix)
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            info = ShardInfo(month, name)
+            with JsonlArchive(os.path.join(self.path, name)) as shard:
+                for record in shard:
+                    info.add(record.get("date") or "")
+            shards[month] = info
+        return dict(sorted(shards.items()))
+
+    def _save_manifest(self):
+        path = os.path.join(self.path, MANIFEST)
+        data = {"shards": [asdict(info) for info in self.shards.values()]}
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    # === Запись ===
+
+    def append(self, record: Dict[str, Any]):
+        self.extend((record,))
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> int:
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_month.setdefault(month_of(record), []).append(record)
+
+        with self._lock:
+            for month, group in by_month.items():
+                info = self.shards.get(month)
+                if info is None:
+                    info = self.shards[month] = ShardInfo(month, f"{month}.jsonl")
+                    self.shards = dict(sorted(self.shards.items()))
+                if info.closed:
+                    self._append_closed(info, group)
+                else:
+                    self._shard(info).extend(group)
+                for record in group:
+                    info.add(record.get("date") or "")
+            if any(self.shards[month].closed for month in by_month):
+                self._save_manifest()
+        return sum(len(group) for group in by_month.values())
+
+    def _shard(self, info: ShardInfo) -> JsonlArchive:
+        shard = self._open.get(info.month)
+        if shard is None:
+            shard = self._open[info.month] = JsonlArchive(
+                os.path.join(self.path, info.file), fsync=self.fsync)
+        return shard
+
+    def _append_closed(self, info: ShardInfo, records: List[Dict[str, Any]]):
+        # gzip и xz допускают склейку потоков: дописывается новый сжатый блок
+        path = os.path.join(self.path, info.file)
+        with _opener(path)(path, "ab") as f:
+            f.write(b"".join(JsonlArchive._encode(record) for record in records))
+        if self.fsync:
+            with open(path, "rb") as f:
+                os.fsync(f.fileno())
+
+    def rotate(self, before: Optional[str] = None) -> List[str]:
+        """Закрывает и сжимает шарды месяцев раньше before ("YYYY-MM", по умолчанию текущий).
+
+        Возвращает список закрытых месяцев.
+        """
+        before = before or datetime.now().strftime("%Y-%m")
+        suffix, opener = COMPRESSION[self.compression]
+        rotated = []
+        with self._lock:
+            for month, info in self.shards.items():
+                if info.closed or month >= before:
+                    continue
+                shard = self._open.pop(month, None)
+                if shard is not None:
+                    shard.close()
+                source = os.path.join(self.path, info.file)
+                target = source + suffix
+                with open(source, "rb") as src, opener(target + ".tmp", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                with open(target + ".tmp", "rb") as f:
+                    os.fsync(f.fileno())
+                os.replace(target + ".tmp", target)
+                info.file = os.path.basename(target)
+                info.closed = True
+                self._save_manifest()
+                os.remove(source)
+                rotated.append(month)
+            self._save_manifest()
+        return rotated
+
+    def flush(self):
+        with self._lock:
+            for shard in self._open.values():
+                shard.flush()
+            self._save_manifest()
+
+    def sync(self):
+        with self._lock:
+            for shard in self._open.values():
+                shard.sync()
+            self._save_manifest()
+
+    def close(self):
+        with self._lock:
+            for shard in self._open.values():
+                shard.close()
+            self._open.clear()
+            self._save_manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # === Чтение ===
+
+    def shard_paths(self, date_from: Optional[str] = None,
+                    date_to: Optional[str] = None) -> List[str]:
+        """Пути шардов, пересекающихся с периодом date_from <= date < date_to"""
+        with self._lock:
+            for shard in self._open.values():
+                shard.flush()
+            return [os.path.join(self.path, info.file) for info in self.shards.values()
+                    if info.overlaps(date_from, date_to)]
+
+    def iter_range(self, date_from: Optional[str] = None,
+                   date_to: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        for path in self.shard_paths(date_from, date_to):
+            yield from read_shard(path, date_from, date_to)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.iter_range()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(info.count for info in self.shards.values())
+
+    def count(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+        """Число записей за период; шарды целиком внутри периода не читаются"""
+        with self._lock:
+            infos = [info for info in self.shards.values() if info.overlaps(date_from, date_to)]
+        total = 0
+        for info in infos:
+            if info.inside(date_from, date_to):
+                total += info.count
+            else:
+                total += sum(1 for _ in read_shard(os.path.join(self.path, info.file),
+                                                   date_from, date_to))
+        return total
+
+    def export(self, output: BinaryIO, date_from: Optional[str] = None,
+               date_to: Optional[str] = None) -> int:
+        """Пишет записи периода в двоичный поток как JSON Lines; возвращает их число.
+
+        Шарды, целиком попадающие в период, копируются без разбора JSON.
+        """
+        with self._lock:
+            for shard in self._open.values():
+                shard.flush()
+            infos = [info for info in self.shards.values() if info.overlaps(date_from, date_to)]
+        total = 0
+        for info in infos:
+            path = os.path.join(self.path, info.file)
+            if info.inside(date_from, date_to):
+                with open_shard(path) as f:
+                    for line in f:
+                        if line.endswith(b"\n"):
+                            output.write(line)
+                            total += 1
+            else:
+                for record in read_shard(path, date_from, date_to):
+                    output.write(JsonlArchive._encode(record))
+                    total += 1
+        return total
+
+    def scan(self, func: Callable[[Iterator[Dict[str, Any]]], Any],
+             date_from: Optional[str] = None, date_to: Optional[str] = None,
+             executor: Optional[Executor] = None, workers: Optional[int] = None) -> List[Any]:
+        """Параллельно применяет func к записям каждого нужного шарда.
+
+        Возвращает результаты в порядке месяцев. По умолчанию пул потоков;
+        для ProcessPoolExecutor func должна быть функцией уровня модуля.
+        """
+        paths = self.shard_paths(date_from, date_to)
+        if not paths:
+            return []
+        own = executor is None
+        if own:
+            executor = ThreadPoolExecutor(max_workers=workers or min(len(paths), os.cpu_count() or 1))
+        try:
+            futures = [executor.submit(_scan_shard, func, path, date_from, date_to)
+                       for path in paths]
+            return [future.result() for future in futures]
+        finally:
+            if own:
+                executor.shutdown()
@@ -0,0 +1,334 @@
+import itertools
+import json
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+COLUMNS = ("patient_id", "z_value", "probability", "risk_level", "interpretation",
+           "recommendations", "date", "parameters", "complaints")
+# Поля DiagnosticResult, которые хранятся как JSON-текст
+JSON_COLUMNS = ("recommendations", "parameters", "complaints")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    z_value REAL,
+    probability REAL,
+    risk_level TEXT,
+    interpretation TEXT,
+    recommendations TEXT,
+    date TEXT,
+    parameters TEXT,
+    complaints TEXT
+);
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS results_patient_date ON results (patient_id, date);
+CREATE INDEX IF NOT EXISTS results_date ON results (date);
+CREATE INDEX IF NOT EXISTS results_risk_date ON results (risk_level, date);
+"""
+INDEX_NAMES = ("results_patient_date", "results_date", "results_risk_date")
+
+# Полнотекстовый индекс по заключениям и рекомендациям (внешнее содержимое -
+# таблица results). unicode61 приводит кириллицу к нижнему регистру,
+# remove_diacritics 2 отождествляет "ё" и "е". Отдельный префиксный индекс
+# не нужен: запрос "слово*" и так занимает около миллисекунды, а вставка
+# с ним заметно дороже.
+FTS_COLUMNS = ("interpretation", "recommendations")
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+    interpretation, recommendations,
+    content='results', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+FTS_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS results_fts_insert AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts (rowid, interpretation, recommendations)
+    VALUES (new.id, new.interpretation, new.recommendations);
+END;
+CREATE TRIGGER IF NOT EXISTS results_fts_delete AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts (results_fts, rowid, interpretation, recommendations)
+    VALUES ('delete', old.id, old.interpretation, old.recommendations);
+END;
+CREATE TRIGGER IF NOT EXISTS results_fts_update AFTER UPDATE ON results BEGIN
+    INSERT INTO results_fts (results_fts, rowid, interpretation, recommendations)
+    VALUES ('delete', old.id, old.interpretation, old.recommendations);
+    INSERT INTO results_fts (rowid, interpretation, recommendations)
+    VALUES (new.id, new.interpretation, new.recommendations);
+END;
+"""
+FTS_TRIGGER_NAMES = ("results_fts_insert", "results_fts_delete", "results_fts_update")
+
+# Окончания, которые отрезаются от слов запроса перед поиском по префиксу
+# ("лапароскопия" -> "лапароскоп*" находит и "Лапароскопическая диагностика")
+_RU_ENDINGS = sorted((
+    "иями", "ями", "ами", "ией", "ого", "его", "ому", "ему", "ыми", "ими", "ая", "яя",
+    "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ых", "их", "ия", "ию", "ии", "ью",
+    "ов", "ев", "ам", "ям", "ах", "ях", "ом", "ем", "а", "я", "о", "е", "ы", "и", "у",
+    "ю", "ь",
+), key=len, reverse=True)
+_CYRILLIC = re.compile(r"[а-яё]+")
+
+
+def _stem(word: str) -> str:
+    if _CYRILLIC.fullmatch(word):
+        for ending in _RU_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 4:
+                return word[:-len(ending)]
+    return word
+
+
+def fts_query(text: str, column: Optional[str] = None) -> str:
+    """Строка запроса FTS5 из обычного текста: все слова, каждое по основе*"""
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        raise ValueError("Пустой поисковый запрос")
+    query = " ".join(f'"{_stem(word)}"*' for word in words)
+    if column is not None:
+        if column not in FTS_COLUMNS:
+            raise ValueError(f"Нет полнотекстового поля {column}")
+        query = f"{{{column}}} : ({query})"
+    return query
+
+
+INSERT_SQL = (f"INSERT INTO results ({', '.join(COLUMNS)}) "
+              f"VALUES ({', '.join('?' * len(COLUMNS))})")
+
+# Один кодировщик на модуль: json.dumps с параметрами создаёт его на каждый вызов
+_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _to_row(record: Dict[str, Any]) -> Tuple:
+    get = record.get
+    return (get("patient_id"), get("z_value"), get("probability"), get("risk_level"),
+            get("interpretation"), _json(get("recommendations")), get("date"),
+            _json(get("parameters")), _json(get("complaints")))
+
+
+def _to_record(row: Tuple) -> Dict[str, Any]:
+    record = dict(zip(COLUMNS, row))
+    for column in JSON_COLUMNS:
+        if record[column] is not None:
+            record[column] = json.loads(record[column])
+    return record
+
+
+class SqliteArchive:
+    """Архив результатов в SQLite (режим WAL) с индексами и выборками.
+
+    Индексы по patient_id, date и risk_level позволяют выбирать
+    результаты пациента или период без полного просмотра архива.
+    Массовая запись идёт через executemany порциями в транзакциях.
+    """
+
+    def __init__(self, path: str, batch_size: int = 10000, fsync: bool = False,
+                 full_text: bool = True):
+        self.path = path
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # В WAL-режиме NORMAL не теряет целостность, только последние транзакции
+        # при сбое питания; FULL - fsync журнала при каждой фиксации
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        self._conn.executescript(SCHEMA + INDEXES)
+        self.full_text = full_text and self._setup_full_text()
+
+    def _setup_full_text(self) -> bool:
+        """Создаёт индекс FTS5; False, если SQLite собран без FTS5"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'results_fts'").fetchone()
+        try:
+            with self._conn:
+                self._conn.executescript(FTS_SCHEMA + FTS_TRIGGERS)
+                if not exists:
+                    # Реже сливать сегменты при частых небольших вставках
+                    self._conn.execute(
+                        "INSERT INTO results_fts (results_fts, rank) VALUES ('automerge', 8)")
+                    # Архив, созданный до появления индекса
+                    self._conn.execute("INSERT INTO results_fts (results_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def append(self, record: Dict[str, Any]):
+        self.extend((record,))
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Добавляет записи порциями по batch_size, каждая в своей транзакции"""
+        iterator = iter(records)
+        count = 0
+        while True:
+            rows = [_to_row(record) for record in itertools.islice(iterator, self.batch_size)]
+            if not rows:
+                return count
+            with self._lock, self._conn:
+                self._conn.executemany(INSERT_SQL, rows)
+            count += len(rows)
+
+    def bulk_import(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Импорт большой истории: индексы строятся один раз после вставки.
+
+        Пока идёт импорт, выборки по индексам медленные, а полнотекстовый
+        индекс перестраивается целиком по окончании.
+        """
+        with self._lock, self._conn:
+            for name in INDEX_NAMES:
+                self._conn.execute(f"DROP INDEX IF EXISTS {name}")
+            if self.full_text:
+                for name in FTS_TRIGGER_NAMES:
+                    self._conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        try:
+            return self.extend(records)
+        finally:
+            with self._lock:
+                self._conn.executescript(INDEXES)
+                if self.full_text:
+                    with self._conn:
+                        self._conn.executescript(FTS_TRIGGERS)
+                        self._conn.execute(
+                            "INSERT INTO results_fts (results_fts) VALUES ('rebuild')")
+                # Статистика для планировщика (sqlite_stat1)
+                self._conn.execute("ANALYZE")
+
+    def query(self, patient_id: Optional[str] = None, risk_level: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              limit: Optional[int] = 100, offset: int = 0,
+              newest_first: bool = True) -> List[Dict[str, Any]]:
+        """Выборка с фильтрами и постраничным выводом.
+
+        Период задаётся строками дат в формате архива ("2024-05-01" или
+        "2024-05-01 12:00:00"): date_from <= date < date_to.
+        """
+        where, params = self._where(patient_id, risk_level, date_from, date_to)
+        order = "DESC" if newest_first else "ASC"
+        sql = (f"SELECT {', '.join(COLUMNS)} FROM results{where} "
+               f"ORDER BY date {order}, id {order} LIMIT ? OFFSET ?")
+        params.extend((-1 if limit is None else limit, offset))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_to_record(row) for row in rows]
+
+    def count(self, patient_id: Optional[str] = None, risk_level: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None) -> int:
+        where, params = self._where(patient_id, risk_level, date_from, date_to)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+
+    def search(self, text: str, field: Optional[str] = None,
+               patient_id: Optional[str] = None, risk_level: Optional[str] = None,
+               date_from: Optional[str] = None, date_to: Optional[str] = None,
+               limit: Optional[int] = 100, offset: int = 0,
+               order: str = "newest", raw: bool = False) -> List[Dict[str, Any]]:
+        """Полнотекстовый поиск по заключению и рекомендациям.
+
+        text - обычный текст ("лапароскопия", "МРТ малого таза"), все слова
+        ищутся по основе; raw=True - text уже в синтаксисе FTS5. field -
+        "interpretation" или "recommendations". order - "newest" (в обратном
+        порядке архивации; самый быстрый - без сортировки всех совпадений),
+        "date" (по дате, сначала новые) или "rank" (по релевантности bm25).
+        """
+        if order not in ("newest", "date", "rank"):
+            raise ValueError(f"Неизвестный порядок: {order}")
+        columns = ", ".join("r." + column for column in COLUMNS)
+        query = self._fts_query(text, field, raw)
+        where, params = self._where(patient_id, risk_level, date_from, date_to,
+                                    prefix="r.", keyword=" AND ")
+        if patient_id is not None and order != "rank":
+            # Записей пациента немного: их отбирает индекс, а совпадения
+            # FTS проверяются по множеству rowid
+            sql = (f"SELECT {columns} FROM results AS r "
+                   f"WHERE r.id IN (SELECT rowid FROM results_fts WHERE results_fts MATCH ?)"
+                   f"{where} ORDER BY "
+                   + ("r.id DESC" if order == "newest" else "r.date DESC, r.id DESC"))
+        else:
+            sql = (f"SELECT {columns} FROM results_fts JOIN results AS r "
+                   f"ON r.id = results_fts.rowid WHERE results_fts MATCH ?{where} ORDER BY "
+                   + {"newest": "results_fts.rowid DESC", "rank": "results_fts.rank",
+                      "date": "r.date DESC, r.id DESC"}[order])
+        sql += " LIMIT ? OFFSET ?"
+        params = [query] + params + [-1 if limit is None else limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_to_record(row) for row in rows]
+
+    def search_count(self, text: str, field: Optional[str] = None,
+                     patient_id: Optional[str] = None, risk_level: Optional[str] = None,
+                     date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     raw: bool = False) -> int:
+        query = self._fts_query(text, field, raw)
+        where, params = self._where(patient_id, risk_level, date_from, date_to,
+                                    prefix="r.", keyword=" AND ")
+        if not where:
+            # Без фильтров подсчёт не обращается к таблице results
+            sql = "SELECT COUNT(*) FROM results_fts WHERE results_fts MATCH ?"
+        elif patient_id is not None:
+            sql = (f"SELECT COUNT(*) FROM results AS r WHERE r.id IN "
+                   f"(SELECT rowid FROM results_fts WHERE results_fts MATCH ?){where}")
+        else:
+            sql = (f"SELECT COUNT(*) FROM results_fts JOIN results AS r "
+                   f"ON r.id = results_fts.rowid WHERE results_fts MATCH ?{where}")
+        with self._lock:
+            return self._conn.execute(sql, [query] + params).fetchone()[0]
+
+    def _fts_query(self, text: str, field: Optional[str], raw: bool) -> str:
+        if not self.full_text:
+            raise RuntimeError("Полнотекстовый поиск недоступен: SQLite без FTS5")
+        if raw:
+            return f"{{{field}}} : ({text})" if field else text
+        return fts_query(text, field)
+
+    @staticmethod
+    def _where(patient_id, risk_level, date_from, date_to,
+               prefix: str = "", keyword: str = " WHERE ") -> Tuple[str, list]:
+        conditions = []
+        params = []
+        # Отбор по пациенту избирательнее всего: унарный "+" не даёт
+        # планировщику предпочесть индекс по risk_level
+        risk_condition = "+{}risk_level = ?" if patient_id is not None else "{}risk_level = ?"
+        for condition, value in (("{}patient_id = ?", patient_id),
+                                 (risk_condition, risk_level),
+                                 ("{}date >= ?", date_from),
+                                 ("{}date < ?", date_to)):
+            if value is not None:
+                conditions.append(condition.format(prefix))
+                params.append(value)
+        return (keyword + " AND ".join(conditions) if conditions else ""), params
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Лениво перебирает все записи в порядке добавления"""
+        last_id = 0
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM results WHERE id > ? ORDER BY id LIMIT ?"
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, (last_id, self.batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _to_record(row[1:])
+            last_id = rows[-1][0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def flush(self):
+        """Записи фиксируются сразу в extend(); метод для совместимости с JsonlArchive"""
+
+    def sync(self):
+        """Переносит WAL в основной файл базы"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# Служебные элементы очереди
+_FLUSH = object()
+_CLOSE = object()
+
+
+class ArchiveWriter:
+    """Фоновая запись в хранилище архива с групповой фиксацией.
+
+    append() только ставит запись в ограниченную очередь. Поток записи
+    собирает из очереди группу (до max_batch записей или max_delay секунд
+    с первой записи группы) и фиксирует её одним вызовом store.extend()
+    с одним fsync. При полной очереди append() ждёт (не дольше timeout),
+    после чего выбрасывает queue.Full.
+    """
+
+    def __init__(self, store, max_batch: int = 512, max_delay: float = 0.05,
+                 queue_size: int = 10000, timeout: Optional[float] = None,
+                 close_store: bool = True):
+        self.store = store
+        self.path = getattr(store, "path", None)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.close_store = close_store
+        self.error: Optional[BaseException] = None
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._cond = threading.Condition()
+        # Отдельно от _cond: append() может ждать места в очереди, а поток
+        # записи берёт _cond при фиксации группы
+        self._append_lock = threading.Lock()
+        self._submitted = 0
+        self._done = 0
+        self._closed = False
+        self.groups = 0
+        self.written = 0
+        self.failed = 0
+        self.largest_group = 0
+
+        self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, record: Dict[str, Any]):
+        # Под _append_lock: close() не может поставить _CLOSE между проверкой
+        # и постановкой записи в очередь (запись после _CLOSE потерялась бы)
+        with self._append_lock:
+            if self._closed:
+                raise RuntimeError("Архив закрыт")
+            self._queue.put(record, timeout=self.timeout)
+            with self._cond:
+                self._submitted += 1
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for record in records:
+            self.append(record)
+            count += 1
+        return count
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт фиксации всех записей, поставленных до вызова.
+
+        Возвращает False, если не дождались за timeout секунд; ошибку
+        записи выбрасывает как RuntimeError.
+        """
+        if not self._thread.is_alive():
+            self._raise_error()
+            return True
+        with self._cond:
+            target = self._submitted
+        # Прерывает ожидание max_delay для текущей группы
+        self._queue.put(_FLUSH)
+        with self._cond:
+            done = self._cond.wait_for(lambda: self._done >= target, timeout)
+        self._raise_error()
+        return done
+
+    def close(self):
+        """Фиксирует оставшиеся записи и останавливает поток записи"""
+        with self._append_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_CLOSE)
+        self._thread.join()
+        if self.close_store:
+            self.store.close()
+        self._raise_error()
+
+    def sync(self):
+        self.flush()
+
+    def _raise_error(self):
+        error, self.error = self.error, None
+        if error is not None:
+            raise RuntimeError(f"Ошибка записи архива {self.path}: {error}") from error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while True:
+                if item is _CLOSE:
+                    stop = True
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = (self._queue.get(timeout=remaining) if remaining > 0
+                            else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: list):
+        try:
+            self.store.extend(batch)
+            if not getattr(self.store, "fsync", False):
+                self.store.sync()
+            self.written += len(batch)
+        except Exception as e:
+            self.error = e
+            self.failed += len(batch)
+        with self._cond:
+            self.groups += 1
+            self.largest_group = max(self.largest_group, len(batch))
+            self._done += len(batch)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "groups": self.groups,
+            "largest_group": self.largest_group,
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self.flush()
+        return iter(self.store)
+
+    def __len__(self) -> int:
+        self.flush()
+        return len(self.store)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
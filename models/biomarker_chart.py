@@ -0,0 +1,305 @@
+"""
+Векторная диаграмма биомаркеров для PDF-отчёта.
+
+Каждый маркер (тирозин, аргинин, NO) - шкала с референсными зонами
+EndometriosisModel и порогом. Неизменная часть (шкалы, зоны, подписи,
+легенда) собирается один раз в группу ReportLab и разделяется всеми
+отчётами; для пациента в Drawing добавляются только отметки значений.
+
+Для PDF статичная группа к тому же один раз на процесс переводится в
+готовые операторы PDF (зоны, оси, деления) и список подписей с уже
+рассчитанным выравниванием; в отчёт операторы вставляются через
+canvas.addLiteral, подписи выводятся одним текстовым объектом холста
+документа (имена шрифтов в потоке у каждого документа свои). Отметки
+пациента переводятся так же, без renderPDF. Время построения отчёта
+поэтому почти не зависит от числа элементов шкал.
+"""
+import math
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+from reportlab.graphics.shapes import Drawing, Group, Line, Polygon, Rect, String
+from reportlab.lib import colors
+from reportlab.lib.rl_accel import fp_str
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable
+
+NORMAL_COLOR = colors.HexColor('#d5f5e3')
+DISEASE_COLOR = colors.HexColor('#fadbd8')
+THRESHOLD_COLOR = colors.HexColor('#e67e22')
+AXIS_COLOR = colors.HexColor('#7f8c8d')
+TEXT_COLOR = colors.HexColor('#2c3e50')
+MARKER_COLORS = {False: colors.HexColor('#27ae60'), True: colors.HexColor('#e74c3c')}
+
+WIDTH = 170 * mm
+ROW_HEIGHT = 10 * mm
+TOP_PADDING = 1 * mm
+LEGEND_HEIGHT = 6 * mm
+LABEL_WIDTH = 38 * mm
+SCALE_PADDING = 6 * mm
+# Примерное число делений шкалы
+TICKS = 5
+
+
+@dataclass(frozen=True)
+class MarkerScale:
+    """Шкала одного биомаркера с референсными зонами"""
+    key: str
+    label: str
+    normal: Tuple[float, float]
+    threshold: float
+    disease: Optional[Tuple[float, float]] = None
+
+    @cached_property
+    def domain(self) -> Tuple[float, float]:
+        points = [*self.normal, self.threshold, *(self.disease or ())]
+        low, high = min(points), max(points)
+        padding = (high - low) * 0.25
+        step = self.step
+        return (max(0.0, math.floor((low - padding) / step) * step),
+                math.ceil((high + padding) / step) * step)
+
+    @cached_property
+    def step(self) -> float:
+        """Шаг делений шкалы"""
+        points = [*self.normal, self.threshold, *(self.disease or ())]
+        return _nice_step((max(points) - min(points)) * 1.5 / (TICKS - 1))
+
+    def ticks(self) -> List[float]:
+        low, high = self.domain
+        count = int(round((high - low) / self.step))
+        return [low + self.step * i for i in range(count + 1)]
+
+    def elevated(self, value: float) -> bool:
+        return value > self.normal[1]
+
+
+def _nice_step(raw: float) -> float:
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 2.5, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def scales_from_model(model) -> List[MarkerScale]:
+    """Шкалы по константам EndometriosisModel"""
+    return [
+        MarkerScale("tyrosine", "Тирозин (мкмоль/л)",
+                    (model.TYROSINE_NORMAL_MIN, model.TYROSINE_NORMAL_MAX),
+                    model.TYROSINE_THRESHOLD),
+        MarkerScale("arginine", "Аргинин (мкмоль/л)",
+                    (model.ARGININE_NORMAL_MIN, model.ARGININE_NORMAL_MAX),
+                    model.ARGININE_THRESHOLD),
+        MarkerScale("no_level", "NO (мкмоль/л)",
+                    (model.NO_HEALTHY_MIN, model.NO_HEALTHY_MAX),
+                    model.NO_THRESHOLD,
+                    (model.NO_DISEASE_MIN, model.NO_DISEASE_MAX)),
+    ]
+
+
+def _shape_ops(shape) -> str:
+    """Операторы PDF для прямоугольника, линии или многоугольника"""
+    ops = ["q"]
+    fill = getattr(shape, "fillColor", None)
+    stroke = shape.strokeColor
+    if fill is not None:
+        ops.append(f"{fp_str(*fill.rgb())} rg")
+    if stroke is not None:
+        ops.append(f"{fp_str(*stroke.rgb())} RG {fp_str(shape.strokeWidth)} w")
+        if shape.strokeDashArray:
+            ops.append(f"[{fp_str(*shape.strokeDashArray)}] 0 d")
+    paint = "B" if fill is not None and stroke is not None else "f" if fill is not None else "S"
+    if isinstance(shape, Rect):
+        ops.append(f"{fp_str(shape.x, shape.y, shape.width, shape.height)} re {paint}")
+    elif isinstance(shape, Line):
+        ops.append(f"{fp_str(shape.x1, shape.y1)} m {fp_str(shape.x2, shape.y2)} l S")
+    elif isinstance(shape, Polygon):
+        points = shape.points
+        ops.append(f"{fp_str(*points[:2])} m")
+        ops.extend(f"{fp_str(*points[i:i + 2])} l" for i in range(2, len(points), 2))
+        ops.append(f"h {paint}")
+    else:
+        raise TypeError(f"Неподдерживаемая фигура диаграммы: {type(shape).__name__}")
+    ops.append("Q")
+    return " ".join(ops)
+
+
+def _label(string: String) -> Tuple[float, float, str, str, float, colors.Color]:
+    """Подпись как (x, y, текст, шрифт, кегль, цвет); x уже с учётом выравнивания"""
+    x = string.x
+    if string.textAnchor != "start":
+        width = stringWidth(string.text, string.fontName, string.fontSize)
+        x -= width / 2 if string.textAnchor == "middle" else width
+    return x, string.y, string.text, string.fontName, string.fontSize, string.fillColor
+
+
+def _compile(group: Group) -> List[Tuple[str, object]]:
+    """Группа как шаги рисования в исходном порядке: ("ops", операторы PDF)
+    для фигур и ("text", [подписи]) для подряд идущих подписей"""
+    steps: List[Tuple[str, object]] = []
+    for shape in group.contents:
+        if isinstance(shape, String):
+            kind, item = "text", _label(shape)
+        else:
+            kind, item = "ops", _shape_ops(shape)
+        if steps and steps[-1][0] == kind:
+            if kind == "text":
+                steps[-1][1].append(item)
+            else:
+                steps[-1] = (kind, steps[-1][1] + " " + item)
+        else:
+            steps.append((kind, [item] if kind == "text" else item))
+    return steps
+
+
+def _draw_steps(canvas, steps: List[Tuple[str, object]]):
+    """Рисует шаги _compile: операторы - как есть, подписи - одним текстовым
+    объектом на серию (шрифт подставляет документ)"""
+    canvas.saveState()
+    for kind, item in steps:
+        if kind == "ops":
+            canvas.addLiteral(item)
+            continue
+        text = canvas.beginText()
+        font = color = None
+        for x, y, line, font_name, font_size, fill in item:
+            if (font_name, font_size) != font:
+                font = (font_name, font_size)
+                text.setFont(font_name, font_size)
+            if fill != color:
+                color = fill
+                text.setFillColor(fill)
+            text.setTextOrigin(x, y)
+            text.textOut(line)
+        canvas.drawText(text)
+    canvas.restoreState()
+
+
+class _ChartFlowable(Flowable):
+    """Диаграмма в отчёте: готовая статичная часть и отметки пациента"""
+
+    def __init__(self, chart: "BiomarkerChart", marker_steps: List[Tuple[str, object]]):
+        super().__init__()
+        self.chart = chart
+        self.marker_steps = marker_steps
+        self.width = chart.width
+        self.height = chart.height
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        _draw_steps(self.canv, self.chart.static_steps)
+        _draw_steps(self.canv, self.marker_steps)
+
+
+class BiomarkerChart:
+    """Диаграмма биомаркеров: общая статичная часть и отметки пациента"""
+
+    def __init__(self, scales: List[MarkerScale], font_name: str, font_bold: str):
+        self.scales = scales
+        self.font_name = font_name
+        self.font_bold = font_bold
+        self.width = WIDTH
+        self.height = TOP_PADDING + ROW_HEIGHT * len(scales) + LEGEND_HEIGHT
+        self._x0 = LABEL_WIDTH + SCALE_PADDING
+        self._x1 = WIDTH - SCALE_PADDING
+        self.static = self._build_static()
+        self.static_steps = _compile(self.static)
+
+    def _x(self, scale: MarkerScale, value: float) -> float:
+        low, high = scale.domain
+        value = min(max(value, low), high)
+        return self._x0 + (value - low) / (high - low) * (self._x1 - self._x0)
+
+    def _axis_y(self, row: int) -> float:
+        # Строки сверху вниз, под ними легенда
+        return self.height - TOP_PADDING - (row + 1) * ROW_HEIGHT + 4 * mm
+
+    def _build_static(self) -> Group:
+        group = Group()
+        band_height = 3 * mm
+        for row, scale in enumerate(self.scales):
+            y = self._axis_y(row)
+            group.add(String(0, y - 1 * mm, scale.label, fontName=self.font_name,
+                             fontSize=9, fillColor=TEXT_COLOR))
+            zones = [(scale.normal, NORMAL_COLOR)]
+            if scale.disease is not None:
+                zones.append((scale.disease, DISEASE_COLOR))
+            for (low, high), color in zones:
+                x = self._x(scale, low)
+                group.add(Rect(x, y, self._x(scale, high) - x, band_height,
+                               fillColor=color, strokeColor=None))
+            group.add(Line(self._x0, y, self._x1, y, strokeColor=AXIS_COLOR, strokeWidth=0.8))
+
+            for value in scale.ticks():
+                x = self._x(scale, value)
+                group.add(Line(x, y, x, y - 1.2 * mm, strokeColor=AXIS_COLOR, strokeWidth=0.6))
+                group.add(String(x, y - 4 * mm, f"{value:g}", fontName=self.font_name,
+                                 fontSize=7, fillColor=AXIS_COLOR, textAnchor="middle"))
+
+            x = self._x(scale, scale.threshold)
+            group.add(Line(x, y - 0.5 * mm, x, y + band_height + 1.5 * mm,
+                           strokeColor=THRESHOLD_COLOR, strokeWidth=1.2,
+                           strokeDashArray=[2, 1.5]))
+
+        legend = [(NORMAL_COLOR, "Норма"), (DISEASE_COLOR, "Эндометриоз (NO)"),
+                  (THRESHOLD_COLOR, "Порог")]
+        x = self._x0
+        for color, text in legend:
+            group.add(Rect(x, 0.5 * mm, 4 * mm, 3 * mm, fillColor=color, strokeColor=None))
+            group.add(String(x + 5.5 * mm, 1 * mm, text, fontName=self.font_name,
+                             fontSize=8, fillColor=TEXT_COLOR))
+            x += 38 * mm
+        return group
+
+    def covers(self, values: Dict[str, float]) -> bool:
+        return all(scale.key in values for scale in self.scales)
+
+    def _markers(self, values: Dict[str, float]) -> Drawing:
+        drawing = Drawing(self.width, self.height)
+        for row, scale in enumerate(self.scales):
+            value = values[scale.key]
+            y = self._axis_y(row) + 3 * mm
+            x = self._x(scale, value)
+            color = MARKER_COLORS[scale.elevated(value)]
+            drawing.add(Polygon([x, y, x - 1.6 * mm, y + 2.6 * mm, x + 1.6 * mm, y + 2.6 * mm],
+                                fillColor=color, strokeColor=None))
+            # Подпись сбоку от отметки; у правого края шкалы - слева от неё
+            right = x < self._x1 - 15 * mm
+            drawing.add(String(x + (2.2 * mm if right else -2.2 * mm), y + 0.4 * mm,
+                               f"{value:g}", fontName=self.font_bold, fontSize=8,
+                               fillColor=color, textAnchor="start" if right else "end"))
+        return drawing
+
+    def drawing(self, values: Dict[str, float]) -> Drawing:
+        """Диаграмма пациента целиком (общая статичная группа и отметки) - для SVG и т.п."""
+        drawing = self._markers(values)
+        drawing.contents.insert(0, self.static)
+        return drawing
+
+    def flowable(self, values: Dict[str, float]) -> Flowable:
+        """Диаграмма пациента для PDF-отчёта"""
+        return _ChartFlowable(self, _compile(self._markers(values)))
+
+
+_charts: Dict[Tuple[str, str], BiomarkerChart] = {}
+_charts_lock = threading.Lock()
+
+
+def get_biomarker_chart(font_name: str, font_bold: str) -> BiomarkerChart:
+    """Диаграмма по константам EndometriosisModel по умолчанию (одна на процесс)"""
+    key = (font_name, font_bold)
+    chart = _charts.get(key)
+    if chart is None:
+        with _charts_lock:
+            chart = _charts.get(key)
+            if chart is None:
+                from .medical_model import EndometriosisModel
+                chart = _charts[key] = BiomarkerChart(scales_from_model(EndometriosisModel()),
+                                                     font_name, font_bold)
+    return chart
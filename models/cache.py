@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ResultCache:
+    """Ограниченный LRU-кэш результатов расчёта, безопасный для потоков.
+
+    Каждая запись привязана к версии констант модели: при смене версии
+    кэш очищается целиком, чтобы не вернуть результат старых порогов.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        if maxsize <= 0:
+            raise ValueError("Размер кэша должен быть положительным")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Any = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: Any):
+        if version != self._version:
+            if self._data:
+                self._data.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def get(self, key: Hashable, version: Any = None) -> Optional[Any]:
+        """Возвращает результат или None при промахе"""
+        with self._lock:
+            self._check_version(version)
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: Any = None):
+        """Сохраняет результат, вытесняя самые давние записи"""
+        with self._lock:
+            self._check_version(version)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий, промахов и вытеснений"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,226 @@
+"""
+Сводный PDF-отчёт по группе пациентов (например, за день скрининга).
+
+Пациенты поступают итератором и сразу выкладываются на страницы: документ
+строится потоково через BaseDocTemplate (_startBuild / handle_flowable /
+_endBuild), поэтому элементы отчёта живут, только пока не размещены.
+Готовые страницы ReportLab хранит до сохранения лишь в виде сжатых
+потоков, так что память почти не зависит от размера группы. Итоговые
+таблицы собираются из накопительных агрегатов без второго прохода.
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Union
+
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+from reportlab.platypus import (BaseDocTemplate, Frame, KeepTogether, PageBreak, PageTemplate,
+                                Paragraph, Spacer, Table, TableStyle)
+
+from .pdf_exporter import ReportData, ReportTemplate, get_report_template
+
+COHORT_TITLE = "Сводный отчёт скрининга"
+HEADER_HEIGHT = 12 * mm
+SUMMARY_COL_WIDTHS = [74 * mm, 24 * mm, 24 * mm, 24 * mm, 24 * mm]
+
+
+@dataclass(frozen=True)
+class CohortEntry:
+    """Пациент сводного отчёта"""
+    patient_id: str
+    report: ReportData
+    # 'high' / 'medium' / 'low'; пусто - определяется по заключению
+    risk_level: str = ""
+
+    @property
+    def level(self) -> str:
+        if self.risk_level:
+            return self.risk_level
+        conclusion = self.report.conclusion
+        if ReportTemplate.is_high_risk(conclusion):
+            return "high"
+        return "medium" if "умерен" in conclusion.lower() else "low"
+
+
+class RunningStats:
+    """Накопительные среднее, разброс, минимум и максимум (метод Уэлфорда)"""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+@dataclass
+class CohortSummary:
+    """Итоги по группе, накапливаемые по мере выкладки пациентов"""
+    total: int = 0
+    high_risk: int = 0
+    medium_risk: int = 0
+    low_risk: int = 0
+    z: RunningStats = field(default_factory=RunningStats)
+    p: RunningStats = field(default_factory=RunningStats)
+    # Параметры модели по подписи, в порядке первого появления
+    inputs: Dict[str, RunningStats] = field(default_factory=dict)
+
+    def add(self, entry: CohortEntry):
+        report = entry.report
+        self.total += 1
+        level = entry.level
+        if level == "high":
+            self.high_risk += 1
+        elif level == "medium":
+            self.medium_risk += 1
+        else:
+            self.low_risk += 1
+        self.z.add(report.z_value)
+        self.p.add(report.p_value)
+        for label, value in report.input_values.values():
+            stats = self.inputs.get(label)
+            if stats is None:
+                stats = self.inputs[label] = RunningStats()
+            stats.add(value)
+
+
+class CohortReportTemplate:
+    """Шаблон сводного отчёта поверх стилей ReportTemplate.
+
+    Стили и оформление страницы создаются один раз; для каждого документа
+    заводится одна PageTemplate, которая используется на всех страницах.
+    """
+
+    def __init__(self, template: Optional[ReportTemplate] = None):
+        self.template = template or get_report_template()
+        t = self.template
+        self.font_name, self.font_bold = t.font_name, t.font_bold
+        self.summary_table_style = TableStyle([('ALIGN', (1, 0), (-1, -1), 'RIGHT')],
+                                              parent=t.input_table_style)
+
+    def _document(self, output: Union[str, BinaryIO], title: str,
+                  doctor_name: str, generated_at: datetime) -> BaseDocTemplate:
+        page = ReportTemplate.PAGE
+        doc = BaseDocTemplate(output, title=title, author=doctor_name, **page)
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width,
+                      doc.height - HEADER_HEIGHT, id="body")
+        header = f"{title} · {generated_at:%d.%m.%Y}"
+        if doctor_name:
+            header += f" · Врач: {doctor_name}"
+        doc.addPageTemplates([PageTemplate(id="patients", frames=[frame],
+                                           onPage=self._page_decorator(header))])
+        return doc
+
+    def _page_decorator(self, header: str) -> Callable:
+        font_name, font_bold = self.font_name, self.font_bold
+        line_color = colors.HexColor('#e0e0e0')
+        text_color = colors.HexColor('#2c3e50')
+
+        def decorate(canvas, doc):
+            width, height = doc.pagesize
+            top = height - doc.topMargin
+            canvas.saveState()
+            canvas.setFillColor(text_color)
+            canvas.setFont(font_bold, 10)
+            canvas.drawString(doc.leftMargin, top - 5 * mm, header)
+            canvas.setStrokeColor(line_color)
+            canvas.line(doc.leftMargin, top - 8 * mm, width - doc.rightMargin, top - 8 * mm)
+            canvas.setFont(font_name, 9)
+            canvas.drawRightString(width - doc.rightMargin, doc.bottomMargin - 8 * mm,
+                                   f"Стр. {canvas.getPageNumber()}")
+            canvas.restoreState()
+
+        return decorate
+
+    def patient_flowables(self, index: int, entry: CohortEntry) -> List:
+        """Блок одного пациента; не разрывается между страницами"""
+        t = self.template
+        report = entry.report
+        rows = [["Параметр", "Значение"]]
+        for label, value in report.input_values.values():
+            rows.append([label, f"{value:.4f}"])
+        rows.append(["z-значение", f"{report.z_value:.4f}"])
+        rows.append(["Вероятность (p)", f"{report.p_value:.4f} ({report.p_value*100:.2f}%)"])
+        table = Table(rows, colWidths=t.COL_WIDTHS)
+        table.setStyle(t.input_table_style)
+        conclusion_style = t.conclusion_styles[t.is_high_risk(report.conclusion)]
+        return [KeepTogether([
+            Paragraph(f"{index}. Пациент {entry.patient_id}", t.heading_style),
+            table,
+            Spacer(1, 2 * mm),
+            Paragraph(f"<b>{report.conclusion}</b>", conclusion_style),
+            Spacer(1, 4 * mm),
+        ])]
+
+    def summary_flowables(self, summary: CohortSummary) -> List:
+        t = self.template
+        story = [PageBreak(), Paragraph("Сводка по группе", t.title_style)]
+        if not summary.total:
+            story.append(Paragraph("Нет пациентов.", t.normal_style))
+            return story
+
+        def share(n: int) -> str:
+            return f"{n} ({n * 100 / summary.total:.1f}%)"
+
+        counts = Table([["Показатель", "Пациентов"],
+                        ["Всего", str(summary.total)],
+                        ["Высокий риск", share(summary.high_risk)],
+                        ["Средний риск", share(summary.medium_risk)],
+                        ["Низкий риск", share(summary.low_risk)]],
+                       colWidths=t.COL_WIDTHS)
+        counts.setStyle(t.result_table_style)
+        story += [counts, Spacer(1, 8 * mm),
+                  Paragraph("Распределение показателей:", t.heading_style)]
+
+        rows = [["Показатель", "Среднее", "Ст. откл.", "Мин.", "Макс."]]
+        named = [("z-значение", summary.z), ("Вероятность (p)", summary.p)]
+        for label, stats in list(summary.inputs.items()) + named:
+            rows.append([label, f"{stats.mean:.4f}", f"{stats.std:.4f}",
+                         f"{stats.min:.4f}", f"{stats.max:.4f}"])
+        table = Table(rows, colWidths=SUMMARY_COL_WIDTHS, repeatRows=1)
+        table.setStyle(self.summary_table_style)
+        story.append(table)
+        return story
+
+    def render(self, output: Union[str, BinaryIO], entries: Iterable[CohortEntry],
+               title: str = COHORT_TITLE, doctor_name: str = "",
+               generated_at: Optional[datetime] = None) -> CohortSummary:
+        """Строит сводный отчёт в файл или двоичный поток; возвращает итоги"""
+        generated_at = generated_at or datetime.now()
+        doc = self._document(output, title, doctor_name, generated_at)
+        summary = CohortSummary()
+
+        doc._startBuild(output)
+        canv = doc.canv
+        canv._doctemplate = doc
+        try:
+            for index, entry in enumerate(entries, 1):
+                summary.add(entry)
+                self._place(doc, self.patient_flowables(index, entry))
+            self._place(doc, self.summary_flowables(summary))
+        finally:
+            del canv._doctemplate
+        doc._endBuild()
+        return summary
+
+    @staticmethod
+    def _place(doc: BaseDocTemplate, flowables: List):
+        # Как цикл BaseDocTemplate.build, но порциями по мере поступления
+        while flowables:
+            doc.clean_hanging()
+            doc.handle_flowable(flowables)
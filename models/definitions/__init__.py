@@ -0,0 +1,10 @@
+"""
+Определения моделей, которые находит models.registry.
+
+Каждый модуль этого каталога (и каждый модуль, подключённый через точку
+входа "medpredict.models") задаёт:
+
+    KEY   - ключ модели
+    NAME  - название для списка моделей
+    build() -> ModelConfig - сборка конфигурации (вызывается при первом обращении)
+"""
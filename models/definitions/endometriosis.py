@@ -0,0 +1,52 @@
+from typing import Any, Dict
+
+from ..model_config import EndometriosisDiagnosticSystem, ModelConfig
+
+KEY = "endometriosis_diagnostics"
+NAME = "Диагностика рисков развития эндометриоза яичников"
+
+
+def build() -> ModelConfig:
+    # Одна система на конфигурацию: расчёт Z не меняет её состояние
+    system = EndometriosisDiagnosticSystem()
+
+    def endometriosis_calc(values: Dict[str, Any]) -> float:
+        """Функция расчета Z для эндометриоза"""
+        try:
+            return system.z_value(
+                values.get("age", 30),
+                values.get("tyrosine", 0),
+                values.get("arginine", 0),
+                values.get("no_level", 0),
+                values.get("chronic_pain", 0),
+                values.get("dysmenorrhea", 0),
+                values.get("infertility", 0),
+            )
+        except Exception as e:
+            print(f"Ошибка расчета Z: {e}")
+            return 0.0
+
+    return ModelConfig(
+        name=NAME,
+        description="",
+        z_formula="Z = f(Тирозин, Аргинин, NO, жалобы)",
+        params=[
+            "Тирозин — концентрация тирозина в плазме крови (мкмоль/л)",
+            "Аргинин — концентрация аргинина в плазме крови (мкмоль/л)",
+            "NO — уровень оксида азота в плазме крови (мкмоль/л)",
+            "Жалобы — наличие хронической тазовой боли, дисменореи, бесплодия"
+        ],
+        fields=[
+            ("Возраст (18-45 лет)", "age"),
+            ("Тирозин (мкмоль/л)", "tyrosine"),
+            ("Аргинин (мкмоль/л)", "arginine"),
+            ("NO (мкмоль/л)", "no_level"),
+            ("Хроническая тазовая боль (0-нет, 1-есть)", "chronic_pain"),
+            ("Дисменорея (0-нет, 1-есть)", "dysmenorrhea"),
+            ("Бесплодие (0-нет, 1-есть)", "infertility")
+        ],
+        threshold=0.7,
+        calc_function=endometriosis_calc,
+        high_risk="Высокий риск эндометриоза яичников (вероятность >70%)",
+        low_risk="Низкий риск эндометриоза яичников (вероятность <70%)"
+    )
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
 
 @dataclass(frozen=True)
 class DiagnosticResult:
@@ -8,3 +9,28 @@ class DiagnosticResult:
     conclusion: str
     risk_level: str
     input_values: Dict[str, Tuple[str, float]]
+
+
+@dataclass(frozen=True)
+class ModelEvaluation:
+    """Результат однопроходного расчёта MedicalModel.evaluate.
+
+    Один объект отдаётся всем попаданиям в кэш, поэтому biomarkers
+    копируется в словари только для чтения.
+    """
+    z_value: float
+    p_value: float
+    conclusion: str
+    risk_level: str
+    biomarkers: Mapping[str, Mapping[str, Any]]
+
+    def __post_init__(self):
+        frozen = MappingProxyType({key: MappingProxyType(dict(status))
+                                   for key, status in self.biomarkers.items()})
+        object.__setattr__(self, "biomarkers", frozen)
+
+    def __reduce__(self):
+        # mappingproxy не сериализуется pickle (пул процессов) - передаём копии
+        biomarkers = {key: dict(status) for key, status in self.biomarkers.items()}
+        return (ModelEvaluation, (self.z_value, self.p_value, self.conclusion,
+                                  self.risk_level, biomarkers))
@@ -0,0 +1,98 @@
+"""
+HTML-представление отчёта для предпросмотра в окне программы.
+
+Использует те же данные (ReportData), что и PDF-отчёт, и повторяет его
+структуру. Шаблоны string.Template разбираются один раз при создании
+HtmlReportTemplate; отрисовка - подстановка строк, без ReportLab.
+"""
+import html
+import threading
+from datetime import datetime
+from string import Template
+from typing import Optional
+
+from .pdf_exporter import ReportData, ReportTemplate
+
+PAGE = Template("""\
+<html><body style="font-family: Roboto, sans-serif; color: #2c3e50; font-size: 11pt;">
+<h1 style="font-size: 16pt; text-align: center;">Результаты медицинской диагностики</h1>
+<p><b>Модель диагностики:</b> $model_name</p>
+<p><b>Дата и время:</b> $generated_at</p>
+$doctor
+<h2 style="font-size: 14pt; color: #4a90e2;">Входные параметры:</h2>
+<table width="100%" cellspacing="0" cellpadding="6" border="1" style="border-color: #e0e0e0;">
+$input_header
+$input_rows
+</table>
+<h2 style="font-size: 14pt; color: #4a90e2;">Результаты расчета:</h2>
+<table width="100%" cellspacing="0" cellpadding="6" border="1" style="border-color: #e0e0e0;">
+$result_header
+$result_rows
+</table>
+<h2 style="font-size: 14pt; color: #4a90e2;">Заключение:</h2>
+<p style="font-size: 12pt; color: $conclusion_color;"><b>$conclusion</b></p>
+$signature
+</body></html>
+""")
+
+HEADER_ROW = Template(
+    '<tr style="background-color: #4a90e2; color: #f5f5f5;">'
+    '<th align="left">$label</th><th align="right">$value</th></tr>')
+ROW = Template(
+    '<tr style="background-color: $background;">'
+    '<td>$label</td><td align="right">$value</td></tr>')
+DOCTOR = Template("<p><b>Врач:</b> $doctor_name</p>")
+SIGNATURE = Template("<p><br><br>____________________ $doctor_name</p>")
+
+ROW_BACKGROUNDS = ("#ffffff", "#f8f9fa")
+CONCLUSION_COLORS = {True: "#e74c3c", False: "#27ae60"}
+
+
+class HtmlReportTemplate:
+    """Скомпилированный HTML-шаблон отчёта"""
+
+    def __init__(self):
+        # Неизменные части страницы подставляются один раз
+        self.page = Template(PAGE.safe_substitute(
+            input_header=HEADER_ROW.substitute(label="Параметр", value="Значение"),
+            result_header=HEADER_ROW.substitute(label="Показатель", value="Значение"),
+        ))
+
+    @staticmethod
+    def _rows(rows) -> str:
+        return "\n".join(
+            ROW.substitute(background=ROW_BACKGROUNDS[index % 2],
+                           label=html.escape(label), value=value)
+            for index, (label, value) in enumerate(rows)
+        )
+
+    def render(self, report: ReportData, generated_at: Optional[datetime] = None) -> str:
+        doctor_name = html.escape(report.doctor_name)
+        p_value = report.p_value
+        inputs = ((label, f"{value:.4f}") for label, value in report.input_values.values())
+        results = (("z-значение", f"{report.z_value:.4f}"),
+                   ("Вероятность (p)", f"{p_value:.4f} ({p_value*100:.2f}%)"))
+        return self.page.substitute(
+            model_name=html.escape(report.model_name),
+            generated_at=(generated_at or datetime.now()).strftime("%d.%m.%Y %H:%M"),
+            doctor=DOCTOR.substitute(doctor_name=doctor_name) if doctor_name else "",
+            input_rows=self._rows(inputs),
+            result_rows=self._rows(results),
+            conclusion_color=CONCLUSION_COLORS[ReportTemplate.is_high_risk(report.conclusion)],
+            conclusion=html.escape(report.conclusion),
+            signature=SIGNATURE.substitute(doctor_name=doctor_name) if doctor_name else "",
+        )
+
+
+_template: Optional[HtmlReportTemplate] = None
+_template_lock = threading.Lock()
+
+
+def get_html_template() -> HtmlReportTemplate:
+    """HTML-шаблон процесса (создаётся при первом вызове)"""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = HtmlReportTemplate()
+    return _template
@@ -1,8 +1,21 @@
 import math
+import threading
 from dataclasses import dataclass
-from typing import Tuple, Dict, Optional, Any
+from typing import Tuple, Dict, Optional, Any, List
 from enum import Enum
 
+import numpy as np
+
+from . import tracing
+from .cache import ResultCache
+from .diagnostic_result import ModelEvaluation
+from .scoring import BiomarkerSpec, PiecewiseLinear, StepTable
+from .surface import ProbabilitySurface
+
+# Столбцы пакетного расчёта (в том же порядке, что и поля модели)
+BATCH_COLUMNS = ("age", "tyrosine", "arginine", "no_level",
+                 "chronic_pain", "dysmenorrhea", "infertility")
+
 
 class Complaint(Enum):
     """Перечисление для жалоб"""
@@ -34,6 +47,20 @@ class DiagnosticResult:
     input_values: Dict[str, Tuple[str, float]]
 
 
+def batch_columns(columns: Dict[str, Any]) -> Tuple[np.ndarray, ...]:
+    """Приводит столбцы пакета к массивам numpy одинаковой длины.
+
+    Отсутствующий столбец считается нулевым (как values.get(key, 0) в
+    поштучном расчёте); целочисленные поля усекаются как int().
+    """
+    arrays = [np.asarray(columns.get(key, 0), dtype=np.float64)
+              for key in BATCH_COLUMNS]
+    arrays = np.broadcast_arrays(*[np.atleast_1d(a) for a in arrays])
+    age, tyrosine, arginine, no_level, chronic_pain, dysmenorrhea, infertility = arrays
+    return (np.trunc(age), tyrosine, arginine, no_level,
+            np.trunc(chronic_pain), np.trunc(dysmenorrhea), np.trunc(infertility))
+
+
 class EndometriosisModel:
     """Модель для диагностики эндометриоза яичников"""
 
@@ -65,199 +92,291 @@ class EndometriosisModel:
         self.ARGININE_THRESHOLD = 155.0  # выше нормы
         self.NO_THRESHOLD = 30.0  # граница между здоровыми и больными
 
+        # Увеличивается при каждом изменении констант (сброс кэшей)
+        self.version = 0
+        self._configure_lock = threading.Lock()
+        self._surface: Optional[ProbabilitySurface] = None
+        self._build_biomarker_specs()
+
+    def configure(self, **constants: float):
+        """Изменяет константы модели и перестраивает таблицы оценки.
+
+        Пример: model.configure(TYROSINE_THRESHOLD=105.0)
+
+        Расчёты читают таблицы без блокировок: каждый метод берёт кортеж
+        self.biomarkers один раз, а он заменяется целиком. Блокировка
+        здесь только упорядочивает одновременные вызовы configure.
+        """
+        for name in constants:
+            if not name.isupper() or not hasattr(self, name):
+                raise AttributeError(f"Неизвестная константа модели: {name}")
+        with self._configure_lock:
+            for name, value in constants.items():
+                setattr(self, name, float(value))
+            self._build_biomarker_specs()
+            self.version += 1
+            if self._surface is not None:
+                self.enable_surface(self._surface.step, self._surface.ranges)
+
+    def enable_surface(self, step: float = 0.1,
+                       ranges: Optional[Dict[str, Tuple[float, float]]] = None) -> ProbabilitySurface:
+        """Предрасчитывает таблицы вероятности; дальнейшие расчёты идут по ним.
+
+        Поверхность даёт вероятность с точностью до шага сетки, поэтому
+        смена способа расчёта тоже увеличивает version (сброс кэшей).
+        """
+        self._surface = ProbabilitySurface(self, step, ranges)
+        self.version += 1
+        return self._surface
+
+    def disable_surface(self):
+        """Возвращает прямой расчёт вероятности"""
+        self._surface = None
+        self.version += 1
+
+    def _build_biomarker_specs(self):
+        """Строит таблицы точек излома по текущим константам модели.
+
+        NaN обрабатывается как в исходных цепочках условий: оценка z
+        (if x > порога ... else 0.1) даёт нижнее значение, уровень риска -
+        NaN, статус - последнюю метку.
+        """
+        self.biomarkers: Tuple[BiomarkerSpec, ...] = (
+            BiomarkerSpec(
+                key="tyrosine", alias="tyrosine",
+                # Тирозин: оценка от 0.1 до 3.0 в зависимости от отклонения
+                score=PiecewiseLinear([(self.TYROSINE_NORMAL_MAX, 0.1),
+                                       (self.TYROSINE_THRESHOLD, 3.0)], nan_value=0.1),
+                risk=PiecewiseLinear([(self.TYROSINE_NORMAL_MAX, 0.1),
+                                      (self.TYROSINE_THRESHOLD, 0.9)]),
+                weight=0.4,
+                elevated_above=self.TYROSINE_NORMAL_MAX,
+                status=StepTable([self.TYROSINE_NORMAL_MAX, self.TYROSINE_THRESHOLD],
+                                 ["норма", "повышен", "значительно повышен"]),
+            ),
+            BiomarkerSpec(
+                key="arginine", alias="arginine",
+                # Аргинин: оценка от 0.1 до 2.5
+                score=PiecewiseLinear([(self.ARGININE_NORMAL_MAX, 0.1),
+                                       (self.ARGININE_THRESHOLD, 2.5)], nan_value=0.1),
+                risk=PiecewiseLinear([(self.ARGININE_NORMAL_MAX, 0.1),
+                                      (self.ARGININE_THRESHOLD, 0.9)]),
+                weight=0.35,
+                elevated_above=self.ARGININE_NORMAL_MAX,
+                status=StepTable([self.ARGININE_NORMAL_MAX, self.ARGININE_THRESHOLD],
+                                 ["норма", "повышен", "значительно повышен"]),
+            ),
+            BiomarkerSpec(
+                key="no_level", alias="no",
+                # NO: оценка от 0.1 до 2.0
+                score=PiecewiseLinear([(self.NO_THRESHOLD, 0.1),
+                                       (self.NO_DISEASE, 2.0)], nan_value=0.1),
+                risk=PiecewiseLinear([(self.NO_HEALTHY_MAX, 0.1),
+                                      (self.NO_DISEASE, 0.9)]),
+                weight=0.25,
+                elevated_above=self.NO_HEALTHY_MAX,
+                status=StepTable([self.NO_HEALTHY_MAX, self.NO_THRESHOLD],
+                                 ["норма (здоровые)", "пограничное",
+                                  "характерно для заболевания"]),
+            ),
+        )
+        by_name = {}
+        for spec in self.biomarkers:
+            by_name[spec.key] = spec
+            by_name[spec.alias] = spec
+        self._biomarker_by_name = by_name
+
+    def _parse(self, values: Dict[str, Any]) -> Tuple[int, float, float, float, int, int, int]:
+        """Преобразует входной словарь в (age, tyrosine, arginine, no_level,
+        chronic_pain, dysmenorrhea, infertility)"""
+        return (int(values.get("age", 0)),
+                float(values.get("tyrosine", 0)),
+                float(values.get("arginine", 0)),
+                float(values.get("no_level", 0)),
+                int(values.get("chronic_pain", 0)),
+                int(values.get("dysmenorrhea", 0)),
+                int(values.get("infertility", 0)))
+
     def calculate_z(self, values: Dict[str, Any]) -> float:
         """Вычисляет z-значение на основе входных данных"""
         try:
-            # Преобразуем значения
-            age = int(values.get("age", 0))
-            tyrosine = float(values.get("tyrosine", 0))
-            arginine = float(values.get("arginine", 0))
-            no_level = float(values.get("no_level", 0))
-            chronic_pain = int(values.get("chronic_pain", 0))
-            dysmenorrhea = int(values.get("dysmenorrhea", 0))
-            infertility = int(values.get("infertility", 0))
-
-            # Расчет z-значения с учетом отклонений от нормы
-            # Тирозин: оценка от 0.1 до 3.0 в зависимости от отклонения
-            if tyrosine > self.TYROSINE_THRESHOLD:
-                tyrosine_score = 3.0
-            elif tyrosine > self.TYROSINE_NORMAL_MAX:
-                # Линейная интерполяция между нормой и порогом
-                norm = self.TYROSINE_NORMAL_MAX
-                thr = self.TYROSINE_THRESHOLD
-                tyrosine_score = 0.1 + 2.9 * ((tyrosine - norm) / (thr - norm))
-            else:
-                tyrosine_score = 0.1
-
-            # Аргинин: оценка от 0.1 до 2.5
-            if arginine > self.ARGININE_THRESHOLD:
-                arginine_score = 2.5
-            elif arginine > self.ARGININE_NORMAL_MAX:
-                norm = self.ARGININE_NORMAL_MAX
-                thr = self.ARGININE_THRESHOLD
-                arginine_score = 0.1 + 2.4 * ((arginine - norm) / (thr - norm))
-            else:
-                arginine_score = 0.1
-
-            # NO: оценка от 0.1 до 2.0
-            if no_level > self.NO_DISEASE:
-                no_score = 2.0
-            elif no_level > self.NO_THRESHOLD:
-                thr = self.NO_THRESHOLD
-                disease = self.NO_DISEASE
-                no_score = 0.1 + 1.9 * ((no_level - thr) / (disease - thr))
-            else:
-                no_score = 0.1
-
-            # Оценка жалоб
-            complaint_score = 0
-            if chronic_pain == 1:
-                complaint_score += 1.5
-            if dysmenorrhea == 1:
-                complaint_score += 1.2
-            if infertility == 1:
-                complaint_score += 1.0
-
-            # Возрастной фактор
-            age_factor = 2.0 if (18 <= age <= 45) else -3.0
-
-            z_value = (tyrosine_score + arginine_score + no_score +
-                       complaint_score + age_factor)
-
-            return z_value
-
+            return self._z_value(*self._parse(values))
         except Exception as e:
             print(f"Ошибка расчета z: {e}")
             return 0.0
 
+    def _z_value(self, age: int, tyrosine: float, arginine: float, no_level: float,
+                 chronic_pain: int, dysmenorrhea: int, infertility: int) -> float:
+        """Z-значение по уже разобранным входным данным"""
+        # Расчет z-значения с учетом отклонений от нормы
+        tyrosine_spec, arginine_spec, no_spec = self.biomarkers
+        biomarker_score = (tyrosine_spec.score(tyrosine) +
+                           arginine_spec.score(arginine) +
+                           no_spec.score(no_level))
+
+        # Оценка жалоб
+        complaint_score = 0
+        if chronic_pain == 1:
+            complaint_score += 1.5
+        if dysmenorrhea == 1:
+            complaint_score += 1.2
+        if infertility == 1:
+            complaint_score += 1.0
+
+        # Возрастной фактор
+        age_factor = 2.0 if (18 <= age <= 45) else -3.0
+
+        return biomarker_score + complaint_score + age_factor
+
     def is_biomarker_elevated(self, biomarker: str, value: float) -> bool:
         """Проверяет, повышен ли биомаркер"""
-        if biomarker == "tyrosine":
-            return value > self.TYROSINE_NORMAL_MAX
-        elif biomarker == "arginine":
-            return value > self.ARGININE_NORMAL_MAX
-        elif biomarker == "no":
-            return value > self.NO_HEALTHY_MAX
-        return False
+        spec = self._biomarker_by_name.get(biomarker)
+        return spec is not None and value > spec.elevated_above
 
     def get_biomarker_risk_level(self, biomarker: str, value: float) -> float:
         """Получает уровень риска по биомаркеру (0-1)"""
-        if biomarker == "tyrosine":
-            if value <= self.TYROSINE_NORMAL_MAX:
-                return 0.1
-            elif value >= self.TYROSINE_THRESHOLD:
-                return 0.9
-            else:
-                # Линейная интерполяция
-                norm = self.TYROSINE_NORMAL_MAX
-                thr = self.TYROSINE_THRESHOLD
-                return 0.1 + 0.8 * ((value - norm) / (thr - norm))
-
-        elif biomarker == "arginine":
-            if value <= self.ARGININE_NORMAL_MAX:
-                return 0.1
-            elif value >= self.ARGININE_THRESHOLD:
-                return 0.9
-            else:
-                norm = self.ARGININE_NORMAL_MAX
-                thr = self.ARGININE_THRESHOLD
-                return 0.1 + 0.8 * ((value - norm) / (thr - norm))
-
-        elif biomarker == "no":
-            if value <= self.NO_HEALTHY_MAX:
-                return 0.1
-            elif value >= self.NO_DISEASE:
-                return 0.9
-            else:
-                healthy_max = self.NO_HEALTHY_MAX
-                disease_val = self.NO_DISEASE
-                return 0.1 + 0.8 * ((value - healthy_max) / (disease_val - healthy_max))
-
-        return 0.1
+        spec = self._biomarker_by_name.get(biomarker)
+        if spec is None:
+            return 0.1
+        return spec.risk(value)
 
     def calculate_probability(self, values: Dict[str, Any]) -> float:
         """Вычисляет вероятность эндометриоза на основе всех данных"""
         try:
-            # Преобразуем значения
-            age = int(values.get("age", 0))
-            tyrosine = float(values.get("tyrosine", 0))
-            arginine = float(values.get("arginine", 0))
-            no_level = float(values.get("no_level", 0))
-            chronic_pain = int(values.get("chronic_pain", 0))
-            dysmenorrhea = int(values.get("dysmenorrhea", 0))
-            infertility = int(values.get("infertility", 0))
-
-            # Проверка возраста (18-45 лет - репродуктивный возраст)
-            age_ok = 18 <= age <= 45
-            if not age_ok:
-                # Вне репродуктивного возраста вероятность очень низкая
-                return 0.05
-
-            # Анализ биомаркеров
-            print(f"[DEBUG] Тирозин: {tyrosine} (норма: {self.TYROSINE_NORMAL_MAX})")
-            print(f"[DEBUG] Аргинин: {arginine} (норма: {self.ARGININE_NORMAL_MAX})")
-            print(f"[DEBUG] NO: {no_level} (норма здоровых: {self.NO_HEALTHY_MAX})")
-
-            # Определяем уровни риска для каждого биомаркера
-            tyrosine_risk = self.get_biomarker_risk_level("tyrosine", tyrosine)
-            arginine_risk = self.get_biomarker_risk_level("arginine", arginine)
-            no_risk = self.get_biomarker_risk_level("no", no_level)
-
-            print(f"[DEBUG] Риск по тирозину: {tyrosine_risk:.3f}")
-            print(f"[DEBUG] Риск по аргинину: {arginine_risk:.3f}")
-            print(f"[DEBUG] Риск по NO: {no_risk:.3f}")
-
-            # Подсчет жалоб
-            complaint_count = chronic_pain + dysmenorrhea + infertility
-            print(f"[DEBUG] Количество жалоб: {complaint_count}")
-
-            # Базовый риск на основе биомаркеров (взвешенное среднее)
-            # Веса: тирозин 40%, аргинин 35%, NO 25%
-            base_risk = (
-                    tyrosine_risk * 0.4 +
-                    arginine_risk * 0.35 +
-                    no_risk * 0.25
-            )
-            print(f"[DEBUG] Базовый риск: {base_risk:.3f}")
-
-            # Модификатор жалоб
-            if complaint_count == 0:
-                complaint_modifier = 0.8  # снижаем риск при отсутствии жалоб
-            elif complaint_count == 1:
-                complaint_modifier = 1.1
-            elif complaint_count == 2:
-                complaint_modifier = 1.3
-            else:  # 3 жалобы
-                complaint_modifier = 1.5
-
-            # Рассчитываем итоговую вероятность
-            probability = min(0.95, base_risk * complaint_modifier)
-
-            # Устанавливаем минимальную вероятность если хотя бы один биомаркер повышен
-            elevated_count = 0
-            if self.is_biomarker_elevated("tyrosine", tyrosine):
-                elevated_count += 1
-            if self.is_biomarker_elevated("arginine", arginine):
-                elevated_count += 1
-            if self.is_biomarker_elevated("no", no_level):
-                elevated_count += 1
-
-            if elevated_count >= 2 and probability < 0.3:
-                probability = 0.3
-            elif elevated_count == 1 and probability < 0.15:
-                probability = 0.15
-            elif elevated_count == 0 and probability < 0.05:
-                probability = 0.05
-
-            print(f"[DEBUG] Количество повышенных биомаркеров: {elevated_count}")
-            print(f"[DEBUG] Итоговая вероятность: {probability:.3f}")
-
-            return probability
-
+            return self._probability(*self._parse(values))
         except Exception as e:
             print(f"Ошибка расчета вероятности: {e}")
             return 0.0
 
+    def _probability(self, age: int, tyrosine: float, arginine: float, no_level: float,
+                     chronic_pain: int, dysmenorrhea: int, infertility: int) -> float:
+        """Вероятность по уже разобранным входным данным"""
+        surface = self._surface
+        if surface is not None:
+            return surface.probability(age, tyrosine, arginine, no_level,
+                                       chronic_pain, dysmenorrhea, infertility)
+        return self._probability_exact(age, tyrosine, arginine, no_level,
+                                       chronic_pain, dysmenorrhea, infertility)
+
+    def _probability_exact(self, age: int, tyrosine: float, arginine: float, no_level: float,
+                           chronic_pain: int, dysmenorrhea: int, infertility: int) -> float:
+        """Прямой расчёт вероятности по таблицам точек излома"""
+        # Проверка возраста (18-45 лет - репродуктивный возраст)
+        age_ok = 18 <= age <= 45
+        if not age_ok:
+            # Вне репродуктивного возраста вероятность очень низкая
+            return 0.05
+
+        # Анализ биомаркеров
+        if tracing.ENABLED:
+            tracing.trace("Тирозин: %s (норма: %s)", tyrosine, self.TYROSINE_NORMAL_MAX)
+            tracing.trace("Аргинин: %s (норма: %s)", arginine, self.ARGININE_NORMAL_MAX)
+            tracing.trace("NO: %s (норма здоровых: %s)", no_level, self.NO_HEALTHY_MAX)
+
+        # Определяем уровни риска для каждого биомаркера
+        tyrosine_spec, arginine_spec, no_spec = self.biomarkers
+        tyrosine_risk = tyrosine_spec.risk(tyrosine)
+        arginine_risk = arginine_spec.risk(arginine)
+        no_risk = no_spec.risk(no_level)
+
+        # Подсчет жалоб
+        complaint_count = chronic_pain + dysmenorrhea + infertility
+
+        # Базовый риск на основе биомаркеров (взвешенное среднее)
+        # Веса: тирозин 40%, аргинин 35%, NO 25%
+        base_risk = (
+                tyrosine_risk * tyrosine_spec.weight +
+                arginine_risk * arginine_spec.weight +
+                no_risk * no_spec.weight
+        )
+        if tracing.ENABLED:
+            tracing.trace("Риск по тирозину: %.3f", tyrosine_risk)
+            tracing.trace("Риск по аргинину: %.3f", arginine_risk)
+            tracing.trace("Риск по NO: %.3f", no_risk)
+            tracing.trace("Количество жалоб: %d", complaint_count)
+            tracing.trace("Базовый риск: %.3f", base_risk)
+
+        # Модификатор жалоб
+        if complaint_count == 0:
+            complaint_modifier = 0.8  # снижаем риск при отсутствии жалоб
+        elif complaint_count == 1:
+            complaint_modifier = 1.1
+        elif complaint_count == 2:
+            complaint_modifier = 1.3
+        else:  # 3 жалобы
+            complaint_modifier = 1.5
+
+        # Рассчитываем итоговую вероятность
+        probability = min(0.95, base_risk * complaint_modifier)
+
+        # Устанавливаем минимальную вероятность если хотя бы один биомаркер повышен
+        elevated_count = ((tyrosine > tyrosine_spec.elevated_above) +
+                          (arginine > arginine_spec.elevated_above) +
+                          (no_level > no_spec.elevated_above))
+
+        if elevated_count >= 2 and probability < 0.3:
+            probability = 0.3
+        elif elevated_count == 1 and probability < 0.15:
+            probability = 0.15
+        elif elevated_count == 0 and probability < 0.05:
+            probability = 0.05
+
+        if tracing.ENABLED:
+            tracing.trace("Количество повышенных биомаркеров: %d", elevated_count)
+            tracing.trace("Итоговая вероятность: %.3f", probability)
+
+        return probability
+
+    def calculate_z_batch(self, columns: Dict[str, Any]) -> np.ndarray:
+        """Векторный аналог calculate_z для столбцов пакета пациентов"""
+        (age, tyrosine, arginine, no_level,
+         chronic_pain, dysmenorrhea, infertility) = batch_columns(columns)
+
+        tyrosine_spec, arginine_spec, no_spec = self.biomarkers
+        biomarker_score = (tyrosine_spec.score.evaluate(tyrosine) +
+                           arginine_spec.score.evaluate(arginine) +
+                           no_spec.score.evaluate(no_level))
+
+        complaint_score = (np.where(chronic_pain == 1, 1.5, 0.0) +
+                           np.where(dysmenorrhea == 1, 1.2, 0.0) +
+                           np.where(infertility == 1, 1.0, 0.0))
+
+        age_factor = np.where((18 <= age) & (age <= 45), 2.0, -3.0)
+
+        return biomarker_score + complaint_score + age_factor
+
+    def calculate_probability_batch(self, columns: Dict[str, Any]) -> np.ndarray:
+        """Векторный аналог calculate_probability для столбцов пакета пациентов"""
+        (age, tyrosine, arginine, no_level,
+         chronic_pain, dysmenorrhea, infertility) = batch_columns(columns)
+
+        tyrosine_spec, arginine_spec, no_spec = self.biomarkers
+        base_risk = (
+                tyrosine_spec.risk.evaluate(tyrosine) * tyrosine_spec.weight +
+                arginine_spec.risk.evaluate(arginine) * arginine_spec.weight +
+                no_spec.risk.evaluate(no_level) * no_spec.weight
+        )
+
+        complaint_count = chronic_pain + dysmenorrhea + infertility
+        complaint_modifier = np.select(
+            [complaint_count == 0, complaint_count == 1, complaint_count == 2],
+            [0.8, 1.1, 1.3], 1.5)
+
+        # min(0.95, x) в точности как в поштучном расчёте
+        probability = base_risk * complaint_modifier
+        probability = np.where(probability < 0.95, probability, 0.95)
+
+        elevated_count = ((tyrosine > tyrosine_spec.elevated_above).astype(np.int64) +
+                          (arginine > arginine_spec.elevated_above) +
+                          (no_level > no_spec.elevated_above))
+
+        probability = np.where((elevated_count >= 2) & (probability < 0.3), 0.3, probability)
+        probability = np.where((elevated_count == 1) & (probability < 0.15), 0.15, probability)
+        probability = np.where((elevated_count == 0) & (probability < 0.05), 0.05, probability)
+
+        age_ok = (18 <= age) & (age <= 45)
+        return np.where(age_ok, probability, 0.05)
+
     def get_diagnosis(self, p: float, threshold: float = 0.5,
                       high_risk: str = "Высокая вероятность эндометриоза яичников",
                       low_risk: str = "Низкая вероятность эндометриоза яичников") -> Tuple[str, str]:
@@ -272,40 +391,58 @@ class EndometriosisModel:
     def get_biomarker_status(self, values: Dict[str, Any]) -> Dict[str, Any]:
         """Получает статус биомаркеров"""
         try:
-            tyrosine = float(values.get("tyrosine", 0))
-            arginine = float(values.get("arginine", 0))
-            no_level = float(values.get("no_level", 0))
-
-            return {
-                "tyrosine": {
-                    "value": tyrosine,
-                    "status": "норма" if tyrosine <= self.TYROSINE_NORMAL_MAX
-                    else "повышен" if tyrosine <= self.TYROSINE_THRESHOLD
-                    else "значительно повышен",
-                    "normal_range": f"{self.TYROSINE_NORMAL_MIN}-{self.TYROSINE_NORMAL_MAX}",
-                    "deviation": tyrosine - self.TYROSINE_NORMAL
-                },
-                "arginine": {
-                    "value": arginine,
-                    "status": "норма" if arginine <= self.ARGININE_NORMAL_MAX
-                    else "повышен" if arginine <= self.ARGININE_THRESHOLD
-                    else "значительно повышен",
-                    "normal_range": f"{self.ARGININE_NORMAL_MIN}-{self.ARGININE_NORMAL_MAX}",
-                    "deviation": arginine - self.ARGININE_NORMAL
-                },
-                "no_level": {
-                    "value": no_level,
-                    "status": "норма (здоровые)" if no_level <= self.NO_HEALTHY_MAX
-                    else "пограничное" if no_level <= self.NO_THRESHOLD
-                    else "характерно для заболевания",
-                    "healthy_range": f"{self.NO_HEALTHY_MIN}-{self.NO_HEALTHY_MAX}",
-                    "disease_range": f"{self.NO_DISEASE_MIN}-{self.NO_DISEASE_MAX}"
-                }
-            }
+            return self._biomarker_status(float(values.get("tyrosine", 0)),
+                                          float(values.get("arginine", 0)),
+                                          float(values.get("no_level", 0)))
         except Exception as e:
             print(f"Ошибка анализа биомаркеров: {e}")
             return {}
 
+    def _biomarker_status(self, tyrosine: float, arginine: float,
+                          no_level: float) -> Dict[str, Any]:
+        """Статус биомаркеров по уже разобранным значениям"""
+        tyrosine_spec, arginine_spec, no_spec = self.biomarkers
+        return {
+            "tyrosine": {
+                "value": tyrosine,
+                "status": tyrosine_spec.status(tyrosine),
+                "normal_range": f"{self.TYROSINE_NORMAL_MIN}-{self.TYROSINE_NORMAL_MAX}",
+                "deviation": tyrosine - self.TYROSINE_NORMAL
+            },
+            "arginine": {
+                "value": arginine,
+                "status": arginine_spec.status(arginine),
+                "normal_range": f"{self.ARGININE_NORMAL_MIN}-{self.ARGININE_NORMAL_MAX}",
+                "deviation": arginine - self.ARGININE_NORMAL
+            },
+            "no_level": {
+                "value": no_level,
+                "status": no_spec.status(no_level),
+                "healthy_range": f"{self.NO_HEALTHY_MIN}-{self.NO_HEALTHY_MAX}",
+                "disease_range": f"{self.NO_DISEASE_MIN}-{self.NO_DISEASE_MAX}"
+            }
+        }
+
+    def evaluate(self, values: Dict[str, Any], threshold: float = 0.5,
+                 high_risk: str = "Высокая вероятность эндометриоза яичников",
+                 low_risk: str = "Низкая вероятность эндометриоза яичников") -> ModelEvaluation:
+        """Полный расчёт за один проход: входные данные разбираются один раз.
+
+        В отличие от calculate_z/calculate_probability ошибки входных
+        данных не подавляются, а пробрасываются вызывающему.
+        """
+        parsed = self._parse(values)
+        z_value = self._z_value(*parsed)
+        p_value = self._probability(*parsed)
+        conclusion, risk_level = self.get_diagnosis(p_value, threshold, high_risk, low_risk)
+        return ModelEvaluation(
+            z_value=z_value,
+            p_value=p_value,
+            conclusion=conclusion,
+            risk_level=risk_level,
+            biomarkers=self._biomarker_status(parsed[1], parsed[2], parsed[3])
+        )
+
 
 class MedicalModel:
     """Универсальный класс для математических расчётов медицинских моделей"""
@@ -314,6 +451,54 @@ class MedicalModel:
         self.special_models = {
             "endometriosis": EndometriosisModel()
         }
+        self._cache: Optional[ResultCache] = None
+        self._cache_keys: Tuple[str, ...] = BATCH_COLUMNS
+        self._cache_decimals: Optional[int] = None
+
+    def enable_cache(self, maxsize: int = 4096,
+                     fields: Optional[List[Tuple[str, str]]] = None,
+                     decimals: Optional[int] = None):
+        """Включает LRU-кэш результатов evaluate.
+
+        fields - поля модели из ModelConfig.fields, по ним строится ключ.
+        decimals - разрешение входных данных (1 для 0.1 мкмоль/л): значения
+        округляются до него и в ключе, и при расчёте, поэтому результат
+        из кэша совпадает с прямым расчётом.
+        """
+        if fields is not None:
+            self._cache_keys = tuple(key for _, key in fields)
+        self._cache_decimals = decimals
+        self._cache = ResultCache(maxsize)
+
+    def disable_cache(self):
+        """Выключает кэш и освобождает его память"""
+        self._cache = None
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Счётчики кэша (пустой словарь, если кэш выключен)"""
+        return self._cache.stats() if self._cache is not None else {}
+
+    def enable_surface(self, step: float = 0.1,
+                       ranges: Optional[Dict[str, Tuple[float, float]]] = None) -> Optional[ProbabilitySurface]:
+        """Включает предрасчитанную поверхность вероятности (только для эндометриоза)"""
+        special = self.special_models.get(self.model_type)
+        if special is None:
+            return None
+        return special.enable_surface(step, ranges)
+
+    def _model_version(self) -> int:
+        special = self.special_models.get(self.model_type)
+        return special.version if special is not None else 0
+
+    def _normalize(self, values: Dict[str, Any]) -> Optional[Tuple[float, ...]]:
+        """Нормализованный ключ входных данных или None, если он не строится"""
+        try:
+            normalized = tuple(float(values.get(key, 0)) for key in self._cache_keys)
+        except (TypeError, ValueError):
+            return None
+        if self._cache_decimals is not None:
+            normalized = tuple(round(v, self._cache_decimals) for v in normalized)
+        return normalized
 
     def calculate_z(self, values: Dict[str, Any]) -> float:
         """Вычисляет z-значение"""
@@ -333,6 +518,19 @@ class MedicalModel:
             z = self.calculate_z(values)
             return 1 / (1 + math.exp(-z))
 
+    def calculate_z_batch(self, columns: Dict[str, Any]) -> np.ndarray:
+        """Вычисляет z-значения для столбцов пакета пациентов"""
+        if self.model_type in self.special_models:
+            return self.special_models[self.model_type].calculate_z_batch(columns)
+        return np.zeros_like(batch_columns(columns)[0])
+
+    def calculate_probability_batch(self, columns: Dict[str, Any]) -> np.ndarray:
+        """Вычисляет вероятности для столбцов пакета пациентов"""
+        if self.model_type in self.special_models:
+            return self.special_models[self.model_type].calculate_probability_batch(columns)
+        z = self.calculate_z_batch(columns)
+        return 1 / (1 + np.exp(-z))
+
     def get_diagnosis(self, p: float, threshold: float = 0.5,
                       high_risk: str = "Высокий риск заболевания",
                       low_risk: str = "Низкий риск заболевания") -> Tuple[str, str]:
@@ -345,6 +543,35 @@ class MedicalModel:
                 return high_risk, 'high'
             return low_risk, 'low'
 
+    def evaluate(self, values: Dict[str, Any], threshold: float = 0.5,
+                 high_risk: str = "Высокий риск заболевания",
+                 low_risk: str = "Низкий риск заболевания") -> ModelEvaluation:
+        """Вычисляет z, p, диагноз и статус биомаркеров за один вызов"""
+        cache = self._cache
+        if cache is not None:
+            normalized = self._normalize(values)
+            if normalized is not None:
+                key = (normalized, threshold, high_risk, low_risk)
+                version = self._model_version()
+                result = cache.get(key, version)
+                if result is None:
+                    result = self._evaluate(dict(zip(self._cache_keys, normalized)),
+                                            threshold, high_risk, low_risk)
+                    cache.put(key, result, version)
+                return result
+        return self._evaluate(values, threshold, high_risk, low_risk)
+
+    def _evaluate(self, values: Dict[str, Any], threshold: float,
+                  high_risk: str, low_risk: str) -> ModelEvaluation:
+        if self.model_type in self.special_models:
+            return self.special_models[self.model_type].evaluate(
+                values, threshold, high_risk, low_risk)
+        z = self.calculate_z(values)
+        p = 1 / (1 + math.exp(-z))
+        conclusion, risk_level = self.get_diagnosis(p, threshold, high_risk, low_risk)
+        return ModelEvaluation(z_value=z, p_value=p, conclusion=conclusion,
+                               risk_level=risk_level, biomarkers={})
+
     def get_biomarker_status(self, values: Dict[str, Any]) -> Dict[str, Any]:
         """Получает статус биомаркеров (только для эндометриоза)"""
         if self.model_type in self.special_models and self.model_type == "endometriosis":
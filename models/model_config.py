@@ -1,8 +1,16 @@
-from typing import Dict, Callable, List, Tuple, Any
+import os
+import threading
+from typing import Dict, Callable, List, Tuple, Any, Iterator, Optional
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from enum import Enum
 
+from . import tracing
+from .archive import (ArchiveWriter, iter_json_array, migrate_json_archive,
+                      open_store, store_kind)
+
+DEFAULT_ARCHIVE = "endometriosis_archive.jsonl"
+
 class Complaint(Enum):
     """Перечисление для жалоб"""
     NO = 0
@@ -64,12 +72,21 @@ class EndometriosisDiagnosticSystem:
     NO_THRESHOLD = 36.8  # мкмоль/л
 
     def __init__(self):
+        # Записи в памяти: ещё не переданные в хранилище архива, а после
+        # load_archive() - весь архив (начальные _archive_saved уже в хранилище)
         self.archive = []
+        self._archive_saved = 0
+        self._archive_loaded = False
+        # JsonlArchive, SqliteArchive или ArchiveWriter над ними (models.archive)
+        self.archive_store = None
+        # Один экземпляр может использоваться из нескольких потоков
+        self._archive_lock = threading.Lock()
 
     def _check_age(self, age: int) -> bool:
         """Проверка возраста (18-45 лет)"""
         result = 18 <= age <= 45
-        print(f"[DEBUG] Проверка возраста: {age} в диапазоне 18-45 = {result}")
+        if tracing.ENABLED:
+            tracing.trace("Проверка возраста: %s в диапазоне 18-45 = %s", age, result)
         return result
 
     def _check_complaints(self, patient_data: PatientData) -> bool:
@@ -86,7 +103,9 @@ class EndometriosisDiagnosticSystem:
 
     def _calculate_probability(self, patient_data: PatientData) -> float:
         """Расчет вероятности эндометриоза"""
-        print(f"[DEBUG _calculate_probability] Начало расчета для пациента {patient_data.patient_id}")
+        if tracing.ENABLED:
+            tracing.trace("_calculate_probability: начало расчета для пациента %s",
+                          patient_data.patient_id)
 
         # Базовые условия
         age_ok = 18 <= patient_data.age <= 45
@@ -97,27 +116,29 @@ class EndometriosisDiagnosticSystem:
                           patient_data.dysmenorrhea == 1 or
                           patient_data.infertility == 1)
 
-        print(f"[DEBUG] age_ok: {age_ok}")
-        print(f"[DEBUG] biomarkers_high: {biomarkers_high}")
-        print(f"[DEBUG] has_complaints: {has_complaints}")
-        print(f"[DEBUG] Тирозин: {patient_data.tyrosine} > {self.TYROSINE_THRESHOLD} = {patient_data.tyrosine > self.TYROSINE_THRESHOLD}")
-        print(f"[DEBUG] Аргинин: {patient_data.arginine} > {self.ARGININE_THRESHOLD} = {patient_data.arginine > self.ARGININE_THRESHOLD}")
-        print(f"[DEBUG] NO: {patient_data.no_level} > {self.NO_THRESHOLD} = {patient_data.no_level > self.NO_THRESHOLD}")
-        print(f"[DEBUG] chronic_pain: {patient_data.chronic_pain}")
-        print(f"[DEBUG] dysmenorrhea: {patient_data.dysmenorrhea}")
-        print(f"[DEBUG] infertility: {patient_data.infertility}")
+        if tracing.ENABLED:
+            tracing.trace("age_ok: %s", age_ok)
+            tracing.trace("biomarkers_high: %s", biomarkers_high)
+            tracing.trace("has_complaints: %s", has_complaints)
+            tracing.trace("Тирозин: %s > %s = %s", patient_data.tyrosine, self.TYROSINE_THRESHOLD,
+                          patient_data.tyrosine > self.TYROSINE_THRESHOLD)
+            tracing.trace("Аргинин: %s > %s = %s", patient_data.arginine, self.ARGININE_THRESHOLD,
+                          patient_data.arginine > self.ARGININE_THRESHOLD)
+            tracing.trace("NO: %s > %s = %s", patient_data.no_level, self.NO_THRESHOLD,
+                          patient_data.no_level > self.NO_THRESHOLD)
+            tracing.trace("chronic_pain: %s", patient_data.chronic_pain)
+            tracing.trace("dysmenorrhea: %s", patient_data.dysmenorrhea)
+            tracing.trace("infertility: %s", patient_data.infertility)
 
         if not age_ok:
-            print(f"[DEBUG] Возраст не в диапазоне 18-45")
+            if tracing.ENABLED:
+                tracing.trace("Возраст не в диапазоне 18-45")
             return 0.0
 
         # Если все три показателя выше порога И есть жалобы
         if biomarkers_high and has_complaints:
-            print(f"[DEBUG] Условия выполнены: biomarkers_high={biomarkers_high}, has_complaints={has_complaints}")
-
             # Начинаем с базовой вероятности 85%
             probability = 85.0
-            print(f"[DEBUG] Базовая вероятность: {probability}")
 
             # Подсчитываем количество жалоб
             complaint_count = 0
@@ -128,71 +149,81 @@ class EndometriosisDiagnosticSystem:
             if patient_data.infertility == 1:
                 complaint_count += 1
 
-            print(f"[DEBUG] Количество жалоб: {complaint_count}")
-
             # Добавляем процент за жалобы (до 10% максимум)
             # Каждая жалоба добавляет примерно 3.33% (10% / 3)
             complaint_bonus = complaint_count * (10.0 / 3.0)
-            print(f"[DEBUG] Бонус за жалобы: {complaint_bonus}")
-
             probability += complaint_bonus
-            print(f"[DEBUG] Вероятность после добавления бонуса: {probability}")
+            if tracing.ENABLED:
+                tracing.trace("Условия выполнены, базовая вероятность: 85.0")
+                tracing.trace("Количество жалоб: %d, бонус за жалобы: %s",
+                              complaint_count, complaint_bonus)
+                tracing.trace("Вероятность после добавления бонуса: %s", probability)
 
             # Корректное ограничение - не более 95%
             if probability > 95.0:
-                print(f"[DEBUG] Вероятность {probability} > 95, ограничиваю до 95")
                 probability = 95.0
             elif probability < 70.0:
-                print(f"[DEBUG] Вероятность {probability} < 70, устанавливаю 70")
                 probability = 70.0
 
-            print(f"[DEBUG] Финальная вероятность: {probability}")
+            if tracing.ENABLED:
+                tracing.trace("Финальная вероятность: %s", probability)
             return probability
 
         # Если условия не выполнены - низкая вероятность
-        print(f"[DEBUG] Условия не выполнены. biomarkers_high={biomarkers_high}, has_complaints={has_complaints}")
+        if tracing.ENABLED:
+            tracing.trace("Условия не выполнены. biomarkers_high=%s, has_complaints=%s",
+                          biomarkers_high, has_complaints)
         return 5.0
 
     def _calculate_z_value(self, patient_data: PatientData) -> float:
         """Расчет Z-значения для логистической регрессии"""
-        tyrosine_score = 3.0 if patient_data.tyrosine > self.TYROSINE_THRESHOLD else 0.1
-        arginine_score = 2.5 if patient_data.arginine > self.ARGININE_THRESHOLD else 0.1
-        no_score = 2.0 if patient_data.no_level > self.NO_THRESHOLD else 0.1
+        return self.z_value(patient_data.age, patient_data.tyrosine,
+                            patient_data.arginine, patient_data.no_level,
+                            patient_data.chronic_pain, patient_data.dysmenorrhea,
+                            patient_data.infertility)
+
+    def z_value(self, age: int, tyrosine: float, arginine: float, no_level: float,
+                chronic_pain: int, dysmenorrhea: int, infertility: int) -> float:
+        """Z-значение по отдельным показателям, без создания PatientData"""
+        tyrosine_score = 3.0 if tyrosine > self.TYROSINE_THRESHOLD else 0.1
+        arginine_score = 2.5 if arginine > self.ARGININE_THRESHOLD else 0.1
+        no_score = 2.0 if no_level > self.NO_THRESHOLD else 0.1
 
         complaint_score = 0
-        if patient_data.chronic_pain == 1:
+        if chronic_pain == 1:
             complaint_score += 1.5
-        if patient_data.dysmenorrhea == 1:
+        if dysmenorrhea == 1:
             complaint_score += 1.2
-        if patient_data.infertility == 1:
+        if infertility == 1:
             complaint_score += 1.0
 
-        age_factor = 2.0 if self._check_age(patient_data.age) else -5.0
+        age_factor = 2.0 if self._check_age(age) else -5.0
 
         return (tyrosine_score + arginine_score + no_score +
                 complaint_score + age_factor)
 
     def diagnose(self, patient_data: PatientData) -> DiagnosticResult:
         """Основная функция диагностики"""
-        print(f"\n[DEBUG] ===== НАЧАЛО ДИАГНОСТИКИ =====")
-        print(f"[DEBUG] Вызов diagnose для пациента: {patient_data.patient_id}")
+        if tracing.ENABLED:
+            tracing.trace("===== НАЧАЛО ДИАГНОСТИКИ пациента %s =====", patient_data.patient_id)
 
         # Расчет вероятности
         probability = self._calculate_probability(patient_data)
 
         # ДОПОЛНИТЕЛЬНАЯ ПРОВЕРКА: если вероятность > 95, исправляем
         if probability > 95.0:
-            print(f"[FIX] Вероятность {probability}% > 95%, исправляю на 95%")
+            if tracing.ENABLED:
+                tracing.trace("Вероятность %s%% > 95%%, исправляю на 95%%", probability)
             probability = 95.0
 
-        print(f"[DEBUG] Исправленная вероятность: {probability}%")
-
         # Расчет Z-значения
         z_value = self._calculate_z_value(patient_data)
 
         # Определение уровня риска
         risk_level = "ВЫСОКИЙ" if probability >= 70 else "НИЗКИЙ"
-        print(f"[DEBUG] Финальные значения: probability={probability}%, risk_level={risk_level}, z_value={z_value}")
+        if tracing.ENABLED:
+            tracing.trace("Финальные значения: probability=%s%%, risk_level=%s, z_value=%s",
+                          probability, risk_level, z_value)
 
         # Генерация интерпретации
         interpretation, recommendations = self._generate_interpretation(probability, patient_data)
@@ -220,9 +251,21 @@ class EndometriosisDiagnosticSystem:
         )
 
         # Архивация
-        self.archive.append(asdict(result))
-
-        print(f"[DEBUG] ===== КОНЕЦ ДИАГНОСТИКИ =====")
+        record = asdict(result)
+        # Под блокировкой, чтобы close_archive() не закрыл хранилище между
+        # выбором хранилища и записью. С фоновой записью append() возвращается
+        # сразу; ждёт только при полной очереди
+        with self._archive_lock:
+            if self.archive_store is None:
+                self.archive.append(record)
+            else:
+                self.archive_store.append(record)
+                if self._archive_loaded:
+                    self.archive.append(record)
+                    self._archive_saved = len(self.archive)
+
+        if tracing.ENABLED:
+            tracing.trace("===== КОНЕЦ ДИАГНОСТИКИ =====")
         return result
 
     def _generate_interpretation(self, probability: float, patient_data: PatientData) -> Tuple[str, List[str]]:
@@ -266,73 +309,95 @@ class EndometriosisDiagnosticSystem:
 
         return interpretation, recommendations
 
-    def save_archive(self, filename: str = "endometriosis_archive.json"):
-        """Сохранение архива в файл"""
-        import json
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.archive, f, ensure_ascii=False, indent=2)
-
-    def load_archive(self, filename: str = "endometriosis_archive.json"):
-        """Загрузка архива из файла"""
-        import json
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                self.archive = json.load(f)
-        except FileNotFoundError:
-            self.archive = []
+    def open_archive(self, filename: str = DEFAULT_ARCHIVE,
+                     legacy_filename: Optional[str] = None, background: bool = False):
+        """Подключает архив (*.jsonl, SQLite *.db или каталог месячных шардов):
+        дальше каждая запись сохраняется сразу.
+
+        background=True - запись идёт в фоновом потоке группами с одним
+        fsync на группу (ArchiveWriter); flush_archive() дожидается записи.
+
+        Старый JSON-архив (legacy_filename, для *.jsonl по умолчанию то же
+        имя с расширением .json) однократно переносится в архив, накопленные
+        в памяти записи дописываются в него.
+        """
+        if legacy_filename is None and filename.endswith(".jsonl"):
+            legacy_filename = filename[:-1]
+        with self._archive_lock:
+            if self.archive_store is None or self.archive_store.path != filename:
+                if self.archive_store is not None:
+                    self.archive_store.close()
+                jsonl = store_kind(filename) == "jsonl"
+                if legacy_filename and jsonl:
+                    migrate_json_archive(legacy_filename, filename)
+                store = open_store(filename, fsync=background)
+                if (legacy_filename and not jsonl and os.path.exists(legacy_filename)
+                        and not len(store)):
+                    with open(legacy_filename, "r", encoding="utf-8") as f:
+                        store.extend(iter_json_array(f))
+                self.archive_store = ArchiveWriter(store) if background else store
+            if len(self.archive) > self._archive_saved:
+                self.archive_store.extend(self.archive[self._archive_saved:])
+            if self._archive_loaded:
+                self._archive_saved = len(self.archive)
+            else:
+                self.archive = []
+                self._archive_saved = 0
+            return self.archive_store
+
+    def flush_archive(self):
+        """Дожидается записи всех переданных в архив результатов"""
+        store = self.archive_store
+        if store is not None:
+            store.flush()
+
+    def close_archive(self):
+        with self._archive_lock:
+            if self.archive_store is not None:
+                self.archive_store.close()
+                self.archive_store = None
+
+    def iter_archive(self) -> Iterator[Dict[str, Any]]:
+        """Лениво перебирает записи архива (и ещё не сохранённые записи)"""
+        with self._archive_lock:
+            store = self.archive_store
+            pending = self.archive[self._archive_saved:]
+        if store is not None:
+            yield from store
+        yield from pending
+
+    def save_archive(self, filename: str = DEFAULT_ARCHIVE):
+        """Сохранение архива: дописывает в JSONL-архив только новые записи"""
+        self.open_archive(filename).flush()
+
+    def load_archive(self, filename: str = DEFAULT_ARCHIVE):
+        """Загрузка архива: подключает архив и, как прежде, заполняет self.archive
+        всеми его записями.
+
+        Дальше новые записи идут и в хранилище, и в self.archive. Для больших
+        архивов лучше open_archive() и iter_archive(): они не держат записи
+        в памяти.
+        """
+        self.open_archive(filename)
+        # Под блокировкой: запись, сделанная во время чтения, не потеряется
+        with self._archive_lock:
+            self.archive = list(self.archive_store)
+            self._archive_saved = len(self.archive)
+            self._archive_loaded = True
 
 
 class ModelRepository:
     """Репозиторий всех доступных медицинских моделей"""
     @staticmethod
     def get_all_models() -> Dict[str, ModelConfig]:
-        """Возвращает все доступные модели"""
-        def endometriosis_calc(values: Dict[str, Any]) -> float:
-            """Функция расчета Z для эндометриоза"""
-            system = EndometriosisDiagnosticSystem()
-            try:
-                patient_data = PatientData(
-                    patient_id="temp",
-                    age=values.get("age", 30),
-                    tyrosine=values.get("tyrosine", 0),
-                    arginine=values.get("arginine", 0),
-                    no_level=values.get("no_level", 0),
-                    chronic_pain=values.get("chronic_pain", 0),
-                    dysmenorrhea=values.get("dysmenorrhea", 0),
-                    infertility=values.get("infertility", 0),
-                    date_of_analysis=""
-                )
-                return system._calculate_z_value(patient_data)
-            except Exception as e:
-                print(f"Ошибка расчета Z: {e}")
-                return 0.0
-
-        return {
-            "endometriosis_diagnostics": ModelConfig(
-                name="Диагностика рисков развития эндометриоза яичников",
-                description="",
-                z_formula="Z = f(Тирозин, Аргинин, NO, жалобы)",
-                params=[
-                    "Тирозин — концентрация тирозина в плазме крови (мкмоль/л)",
-                    "Аргинин — концентрация аргинина в плазме крови (мкмоль/л)",
-                    "NO — уровень оксида азота в плазме крови (мкмоль/л)",
-                    "Жалобы — наличие хронической тазовой боли, дисменореи, бесплодия"
-                ],
-                fields=[
-                    ("Возраст (18-45 лет)", "age"),
-                    ("Тирозин (мкмоль/л)", "tyrosine"),
-                    ("Аргинин (мкмоль/л)", "arginine"),
-                    ("NO (мкмоль/л)", "no_level"),
-                    ("Хроническая тазовая боль (0-нет, 1-есть)", "chronic_pain"),
-                    ("Дисменорея (0-нет, 1-есть)", "dysmenorrhea"),
-                    ("Бесплодие (0-нет, 1-есть)", "infertility")
-                ],
-                threshold=0.7,
-                calc_function=endometriosis_calc,
-                high_risk="Высокий риск эндометриоза яичников (вероятность >70%)",
-                low_risk="Низкий риск эндометриоза яичников (вероятность <70%)"
-            )
-        }
+        """Возвращает все доступные модели.
+
+        Модели берутся из общего для процесса реестра (models.registry);
+        чтобы не собирать все модели сразу, используйте
+        get_model_registry().titles() и .get(key).
+        """
+        from .registry import get_model_registry
+        return get_model_registry().get_all_models()
 
 
 # Добавим также MedicalModel если требуется
@@ -1,5 +1,8 @@
+import io
+import threading
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm
@@ -7,6 +10,7 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from .biomarker_chart import get_biomarker_chart
 import os
 import sys
 
@@ -20,177 +24,299 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-class PDFExporter:
-    """Класс для экспорта результатов в PDF"""
+FONT_NAME = 'RobotoRegular'
+FONT_BOLD = 'RobotoBold'
 
-    def __init__(self):
-        self.font_name = 'Helvetica'
-        self.font_bold = 'Helvetica-Bold'
-        self._setup_fonts()
-
-    def _setup_fonts(self):
-        """Настройка шрифтов с правильными путями"""
-        try:
-            # Получаем базовый путь
-            if getattr(sys, 'frozen', False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-            font_dir = os.path.join(base_path, 'assets', 'fonts')
-
-            regular_path = os.path.join(font_dir, 'Roboto-Regular.ttf')
-            bold_path = os.path.join(font_dir, 'Roboto-Bold.ttf')
-
-            print(f"PDF Exporter ищет шрифты в: {font_dir}")
-            print(f"Regular: {regular_path}")
-            print(f"Bold: {bold_path}")
-
-            if os.path.isfile(regular_path) and os.path.isfile(bold_path):
-                pdfmetrics.registerFont(TTFont('RobotoRegular', regular_path))
-                pdfmetrics.registerFont(TTFont('RobotoBold', bold_path))
-                self.font_name = 'RobotoRegular'
-                self.font_bold = 'RobotoBold'
-                print("✓ PDF шрифты загружены")
-            else:
-                print(f"✗ Шрифты для PDF не найдены. Используется Helvetica.")
-                self.font_name = 'Helvetica'
-                self.font_bold = 'Helvetica-Bold'
-
-        except Exception as e:
-            print(f"Ошибка загрузки PDF шрифтов: {e}")
-            self.font_name = 'Helvetica'
-            self.font_bold = 'Helvetica-Bold'
+_fonts: Optional[Tuple[str, str]] = None
+_fonts_lock = threading.Lock()
 
-    def export_results(self, filename: str, model_name: str, doctor_name: str,
-                       input_values: Dict[str, Tuple[str, float]],
-                       z_value: float, p_value: float,
-                       conclusion: str, formula: str):
-        """Экспорт результатов в PDF"""
-        try:
-            doc = SimpleDocTemplate(
-                filename,
-                pagesize=A4,
-                rightMargin=20 * mm,
-                leftMargin=20 * mm,
-                topMargin=20 * mm,
-                bottomMargin=20 * mm
-            )
-            story = []
-            styles = getSampleStyleSheet()
-
-            # === Стили с поддержкой Roboto / fallback на Helvetica ===
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontName=self.font_bold,
-                fontSize=16,
-                textColor=colors.HexColor('#2c3e50'),
-                spaceAfter=12,
-                alignment=1  # центрирование
-            )
 
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontName=self.font_bold,
-                fontSize=14,
-                textColor=colors.HexColor('#4a90e2'),
-                spaceAfter=6,
-                spaceBefore=12
-            )
+def register_fonts() -> Tuple[str, str]:
+    """Регистрирует шрифты Roboto один раз на процесс.
 
-            normal_style = ParagraphStyle(
-                'CustomNormal',
-                parent=styles['Normal'],
-                fontName=self.font_name,
-                fontSize=11,
-                textColor=colors.HexColor('#2c3e50')
-            )
+    Возвращает (обычный, жирный); если шрифтов нет - Helvetica.
+    """
+    global _fonts
+    if _fonts is not None:
+        return _fonts
+    with _fonts_lock:
+        if _fonts is None:
+            _fonts = _load_fonts()
+    return _fonts
 
-            # === Заголовок ===
-            story.append(Paragraph("Результаты медицинской диагностики", title_style))
-            story.append(Spacer(1, 10 * mm))
 
-            # === Основная информация ===
-            story.append(Paragraph(f"<b>Модель диагностики:</b> {model_name}", normal_style))
-            story.append(Spacer(1, 3 * mm))
+def _load_fonts() -> Tuple[str, str]:
+    """Настройка шрифтов с правильными путями"""
+    try:
+        font_dir = resource_path(os.path.join('assets', 'fonts'))
+        regular_path = os.path.join(font_dir, 'Roboto-Regular.ttf')
+        bold_path = os.path.join(font_dir, 'Roboto-Bold.ttf')
 
-            current_time = datetime.now().strftime("%d.%m.%Y %H:%M")
-            story.append(Paragraph(f"<b>Дата и время:</b> {current_time}", normal_style))
-            story.append(Spacer(1, 3 * mm))
+        if os.path.isfile(regular_path) and os.path.isfile(bold_path):
+            pdfmetrics.registerFont(TTFont(FONT_NAME, regular_path))
+            pdfmetrics.registerFont(TTFont(FONT_BOLD, bold_path))
+            return FONT_NAME, FONT_BOLD
+        print(f"✗ Шрифты для PDF не найдены в {font_dir}. Используется Helvetica.")
+
+    except Exception as e:
+        print(f"Ошибка загрузки PDF шрифтов: {e}")
+    return 'Helvetica', 'Helvetica-Bold'
+
+
+class _StreamWriter:
+    """Дописывает PDF в поток вызывающего целиком и считает байты.
 
-            if doctor_name:
-                story.append(Paragraph(f"<b>Врач:</b> {doctor_name}", normal_style))
-                story.append(Spacer(1, 3 * mm))
-
-            story.append(Spacer(1, 5 * mm))
-
-            # === Входные параметры (таблица) ===
-            story.append(Paragraph("Входные параметры:", heading_style))
-            table_data = [["Параметр", "Значение"]]
-            for label, value in input_values.values():
-                table_data.append([label, f"{value:.4f}"])
-
-            table = Table(table_data, colWidths=[120 * mm, 50 * mm])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a90e2')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (-1, 0), self.font_bold),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('FONTNAME', (0, 1), (-1, -1), self.font_name),
-                ('FONTSIZE', (0, 1), (-1, -1), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e0e0e0')),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')])
-            ]))
-            story.append(table)
-            story.append(Spacer(1, 8 * mm))
-
-            story.append(Paragraph("Результаты расчета:", heading_style))
-            result_data = [
-                ["Показатель", "Значение"],
-                ["z-значение", f"{z_value:.4f}"],
-                ["Вероятность (p)", f"{p_value:.4f} ({p_value*100:.2f}%)"]
-            ]
-            result_table = Table(result_data, colWidths=[120 * mm, 50 * mm])
-            result_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a90e2')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (-1, 0), self.font_bold),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('FONTNAME', (0, 1), (-1, -1), self.font_name),
-                ('FONTSIZE', (0, 1), (-1, -1), 11),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e0e0e0'))
-            ]))
-            story.append(result_table)
-            story.append(Spacer(1, 8 * mm))
-
-            story.append(Paragraph("Заключение:", heading_style))
-            is_high_risk = "высок" in conclusion.lower() or "диагностируется" in conclusion.lower()
-            conclusion_color = colors.HexColor('#e74c3c') if is_high_risk else colors.HexColor('#27ae60')
-            conclusion_style = ParagraphStyle(
+    ReportLab пишет документ одним write(); небуферизованные потоки
+    (канал, сокет через makefile) могут принять его частями.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data)
+        while view:
+            written = self.stream.write(view)
+            view = view[len(view) if written is None else written:]
+        self.size += len(data)
+        return len(data)
+
+
+@dataclass(frozen=True)
+class ReportData:
+    """Данные одного отчёта: всё, что меняется от пациента к пациенту"""
+    model_name: str
+    doctor_name: str
+    input_values: Dict[str, Tuple[str, float]]
+    z_value: float
+    p_value: float
+    conclusion: str
+    formula: str = ""
+
+
+class ReportTemplate:
+    """Скомпилированный шаблон отчёта.
+
+    Шрифты, стили абзацев и стили таблиц создаются один раз; при экспорте
+    заполняются только данные пациента.
+    """
+
+    # Увеличивается при любом изменении вида отчёта: входит в ключ кэша отчётов
+    VERSION = 2
+
+    PAGE = dict(pagesize=A4, rightMargin=20 * mm, leftMargin=20 * mm,
+                topMargin=20 * mm, bottomMargin=20 * mm)
+    COL_WIDTHS = [120 * mm, 50 * mm]
+
+    def __init__(self):
+        self.font_name, self.font_bold = register_fonts()
+        styles = getSampleStyleSheet()
+
+        # === Стили с поддержкой Roboto / fallback на Helvetica ===
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontName=self.font_bold,
+            fontSize=16,
+            textColor=colors.HexColor('#2c3e50'),
+            spaceAfter=12,
+            alignment=1  # центрирование
+        )
+
+        self.heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontName=self.font_bold,
+            fontSize=14,
+            textColor=colors.HexColor('#4a90e2'),
+            spaceAfter=6,
+            spaceBefore=12
+        )
+
+        self.normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontName=self.font_name,
+            fontSize=11,
+            textColor=colors.HexColor('#2c3e50')
+        )
+
+        self.conclusion_styles = {
+            high_risk: ParagraphStyle(
                 'Conclusion',
-                parent=normal_style,
+                parent=self.normal_style,
                 fontSize=12,
-                textColor=conclusion_color,
+                textColor=colors.HexColor('#e74c3c') if high_risk else colors.HexColor('#27ae60'),
                 spaceAfter=6
             )
-            story.append(Paragraph(f"<b>{conclusion}</b>", conclusion_style))
-            story.append(Spacer(1, 8 * mm))
+            for high_risk in (True, False)
+        }
+
+        # Таблица результатов - тот же стиль без чередования строк
+        result_commands = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a90e2')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), self.font_bold),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('FONTNAME', (0, 1), (-1, -1), self.font_name),
+            ('FONTSIZE', (0, 1), (-1, -1), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e0e0e0'))
+        ]
+        self.result_table_style = TableStyle(result_commands)
+        self.input_table_style = TableStyle(result_commands + [
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')])
+        ])
 
-            if doctor_name:
-                story.append(Spacer(1, 15 * mm))
-                story.append(Paragraph(f"____________________ {doctor_name}", normal_style))
+        # Шкалы и зоны диаграммы общие для всех отчётов
+        self.chart = get_biomarker_chart(self.font_name, self.font_bold)
+
+    @staticmethod
+    def is_high_risk(conclusion: str) -> bool:
+        conclusion = conclusion.lower()
+        return "высок" in conclusion or "диагностируется" in conclusion
+
+    def story(self, report: ReportData, generated_at: Optional[datetime] = None) -> List:
+        """Содержимое отчёта одного пациента"""
+        normal_style = self.normal_style
+        heading_style = self.heading_style
+        story = []
+
+        # === Заголовок ===
+        story.append(Paragraph("Результаты медицинской диагностики", self.title_style))
+        story.append(Spacer(1, 10 * mm))
+
+        # === Основная информация ===
+        story.append(Paragraph(f"<b>Модель диагностики:</b> {report.model_name}", normal_style))
+        story.append(Spacer(1, 3 * mm))
+
+        current_time = (generated_at or datetime.now()).strftime("%d.%m.%Y %H:%M")
+        story.append(Paragraph(f"<b>Дата и время:</b> {current_time}", normal_style))
+        story.append(Spacer(1, 3 * mm))
+
+        if report.doctor_name:
+            story.append(Paragraph(f"<b>Врач:</b> {report.doctor_name}", normal_style))
+            story.append(Spacer(1, 3 * mm))
+
+        story.append(Spacer(1, 5 * mm))
+
+        # === Входные параметры (таблица) ===
+        story.append(Paragraph("Входные параметры:", heading_style))
+        table_data = [["Параметр", "Значение"]]
+        for label, value in report.input_values.values():
+            table_data.append([label, f"{value:.4f}"])
+
+        table = Table(table_data, colWidths=self.COL_WIDTHS)
+        table.setStyle(self.input_table_style)
+        story.append(table)
+        story.append(Spacer(1, 8 * mm))
+
+        story.append(Paragraph("Результаты расчета:", heading_style))
+        p_value = report.p_value
+        result_data = [
+            ["Показатель", "Значение"],
+            ["z-значение", f"{report.z_value:.4f}"],
+            ["Вероятность (p)", f"{p_value:.4f} ({p_value*100:.2f}%)"]
+        ]
+        result_table = Table(result_data, colWidths=self.COL_WIDTHS)
+        result_table.setStyle(self.result_table_style)
+        story.append(result_table)
+        story.append(Spacer(1, 8 * mm))
+
+        story.append(Paragraph("Заключение:", heading_style))
+        conclusion_style = self.conclusion_styles[self.is_high_risk(report.conclusion)]
+        story.append(Paragraph(f"<b>{report.conclusion}</b>", conclusion_style))
+        story.append(Spacer(1, 8 * mm))
+
+        values = {key: value for key, (_, value) in report.input_values.items()}
+        has_chart = self.chart.covers(values)
+        if has_chart:
+            story.append(Paragraph("<b>Биомаркеры и референсные зоны:</b>", normal_style))
+            story.append(self.chart.flowable(values))
+
+        if report.doctor_name:
+            # С диаграммой место под подпись меньше, чтобы отчёт остался на одной странице
+            story.append(Spacer(1, 10 * mm if has_chart else 15 * mm))
+            story.append(Paragraph(f"____________________ {report.doctor_name}", normal_style))
+
+        return story
+
+    def render(self, output: Union[str, BinaryIO], report: ReportData,
+               generated_at: Optional[datetime] = None,
+               progress: Optional[Callable[[str, int], None]] = None):
+        """Строит PDF-отчёт в файл (путь или двоичный поток).
+
+        progress(тип, значение) - обратный вызов ReportLab ("SIZE_EST",
+        "PROGRESS", "FINISHED"); исключение из него прерывает построение.
+        """
+        doc = SimpleDocTemplate(output, **self.PAGE)
+        if progress is not None:
+            doc.setProgressCallBack(progress)
+        doc.build(self.story(report, generated_at))
+
+    def write(self, stream: BinaryIO, report: ReportData,
+              generated_at: Optional[datetime] = None) -> int:
+        """Пишет PDF-отчёт в двоичный поток (BytesIO, канал, сокет); возвращает размер"""
+        writer = _StreamWriter(stream)
+        self.render(writer, report, generated_at)
+        return writer.size
+
+    def to_bytes(self, report: ReportData, generated_at: Optional[datetime] = None) -> bytes:
+        buffer = io.BytesIO()
+        self.render(buffer, report, generated_at)
+        return buffer.getvalue()
+
+
+_template: Optional[ReportTemplate] = None
+_template_lock = threading.Lock()
+
+
+def get_report_template() -> ReportTemplate:
+    """Шаблон отчёта процесса (создаётся при первом вызове)"""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = ReportTemplate()
+    return _template
+
+
+class PDFExporter:
+    """Класс для экспорта результатов в PDF"""
+
+    def __init__(self, cache=None):
+        self.template = get_report_template()
+        self.font_name = self.template.font_name
+        self.font_bold = self.template.font_bold
+        # ReportCache: повторный экспорт тех же данных берётся из кэша
+        self.cache = cache
+
+    def export_results(self, filename: str, model_name: str, doctor_name: str,
+                       input_values: Dict[str, Tuple[str, float]],
+                       z_value: float, p_value: float,
+                       conclusion: str, formula: str,
+                       generated_at: Optional[datetime] = None):
+        """Экспорт результатов в PDF.
 
-            doc.build(story)
+        generated_at - дата и время в отчёте (по умолчанию - текущие);
+        кэш отдаёт готовый файл только при совпадении и её.
+        """
+        report = ReportData(model_name, doctor_name, input_values,
+                            z_value, p_value, conclusion, formula)
+        generated_at = generated_at or datetime.now()
+        if self.cache is not None:
+            self.cache.export(filename, report, generated_at)
+        else:
+            self.template.render(filename, report, generated_at)
 
-        except Exception as e:
-            raise
\ No newline at end of file
+    def export_to_stream(self, stream: BinaryIO, model_name: str, doctor_name: str,
+                         input_values: Dict[str, Tuple[str, float]],
+                         z_value: float, p_value: float,
+                         conclusion: str, formula: str) -> int:
+        """Экспорт результатов в двоичный поток без временного файла; возвращает размер"""
+        return self.template.write(stream, ReportData(model_name, doctor_name, input_values,
+                                                      z_value, p_value, conclusion, formula))
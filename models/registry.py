@@ -0,0 +1,225 @@
+"""
+Общий для процесса реестр моделей.
+
+Определения моделей находятся лениво - при первом обращении к реестру -
+в точках входа группы "medpredict.models" и в модулях каталога
+models/definitions (протокол модуля описан в models/definitions/__init__.py).
+ModelConfig собирается только при первом get(key) и дальше переиспользуется.
+
+Каталог определений проверяется по mtime не чаще check_interval секунд;
+изменённые модули перечитываются, и новый набор определений подменяет
+старый одной операцией, поэтому читатели видят либо старый, либо новый
+набор целиком.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+import types
+from typing import Callable, Dict, List, Optional
+
+from .model_config import ModelConfig
+
+ENTRY_POINT_GROUP = "medpredict.models"
+DEFINITIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "definitions")
+DEFINITIONS_PACKAGE = __package__ + ".definitions"
+
+
+class _Definition:
+    """Определение модели; конфигурация собирается при первом обращении"""
+
+    __slots__ = ("key", "name", "source", "mtime", "_build", "_config", "_lock")
+
+    def __init__(self, key: str, name: str, build: Callable[[], ModelConfig],
+                 source: str, mtime: float):
+        self.key = key
+        self.name = name
+        self.source = source
+        self.mtime = mtime
+        self._build = build
+        self._config: Optional[ModelConfig] = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self._config is not None
+
+    def config(self) -> ModelConfig:
+        config = self._config
+        if config is None:
+            with self._lock:
+                if self._config is None:
+                    self._config = self._build()
+                config = self._config
+        return config
+
+
+def _entry_points(group: str) -> list:
+    from importlib import metadata
+    try:
+        return list(metadata.entry_points(group=group))
+    except TypeError:
+        # Python < 3.10
+        return list(metadata.entry_points().get(group, []))
+
+
+def _definition(module, source: str, mtime: float, default_key: Optional[str] = None) -> _Definition:
+    key = getattr(module, "KEY", default_key)
+    build = getattr(module, "build", None)
+    if not key or not callable(build):
+        raise ValueError(f"{source}: определение модели должно задавать KEY и build()")
+    return _Definition(key, getattr(module, "NAME", key), build, source, mtime)
+
+
+class ModelRegistry:
+    """Кэширующий реестр моделей с перечитыванием изменённых определений"""
+
+    def __init__(self, directory: Optional[str] = DEFINITIONS_DIR,
+                 use_entry_points: bool = True,
+                 check_interval: Optional[float] = 2.0):
+        self.directory = directory
+        self.use_entry_points = use_entry_points
+        # None - не проверять изменения автоматически (только refresh())
+        self.check_interval = check_interval
+        self.reloads = 0
+
+        self._lock = threading.Lock()
+        self._definitions: Optional[Dict[str, _Definition]] = None
+        self._entry_definitions: Optional[List[_Definition]] = None
+        self._files: Dict[str, _Definition] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._checked = 0.0
+
+    # === Чтение ===
+
+    def keys(self) -> List[str]:
+        return list(self._snapshot())
+
+    def titles(self) -> Dict[str, str]:
+        """{ключ: название} без сборки конфигураций"""
+        return {key: definition.name for key, definition in self._snapshot().items()}
+
+    def get(self, key: str) -> ModelConfig:
+        """Конфигурация модели; собирается при первом обращении"""
+        return self._snapshot()[key].config()
+
+    def get_all_models(self) -> Dict[str, ModelConfig]:
+        """Все конфигурации (собирает ещё не собранные)"""
+        return {key: definition.config() for key, definition in self._snapshot().items()}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._snapshot()
+
+    def stats(self) -> Dict[str, int]:
+        definitions = self._definitions or {}
+        return {
+            "models": len(definitions),
+            "built": sum(definition.built for definition in definitions.values()),
+            "reloads": self.reloads,
+        }
+
+    def _snapshot(self) -> Dict[str, _Definition]:
+        definitions = self._definitions
+        if definitions is None:
+            self.refresh(force=True)
+        elif (self.check_interval is not None and
+              time.monotonic() - self._checked >= self.check_interval):
+            self.refresh()
+        return self._definitions
+
+    # === Обнаружение и перечитывание ===
+
+    def refresh(self, force: bool = False) -> bool:
+        """Перечитывает изменённые определения; True, если набор заменён"""
+        with self._lock:
+            self._checked = time.monotonic()
+            mtimes = self._scan()
+            if not force and self._definitions is not None and mtimes == self._mtimes:
+                return False
+
+            if self._entry_definitions is None:
+                self._entry_definitions = self._load_entry_points()
+
+            files = {}
+            for path, mtime in mtimes.items():
+                previous = self._files.get(path)
+                if previous is not None and previous.mtime == mtime:
+                    files[path] = previous
+                    continue
+                try:
+                    files[path] = _definition(self._load_file(path), path, mtime)
+                except Exception as e:
+                    print(f"Ошибка загрузки модели {path}: {e}")
+                    if previous is not None:
+                        files[path] = previous
+
+            definitions = {}
+            for definition in self._entry_definitions + list(files.values()):
+                definitions[definition.key] = definition
+
+            self._files = files
+            self._mtimes = mtimes
+            if self._definitions is not None:
+                self.reloads += 1
+            self._definitions = definitions
+            return True
+
+    def _scan(self) -> Dict[str, float]:
+        if not self.directory or not os.path.isdir(self.directory):
+            return {}
+        mtimes = {}
+        for entry in sorted(os.scandir(self.directory), key=lambda e: e.name):
+            if entry.name.endswith(".py") and not entry.name.startswith("_"):
+                try:
+                    mtimes[entry.path] = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+        return mtimes
+
+    def _load_file(self, path: str) -> types.ModuleType:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if os.path.abspath(self.directory) == DEFINITIONS_DIR:
+            # Модули встроенного каталога могут использовать относительный импорт
+            package = importlib.import_module(DEFINITIONS_PACKAGE).__name__
+            name = f"{package}.{stem}"
+        else:
+            package = None
+            name = f"medpredict_models_{stem}"
+
+        # Исходник компилируется напрямую: .pyc с той же секундой mtime
+        # мог бы вернуть устаревший код при быстрой правке файла
+        with open(path, "rb") as f:
+            code = compile(f.read(), path, "exec")
+        module = types.ModuleType(name)
+        module.__file__ = path
+        module.__package__ = package
+        exec(code, module.__dict__)
+        sys.modules[name] = module
+        return module
+
+    def _load_entry_points(self) -> List[_Definition]:
+        if not self.use_entry_points:
+            return []
+        definitions = []
+        for entry_point in _entry_points(ENTRY_POINT_GROUP):
+            try:
+                definitions.append(_definition(entry_point.load(), entry_point.value,
+                                               0.0, entry_point.name))
+            except Exception as e:
+                print(f"Ошибка загрузки модели {entry_point.value}: {e}")
+        return definitions
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Реестр моделей процесса (создаётся при первом вызове)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,303 @@
+"""
+Дисковый кэш готовых PDF-отчётов с адресацией по содержимому.
+
+Ключ - sha256 от данных отчёта (входные параметры - ключи и точные
+значения, от которых зависят таблица и диаграмма биомаркеров; z и p - с
+точностью печати; дата - до минуты), версии шаблона и шрифтов. Файл
+записи называется <ключ>-<sha256 содержимого>.pdf: при чтении содержимое
+сверяется с хэшем в имени, повреждённая запись удаляется и считается
+промахом. Объём ограничен, давние записи вытесняются (LRU).
+
+Порядок обращений хранится не в mtime файлов записей (они жёсткими
+ссылками выложены в папки пользователей, и чтение из кэша меняло бы
+время изменения экспортированных отчётов), а в журнале access.log: по
+строке с ключом на каждое попадание. При открытии кэша записи
+упорядочиваются по времени создания и журналу, журнал сжимается.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from .pdf_exporter import ReportData, ReportTemplate, get_report_template
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ACCESS_LOG = "access.log"
+# Временные файлы моложе этого могут дописываться другим процессом
+TMP_MAX_AGE = 3600
+
+
+@dataclass
+class _Entry:
+    path: str
+    digest: str
+    size: int
+
+
+class ReportCache:
+    """Кэш PDF-отчётов в каталоге directory не больше max_bytes байт"""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 template: Optional[ReportTemplate] = None):
+        if max_bytes <= 0:
+            raise ValueError("Размер кэша должен быть положительным")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.template = template or get_report_template()
+        self._log_path = os.path.join(directory, ACCESS_LOG)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.corrupted = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Восстанавливает индекс по файлам каталога и журналу обращений,
+        от давних к свежим"""
+        now = time.time()
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            stem, ext = os.path.splitext(name)
+            key, _, digest = stem.partition("-")
+            if ext != ".pdf" or len(key) != 64 or len(digest) != 64:
+                if name.endswith(".tmp"):
+                    self._remove_stale(path, now)
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            found.append((stat.st_mtime, key, _Entry(path, digest, stat.st_size)))
+        for _, key, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[key] = entry
+            self.size += entry.size
+        self._replay_log()
+        self._evict()
+
+    @staticmethod
+    def _remove_stale(path: str, now: float):
+        """Удаляет давний остаток прерванной записи; свежий не трогает"""
+        try:
+            if now - os.stat(path).st_mtime > TMP_MAX_AGE:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _replay_log(self):
+        """Переносит в конец индекса записи в порядке обращений из журнала"""
+        try:
+            with open(self._log_path, "r", encoding="ascii", errors="replace") as f:
+                keys = f.read().split()
+        except FileNotFoundError:
+            return
+        for key in keys:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        if len(keys) > 2 * len(self._entries):
+            # Сжатие: по строке на живую запись в текущем порядке
+            tmp_path = os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+            try:
+                with open(tmp_path, "w", encoding="ascii") as f:
+                    f.writelines(f"{key}\n" for key in self._entries)
+                os.replace(tmp_path, self._log_path)
+            except OSError:
+                self._remove(tmp_path)
+
+    def _log_access(self, key: str):
+        # Строка меньше PIPE_BUF: дозапись из нескольких процессов не перемешивается
+        try:
+            with open(self._log_path, "a", encoding="ascii") as f:
+                f.write(f"{key}\n")
+        except OSError:
+            pass
+
+    # === Ключ ===
+
+    def key(self, report: ReportData, generated_at: datetime) -> str:
+        """Ключ отчёта.
+
+        Входные параметры берутся с ключами и точными значениями (repr):
+        по ключам ReportTemplate решает, строить ли диаграмму, а подписи и
+        положение отметок на ней зависят от значения точнее, чем :.4f
+        в таблице. Остальные поля - в том виде, в каком они печатаются.
+        """
+        t = self.template
+        fields = {
+            "version": t.VERSION,
+            "fonts": [t.font_name, t.font_bold],
+            "model": report.model_name,
+            "doctor": report.doctor_name,
+            "inputs": [[key, label, repr(value)]
+                       for key, (label, value) in report.input_values.items()],
+            "z": f"{report.z_value:.4f}",
+            "p": f"{report.p_value:.4f} ({report.p_value*100:.2f}%)",
+            "conclusion": report.conclusion,
+            "generated_at": generated_at.strftime("%d.%m.%Y %H:%M"),
+        }
+        data = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    # === Чтение и запись ===
+
+    def _lookup(self, key: str) -> Optional[Tuple[_Entry, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+        try:
+            with open(entry.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Запись вытеснил другой процесс с тем же каталогом
+            self._drop(key, entry, remove=False)
+            return None
+        if hashlib.sha256(data).hexdigest() != entry.digest:
+            self._drop(key, entry, corrupted=True)
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        self._log_access(key)
+        return entry, data
+
+    def get(self, key: str) -> Optional[bytes]:
+        """PDF по ключу или None при промахе"""
+        found = self._lookup(key)
+        return None if found is None else found[1]
+
+    def put(self, key: str, data: bytes) -> str:
+        """Сохраняет PDF; возвращает путь к файлу записи"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.directory, f"{key}-{digest}.pdf")
+        tmp_path = os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+                if old.path != path:
+                    self._remove(old.path)
+            self._entries[key] = _Entry(path, digest, len(data))
+            self.size += len(data)
+            self._evict()
+        return path
+
+    def _drop(self, key: str, entry: _Entry, remove: bool = True, corrupted: bool = False):
+        """Убирает запись после неудачного чтения (считается промахом)"""
+        with self._lock:
+            self.misses += 1
+            self.corrupted += corrupted
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                self.size -= entry.size
+        if remove:
+            self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+            self._remove(entry.path)
+            self.evictions += 1
+
+    # === Отчёты ===
+
+    def render(self, report: ReportData, generated_at: datetime) -> bytes:
+        """PDF отчёта: из кэша или построенный и сохранённый в кэш"""
+        key = self.key(report, generated_at)
+        data = self.get(key)
+        if data is None:
+            data = self.template.to_bytes(report, generated_at)
+            self.put(key, data)
+        return data
+
+    def link(self, key: str, filename: str, hard_link: bool = True) -> bool:
+        """Выкладывает запись кэша в файл filename; False при промахе"""
+        found = self._lookup(key)
+        if found is None:
+            return False
+        entry, data = found
+        self._materialize(entry.path, data, filename, hard_link)
+        return True
+
+    def export(self, filename: str, report: ReportData, generated_at: datetime,
+               hard_link: bool = True) -> bool:
+        """Пишет отчёт в файл; возвращает True, если он взят из кэша.
+
+        С hard_link файл по возможности делается жёсткой ссылкой на запись
+        кэша, без копирования. Все такие файлы - один файл на диске: если
+        один из них изменить на месте, запись кэша не пройдёт проверку
+        целостности и при следующем экспорте будет построена заново.
+        """
+        key = self.key(report, generated_at)
+        if self.link(key, filename, hard_link):
+            return True
+        data = self.template.to_bytes(report, generated_at)
+        path = self.put(key, data)
+        self._materialize(path, data, filename, hard_link)
+        return False
+
+    @staticmethod
+    def _materialize(path: str, data: bytes, filename: str, hard_link: bool):
+        tmp_path = f"{filename}.{uuid.uuid4().hex[:8]}.tmp"
+        linked = False
+        if hard_link:
+            try:
+                os.link(path, tmp_path)
+                linked = True
+            except OSError:
+                # Другой диск или файловая система без жёстких ссылок
+                pass
+        if not linked:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        try:
+            os.replace(tmp_path, filename)
+        except BaseException:
+            ReportCache._remove(tmp_path)
+            raise
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self.size = 0
+        for entry in entries:
+            self._remove(entry.path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "corrupted": self.corrupted,
+            }
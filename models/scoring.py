@@ -0,0 +1,93 @@
+import math
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+class PiecewiseLinear:
+    """Кусочно-линейная функция, заданная таблицей точек излома.
+
+    Левее первой точки и правее последней функция постоянна.
+    Скаляры вычисляются через bisect, массивы - через numpy.searchsorted;
+    на каждом отрезке используется одна и та же формула
+    y0 + dy * ((x - x0) / dx), поэтому результаты совпадают побитово.
+    Для NaN возвращается nan_value (по умолчанию NaN).
+    """
+
+    __slots__ = ("xs", "ys", "nan_value", "_segments", "_x0", "_y0", "_dy", "_dx")
+
+    def __init__(self, points: Sequence[Tuple[float, float]], nan_value: float = math.nan):
+        if len(points) < 2:
+            raise ValueError("Нужно минимум две точки излома")
+        xs = tuple(float(x) for x, _ in points)
+        ys = tuple(float(y) for _, y in points)
+        if any(b <= a for a, b in zip(xs, xs[1:])):
+            raise ValueError("Точки излома должны строго возрастать")
+
+        self.xs = xs
+        self.ys = ys
+        self.nan_value = float(nan_value)
+        self._segments = tuple(
+            (xs[i], ys[i], ys[i + 1] - ys[i], xs[i + 1] - xs[i])
+            for i in range(len(xs) - 1)
+        )
+        self._x0 = np.array([s[0] for s in self._segments])
+        self._y0 = np.array([s[1] for s in self._segments])
+        self._dy = np.array([s[2] for s in self._segments])
+        self._dx = np.array([s[3] for s in self._segments])
+
+    def __call__(self, x: float) -> float:
+        xs = self.xs
+        if not x > xs[0]:
+            return self.nan_value if x != x else self.ys[0]
+        if x >= xs[-1]:
+            return self.ys[-1]
+        x0, y0, dy, dx = self._segments[bisect_right(xs, x) - 1]
+        return y0 + dy * ((x - x0) / dx)
+
+    def evaluate(self, x: np.ndarray) -> np.ndarray:
+        """Векторное вычисление для массива значений"""
+        x = np.asarray(x, dtype=np.float64)
+        i = np.searchsorted(self.xs, x, side="right") - 1
+        i = np.clip(i, 0, len(self._segments) - 1)
+        out = self._y0[i] + self._dy[i] * ((x - self._x0[i]) / self._dx[i])
+        out = np.where(x >= self.xs[-1], self.ys[-1], out)
+        out = np.where(x > self.xs[0], out, self.ys[0])
+        return np.where(np.isnan(x), self.nan_value, out)
+
+    def __repr__(self):
+        return f"PiecewiseLinear({list(zip(self.xs, self.ys))!r})"
+
+
+class StepTable:
+    """Ступенчатая классификация: первая метка, для которой value <= границы.
+
+    Если ни одна граница не подошла (в том числе для NaN) - последняя метка.
+    """
+
+    __slots__ = ("bounds", "labels")
+
+    def __init__(self, bounds: Sequence[float], labels: Sequence[str]):
+        if len(labels) != len(bounds) + 1:
+            raise ValueError("Меток должно быть на одну больше, чем границ")
+        self.bounds = tuple(float(b) for b in bounds)
+        self.labels = tuple(labels)
+
+    def __call__(self, value: float) -> str:
+        if value != value:
+            return self.labels[-1]
+        return self.labels[bisect_left(self.bounds, value)]
+
+
+@dataclass(frozen=True)
+class BiomarkerSpec:
+    """Табличная спецификация оценки одного биомаркера"""
+    key: str                # ключ во входных данных
+    alias: str              # короткое имя (is_biomarker_elevated и т.п.)
+    score: PiecewiseLinear  # вклад в z-значение
+    risk: PiecewiseLinear   # уровень риска 0-1
+    weight: float           # вес в базовом риске
+    elevated_above: float   # верхняя граница нормы
+    status: StepTable       # словесный статус
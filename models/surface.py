@@ -0,0 +1,158 @@
+import random
+import sys
+from array import array
+from typing import Dict, Optional, Tuple
+
+# Диапазоны сетки по умолчанию (мкмоль/л); за их пределами - прямой расчёт
+DEFAULT_RANGES = {
+    "tyrosine": (0.0, 250.0),
+    "arginine": (0.0, 350.0),
+    "no_level": (0.0, 200.0),
+}
+
+
+class _MarkerGrid:
+    """Равномерная сетка взвешенного риска одного биомаркера"""
+
+    __slots__ = ("lo", "hi", "step", "inv_step", "xs", "values", "linear", "size", "nodes")
+
+    def __init__(self, spec, lo: float, hi: float, step: float, decimals: int):
+        self.lo = lo
+        self.step = step
+        self.inv_step = 1.0 / step
+        self.size = int(round((hi - lo) / step)) + 1
+        self.hi = round(lo + (self.size - 1) * step, decimals)
+
+        self.xs = array("d", (round(lo + i * step, decimals) for i in range(self.size)))
+        # Вес умножается так же, как в EndometriosisModel._probability_exact,
+        # поэтому в узлах сетки сумма совпадает с прямым расчётом побитово
+        self.values = array("d", (spec.risk(x) * spec.weight for x in self.xs))
+
+        # Ячейка линейна, если внутри неё нет точки излома таблицы риска
+        linear = bytearray(b"\x01") * max(self.size - 1, 0)
+        for bx in spec.risk.xs:
+            i = int((bx - lo) * self.inv_step)
+            if 0 <= i < self.size - 1 and self.xs[i] < bx < self.xs[i + 1]:
+                linear[i] = 0
+        self.linear = bytes(linear)
+
+        # Узел сетки -> значение: точное попадание обходится одним поиском в словаре
+        self.nodes = dict(zip(self.xs, self.values))
+
+    def lookup(self, x: float) -> Optional[float]:
+        """Взвешенный риск или None, если значение вне сетки"""
+        value = self.nodes.get(x)
+        if value is not None:
+            return value
+        if not self.lo <= x <= self.hi:
+            return None
+        i = int((x - self.lo) * self.inv_step)
+        if i >= self.size - 1 or not self.linear[i]:
+            return None
+        xs = self.xs
+        x0 = xs[i]
+        v0 = self.values[i]
+        return v0 + (self.values[i + 1] - v0) * ((x - x0) / (xs[i + 1] - x0))
+
+    def nbytes(self) -> int:
+        return (self.xs.itemsize * len(self.xs) +
+                self.values.itemsize * len(self.values) + len(self.linear) +
+                sys.getsizeof(self.nodes) + sys.getsizeof(0.0) * 2 * len(self.nodes))
+
+
+class ProbabilitySurface:
+    """Предрасчитанная поверхность вероятности EndometriosisModel.
+
+    Вероятность раскладывается на взвешенные риски трёх биомаркеров и
+    дискретные состояния (возраст в/вне 18-45, число жалоб 0-3), поэтому
+    вместо плотной трёхмерной сетки хранятся три одномерные сетки и
+    таблица модификаторов по числу жалоб. В узлах сетки результат точный,
+    между узлами - линейная интерполяция (функция там линейна), вне сетки
+    и в ячейках с точкой излома - прямой расчёт модели.
+    """
+
+    COMPLAINT_MODIFIERS = (0.8, 1.1, 1.3, 1.5)
+
+    def __init__(self, model, step: float = 0.1,
+                 ranges: Optional[Dict[str, Tuple[float, float]]] = None,
+                 decimals: int = 10):
+        self.model = model
+        self.step = step
+        self.ranges = dict(DEFAULT_RANGES if ranges is None else ranges)
+        self.version = model.version
+        self.grids = tuple(
+            _MarkerGrid(spec, *self.ranges[spec.key], step=step, decimals=decimals)
+            for spec in model.biomarkers
+        )
+        self.thresholds = tuple(spec.elevated_above for spec in model.biomarkers)
+        # Счётчики статистики; при расчёте из нескольких потоков приблизительные
+        self.lookups = 0
+        self.fallbacks = 0
+
+    def probability(self, age: int, tyrosine: float, arginine: float, no_level: float,
+                    chronic_pain: int, dysmenorrhea: int, infertility: int) -> float:
+        """Вероятность по таблицам; совпадает с EndometriosisModel._probability_exact"""
+        if not 18 <= age <= 45:
+            return 0.05
+
+        tyrosine_grid, arginine_grid, no_grid = self.grids
+        tyrosine_risk = tyrosine_grid.lookup(tyrosine)
+        arginine_risk = arginine_grid.lookup(arginine)
+        no_risk = no_grid.lookup(no_level)
+        if tyrosine_risk is None or arginine_risk is None or no_risk is None:
+            self.fallbacks += 1
+            return self.model._probability_exact(age, tyrosine, arginine, no_level,
+                                                 chronic_pain, dysmenorrhea, infertility)
+        self.lookups += 1
+
+        complaint_count = chronic_pain + dysmenorrhea + infertility
+        if 0 <= complaint_count <= 3:
+            complaint_modifier = self.COMPLAINT_MODIFIERS[complaint_count]
+        else:
+            complaint_modifier = 1.5
+
+        probability = min(0.95, (tyrosine_risk + arginine_risk + no_risk) * complaint_modifier)
+
+        tyrosine_max, arginine_max, no_max = self.thresholds
+        elevated_count = ((tyrosine > tyrosine_max) +
+                          (arginine > arginine_max) +
+                          (no_level > no_max))
+        if elevated_count >= 2 and probability < 0.3:
+            probability = 0.3
+        elif elevated_count == 1 and probability < 0.15:
+            probability = 0.15
+        elif elevated_count == 0 and probability < 0.05:
+            probability = 0.05
+        return probability
+
+    def nbytes(self) -> int:
+        """Объём памяти, занимаемый таблицами (байт)"""
+        return sum(grid.nbytes() for grid in self.grids)
+
+    def max_deviation(self, samples: int = 20000, seed: int = 0) -> float:
+        """Максимальное отклонение от прямого расчёта на случайной выборке.
+
+        Половина точек берётся в узлах сетки, половина - между узлами.
+        """
+        rng = random.Random(seed)
+        worst = 0.0
+        for n in range(samples):
+            point = []
+            for grid in self.grids:
+                x = grid.lo + rng.randrange(grid.size) * grid.step
+                if n % 2:
+                    x += rng.random() * grid.step
+                point.append(round(x, 10) if n % 2 == 0 else min(x, grid.hi))
+            complaints = [int(rng.random() < 0.5) for _ in range(3)]
+            args = (30, point[0], point[1], point[2], *complaints)
+            deviation = abs(self.probability(*args) - self.model._probability_exact(*args))
+            worst = max(worst, deviation)
+        return worst
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "nbytes": self.nbytes(),
+            "points": sum(grid.size for grid in self.grids),
+            "lookups": self.lookups,
+            "fallbacks": self.fallbacks,
+        }
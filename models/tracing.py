@@ -0,0 +1,102 @@
+"""
+Трассировка расчётов моделей.
+
+Горячие пути проверяют флаг модуля перед каждым блоком трассировки:
+
+    if tracing.ENABLED:
+        tracing.trace("Тирозин: %s", tyrosine)
+
+При выключенной трассировке это стоит одну проверку; сообщения
+форматируются logging лениво, только если запись действительно выводится.
+"""
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger("medpredict.trace")
+
+ENABLED = False
+
+_lock = threading.Lock()
+_console_handler: Optional[logging.Handler] = None
+_explicit = False
+_captures = 0
+
+
+def trace(msg: str, *args) -> None:
+    """Записывает отладочное сообщение (аргументы форматируются лениво)"""
+    logger.debug(msg, *args)
+
+
+def enable(console: bool = False) -> None:
+    """Включает трассировку; console=True дублирует её в stderr"""
+    global ENABLED, _console_handler, _explicit
+    with _lock:
+        logger.setLevel(logging.DEBUG)
+        if console and _console_handler is None:
+            _console_handler = logging.StreamHandler()
+            _console_handler.setFormatter(logging.Formatter("[DEBUG] %(message)s"))
+            logger.addHandler(_console_handler)
+        _explicit = True
+        ENABLED = True
+
+
+def disable() -> None:
+    """Выключает трассировку и вывод в консоль"""
+    global ENABLED, _console_handler, _explicit
+    with _lock:
+        if _console_handler is not None:
+            logger.removeHandler(_console_handler)
+            _console_handler = None
+        _explicit = False
+        ENABLED = _captures > 0
+
+
+class RingBufferHandler(logging.Handler):
+    """Хранит последние N записей трассировки одного потока в памяти"""
+
+    def __init__(self, capacity: int = 200, patient_id: Optional[str] = None):
+        super().__init__(logging.DEBUG)
+        self.patient_id = patient_id
+        self.records = deque(maxlen=capacity)
+        self._thread_id = threading.get_ident()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.thread == self._thread_id:
+            self.records.append(record)
+
+    def messages(self) -> List[str]:
+        """Текст сохранённых записей (форматируется только здесь)"""
+        return [record.getMessage() for record in self.records]
+
+    def clear(self) -> None:
+        self.records.clear()
+
+
+@contextmanager
+def capture(patient_id: Optional[str] = None,
+            capacity: int = 200) -> Iterator[RingBufferHandler]:
+    """Включает трассировку на время расчёта одного пациента.
+
+    Записи текущего потока попадают в кольцевой буфер, а не в консоль:
+
+        with tracing.capture("P-001") as buf:
+            model.calculate_probability(values)
+        print("\\n".join(buf.messages()))
+    """
+    global ENABLED, _captures
+    handler = RingBufferHandler(capacity, patient_id)
+    with _lock:
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        _captures += 1
+        ENABLED = True
+    try:
+        yield handler
+    finally:
+        with _lock:
+            logger.removeHandler(handler)
+            _captures -= 1
+            ENABLED = _explicit or _captures > 0
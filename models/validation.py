@@ -0,0 +1,37 @@
+import math
+from typing import Dict, Tuple
+
+
+def parse_number(raw: str) -> float:
+    """Разбирает число, допуская десятичную запятую ("92,4")"""
+    return float(raw.strip().replace(",", "."))
+
+
+def parse_inputs(raw_values: Dict[str, str]) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Разбирает строковые значения полей за один проход.
+
+    Возвращает (значения, ошибки); ошибки - {ключ: текст ошибки}.
+    "nan" и "inf" float() принимает, но как показатели они не допускаются.
+    """
+    values = {}
+    errors = {}
+    for key, raw in raw_values.items():
+        s = (raw or "").strip().replace(",", ".")
+        if not s:
+            errors[key] = "Заполните поле"
+            continue
+        try:
+            value = float(s)
+        except ValueError:
+            errors[key] = "Введите число (напр. 12.34)"
+            continue
+        if not math.isfinite(value):
+            errors[key] = "Введите конечное число (напр. 12.34)"
+            continue
+        values[key] = value
+    return values, errors
+
+
+def validate_inputs(raw_values: Dict[str, str]) -> Dict[str, str]:
+    """Проверяет строковые значения полей; возвращает {ключ: текст ошибки}"""
+    return parse_inputs(raw_values)[1]
@@ -0,0 +1,5 @@
+"""
+Безголовые сервисы MedPredict: пакетный расчёт, параллельное выполнение,
+массовая выгрузка PDF-отчётов.
+Не зависят от PyQt6.
+"""
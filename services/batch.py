@@ -0,0 +1,146 @@
+"""
+Потоковый пакетный расчёт по CSV/TSV-файлам пациентов.
+
+Строки читаются и обрабатываются генераторами по одной, поэтому память
+не зависит от размера файла. Некорректные строки не прерывают обработку,
+а уходят в отдельный поток отказов.
+"""
+import csv
+import itertools
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from models.diagnostic_result import ModelEvaluation
+from models.medical_model import MedicalModel
+from models.model_config import ModelConfig
+from models.registry import get_model_registry
+from models.validation import parse_inputs
+
+DEFAULT_MODEL_KEY = "endometriosis_diagnostics"
+RESULT_COLUMNS = ["z_value", "p_value", "risk_level", "conclusion"]
+PASSTHROUGH_COLUMNS = ["patient_id"]
+
+
+@dataclass(frozen=True)
+class ScoredRow:
+    """Строка входного файла и результат её обработки"""
+    line: int
+    row: Dict[str, str]
+    evaluation: Optional[ModelEvaluation]
+    errors: Dict[str, str]
+
+
+def create_model(model_key: str = DEFAULT_MODEL_KEY) -> Tuple[ModelConfig, MedicalModel]:
+    """Возвращает конфигурацию и MedicalModel так же, как MainController"""
+    config = get_model_registry().get(model_key)
+    model_type = "endometriosis" if "endometriosis" in model_key.lower() else "logistic"
+    return config, MedicalModel(model_type=model_type)
+
+
+def detect_delimiter(header: str, filename: Optional[str] = None) -> str:
+    """Разделитель по расширению файла или по строке заголовка"""
+    if filename and filename.lower().endswith((".tsv", ".tab")):
+        return "\t"
+    return max(("\t", ";", ","), key=header.count)
+
+
+def read_rows(stream: TextIO, delimiter: Optional[str] = None,
+              filename: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Лениво читает строки файла как (номер строки, {колонка: значение})"""
+    header = stream.readline()
+    if not header:
+        return
+    if delimiter is None:
+        delimiter = detect_delimiter(header, filename)
+    reader = csv.reader(itertools.chain([header], stream), delimiter=delimiter)
+    columns = [name.strip() for name in next(reader)]
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        yield reader.line_num, dict(zip(columns, row))
+
+
+def clean_row(row: Dict[str, str], config: ModelConfig) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Проверяет поля модели в строке; возвращает (значения, ошибки)"""
+    return parse_inputs({key: row.get(key) for _, key in config.fields})
+
+
+def score_rows(rows: Iterable[Tuple[int, Dict[str, str]]], config: ModelConfig,
+               model: MedicalModel) -> Iterator[ScoredRow]:
+    """Рассчитывает каждую строку; ошибки не прерывают поток"""
+    for line, row in rows:
+        values, errors = clean_row(row, config)
+        if errors:
+            yield ScoredRow(line, row, None, errors)
+            continue
+        try:
+            evaluation = model.evaluate(values, config.threshold,
+                                        config.high_risk, config.low_risk)
+        except Exception as e:
+            yield ScoredRow(line, row, None, {"": f"Ошибка расчёта: {e}"})
+            continue
+        yield ScoredRow(line, row, evaluation, {})
+
+
+def format_errors(errors: Dict[str, str]) -> str:
+    return "; ".join(f"{key}: {msg}" if key else msg for key, msg in errors.items())
+
+
+class ResultWriter:
+    """Построчно пишет результаты и отказы в CSV"""
+
+    def __init__(self, config: ModelConfig, output: TextIO, rejects: TextIO,
+                 delimiter: str = ","):
+        self.input_columns = PASSTHROUGH_COLUMNS + [key for _, key in config.fields]
+        self._out = csv.writer(output, delimiter=delimiter)
+        self._rejects = csv.writer(rejects, delimiter=delimiter)
+        self._out.writerow(self.input_columns + RESULT_COLUMNS)
+        self._rejects.writerow(["line"] + self.input_columns + ["error"])
+        self.accepted = 0
+        self.rejected = 0
+
+    def write(self, scored: ScoredRow):
+        cells = [scored.row.get(column, "") for column in self.input_columns]
+        evaluation = scored.evaluation
+        if evaluation is None:
+            self._rejects.writerow([scored.line] + cells + [format_errors(scored.errors)])
+            self.rejected += 1
+        else:
+            self._out.writerow(cells + [repr(evaluation.z_value), repr(evaluation.p_value),
+                                        evaluation.risk_level, evaluation.conclusion])
+            self.accepted += 1
+
+
+def run_score(input_path: str, output: TextIO, rejects: TextIO,
+              model_key: str = DEFAULT_MODEL_KEY,
+              delimiter: Optional[str] = None,
+              workers: int = 1, chunk_size: int = 1000,
+              backend: str = "auto", stats=None) -> Tuple[int, int]:
+    """Рассчитывает файл пациентов; возвращает (принято, отклонено).
+
+    При workers > 1 расчёт идёт в пуле процессов или потоков
+    (services.parallel, backend="auto" выбирает по наличию GIL),
+    stats - необязательный ThroughputStats для отчёта по рабочим.
+    """
+    from .parallel import score_with_backend
+
+    config = get_model_registry().get(model_key)
+    if input_path == "-":
+        stream = sys.stdin
+        filename = None
+    else:
+        stream = open(input_path, "r", encoding="utf-8-sig", newline="")
+        filename = input_path
+    try:
+        rows = read_rows(stream, delimiter, filename)
+        writer = ResultWriter(config, output, rejects)
+        scored_rows = score_with_backend(rows, model_key, workers, chunk_size,
+                                         backend, stats)
+        for scored in scored_rows:
+            writer.write(scored)
+        return writer.accepted, writer.rejected
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
@@ -0,0 +1,275 @@
+"""
+Локальный HTTP-сервис расчёта на asyncio (только стандартная библиотека).
+
+    POST /score    {"age": 30, "tyrosine": "105,0", ...}  -> результат расчёта
+    GET  /metrics  счётчики, размеры пакетов, задержка p50/p99
+
+Одновременные запросы собираются в микропакеты (до max_batch штук или
+max_wait_ms миллисекунд) и считаются векторными методами MedicalModel.
+Очередь ограничена: при переполнении сервис сразу отвечает 503.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.medical_model import BATCH_COLUMNS
+from models.validation import parse_inputs
+
+from .batch import DEFAULT_MODEL_KEY, create_model
+
+MAX_BODY_SIZE = 64 * 1024
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large",
+               431: "Request Header Fields Too Large", 503: "Service Unavailable"}
+
+
+class RequestError(ValueError):
+    """Некорректный запрос: ответ status с текстом ошибки, соединение закрывается"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyWindow:
+    """Задержки последних N запросов для расчёта перцентилей"""
+
+    def __init__(self, size: int = 10000):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MicroBatcher:
+    """Собирает запросы в пакеты и считает их векторным путём"""
+
+    def __init__(self, model_key: str = DEFAULT_MODEL_KEY, max_batch: int = 64,
+                 max_wait_ms: float = 5.0, queue_size: int = 1024):
+        self.config, self.model = create_model(model_key)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: "asyncio.Queue[Tuple[Dict[str, float], asyncio.Future]]" = \
+            asyncio.Queue(maxsize=queue_size)
+        self.batches = 0
+        self.batched_items = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def submit(self, values: Dict[str, float]) -> "asyncio.Future":
+        """Ставит запрос в очередь; asyncio.QueueFull при перегрузке"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((values, future))
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batches += 1
+            self.batched_items += len(batch)
+            try:
+                results = await loop.run_in_executor(
+                    None, self._score, [values for values, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _score(self, batch: List[Dict[str, float]]) -> List[Dict[str, Any]]:
+        columns = {key: [values.get(key, 0) for values in batch] for key in BATCH_COLUMNS}
+        z_values = self.model.calculate_z_batch(columns)
+        p_values = self.model.calculate_probability_batch(columns)
+        results = []
+        for z, p in zip(z_values.tolist(), p_values.tolist()):
+            conclusion, risk_level = self.model.get_diagnosis(
+                p, self.config.threshold, self.config.high_risk, self.config.low_risk)
+            results.append({"z_value": z, "p_value": p,
+                            "risk_level": risk_level, "conclusion": conclusion})
+        return results
+
+
+class ScoringService:
+    """HTTP-обёртка над MicroBatcher"""
+
+    def __init__(self, model_key: str = DEFAULT_MODEL_KEY, max_batch: int = 64,
+                 max_wait_ms: float = 5.0, queue_size: int = 1024):
+        self._batcher_args = (model_key, max_batch, max_wait_ms, queue_size)
+        self.batcher: Optional[MicroBatcher] = None
+        self.latency = LatencyWindow()
+        self.counters = {"requests": 0, "scored": 0, "rejected": 0,
+                         "overloaded": 0, "errors": 0}
+
+    async def run(self, host: str = "127.0.0.1", port: int = 8080):
+        """Запускает сервис и обслуживает запросы до отмены"""
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        self.batcher = MicroBatcher(*self._batcher_args)
+        self.batcher.start()
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                status, payload = await self._dispatch(method, path, body)
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        except RequestError as e:
+            self._write_response(writer, e.status, {"error": str(e)}, False)
+        except ValueError as e:
+            self._write_response(writer, 400, {"error": str(e)}, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None
+            raise RequestError("Неполный заголовок запроса")
+        except asyncio.LimitOverrunError:
+            # Заголовок длиннее лимита StreamReader (64 КБ)
+            raise RequestError("Слишком длинный заголовок запроса", 431)
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise RequestError("Некорректная строка запроса")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise RequestError("Некорректный Content-Length")
+        if length < 0:
+            raise RequestError("Некорректный Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise RequestError("Слишком большой запрос", 413)
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            raise RequestError("Неполное тело запроса")
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = (connection == "keep-alive" if version == "HTTP/1.0"
+                      else connection != "close")
+        return method, path.split("?", 1)[0], body, keep_alive
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if path == "/metrics":
+            if method != "GET":
+                return 405, {"error": "Используйте GET"}
+            return 200, self.metrics()
+        if path != "/score":
+            return 404, {"error": "Не найдено"}
+        if method != "POST":
+            return 405, {"error": "Используйте POST"}
+
+        started = time.perf_counter()
+        self.counters["requests"] += 1
+        try:
+            data = json.loads(body or b"{}")
+            if not isinstance(data, dict):
+                raise ValueError("Ожидается JSON-объект")
+        except ValueError as e:
+            self.counters["rejected"] += 1
+            return 400, {"error": f"Некорректный JSON: {e}"}
+
+        raw_values = {key: None if data.get(key) is None else str(data[key])
+                      for _, key in self.batcher.config.fields}
+        values, errors = parse_inputs(raw_values)
+        if errors:
+            self.counters["rejected"] += 1
+            return 400, {"errors": errors}
+
+        try:
+            future = self.batcher.submit(values)
+        except asyncio.QueueFull:
+            self.counters["overloaded"] += 1
+            return 503, {"error": "Сервис перегружен, повторите запрос позже"}
+        try:
+            result = await future
+        except Exception as e:
+            self.counters["errors"] += 1
+            return 500, {"error": f"Ошибка расчёта: {e}"}
+
+        self.counters["scored"] += 1
+        self.latency.add(time.perf_counter() - started)
+        if "patient_id" in data:
+            result = {"patient_id": data["patient_id"], **result}
+        return 200, result
+
+    def metrics(self) -> Dict[str, Any]:
+        batcher = self.batcher
+        p50 = self.latency.percentile(0.50)
+        p99 = self.latency.percentile(0.99)
+        return {
+            **self.counters,
+            "queue_depth": batcher.queue.qsize(),
+            "batches": batcher.batches,
+            "mean_batch_size": (batcher.batched_items / batcher.batches
+                                if batcher.batches else 0.0),
+            "latency_ms": {
+                "p50": None if p50 is None else p50 * 1000.0,
+                "p99": None if p99 is None else p99 * 1000.0,
+            },
+        }
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int,
+                        payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Internal Server Error')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
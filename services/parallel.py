@@ -0,0 +1,190 @@
+"""
+Параллельный пакетный расчёт в пуле процессов или потоков.
+
+Входной поток режется на порции (chunk), каждая порция считается в
+рабочем процессе (MedicalModel создаётся один раз при его старте) или в
+потоке (одна MedicalModel на все потоки). Результаты возвращаются строго
+в порядке входных строк; число порций в работе ограничено, поэтому
+чтение файла не убегает вперёд расчёта.
+
+Пул потоков имеет смысл на сборке CPython без GIL (3.13t): там потоки
+считают параллельно без сериализации данных и запуска процессов.
+"""
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .batch import DEFAULT_MODEL_KEY, ScoredRow, create_model, score_rows
+
+BACKENDS = ("auto", "serial", "process", "thread")
+
+_worker_config = None
+_worker_model = None
+
+
+def _init_worker(model_key: str):
+    """Инициализация рабочего процесса: модель создаётся один раз"""
+    global _worker_config, _worker_model
+    _worker_config, _worker_model = create_model(model_key)
+
+
+def _score_chunk(chunk: List[Tuple[int, Dict[str, str]]]) -> Tuple[str, float, List[ScoredRow]]:
+    start = time.perf_counter()
+    results = list(score_rows(chunk, _worker_config, _worker_model))
+    return f"pid {os.getpid()}", time.perf_counter() - start, results
+
+
+def _score_chunk_shared(config, model,
+                        chunk: List[Tuple[int, Dict[str, str]]]) -> Tuple[str, float, List[ScoredRow]]:
+    start = time.perf_counter()
+    results = list(score_rows(chunk, config, model))
+    return threading.current_thread().name, time.perf_counter() - start, results
+
+
+def gil_enabled() -> bool:
+    """True, если интерпретатор работает с GIL (всегда True до 3.13)"""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def choose_backend(workers: int, backend: str = "auto") -> str:
+    """Выбирает способ выполнения: serial, process или thread"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный способ выполнения: {backend}")
+    if backend != "auto":
+        return backend
+    if workers <= 1:
+        return "serial"
+    return "process" if gil_enabled() else "thread"
+
+
+def check_pool_args(workers: Optional[int], chunk_size: int):
+    """Проверяет размеры пула и порции (0 порций молча дал бы пустой результат)"""
+    if workers is not None and workers < 1:
+        raise ValueError(f"Число рабочих должно быть не меньше 1: {workers}")
+    if chunk_size < 1:
+        raise ValueError(f"Размер порции должен быть не меньше 1: {chunk_size}")
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Режет поток на списки по size элементов"""
+    if size < 1:
+        raise ValueError(f"Размер порции должен быть не меньше 1: {size}")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ThroughputStats:
+    """Пропускная способность по рабочим (процессам или потокам)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.workers: Dict[object, Dict[str, float]] = {}
+
+    def record(self, worker: object, rows: int, seconds: float):
+        with self._lock:
+            entry = self.workers.setdefault(worker, {"rows": 0, "chunks": 0, "seconds": 0.0})
+            entry["rows"] += rows
+            entry["chunks"] += 1
+            entry["seconds"] += seconds
+
+    def report(self) -> List[Dict[str, float]]:
+        """Строки отчёта: рабочий, строк, порций, секунд, строк/с"""
+        with self._lock:
+            return [
+                {"worker": worker, **entry,
+                 "rows_per_second": entry["rows"] / entry["seconds"] if entry["seconds"] else 0.0}
+                for worker, entry in sorted(self.workers.items(), key=lambda item: str(item[0]))
+            ]
+
+    def format(self) -> str:
+        return "\n".join(
+            f"  {line['worker']}: {line['rows']} строк, {line['chunks']} порций, "
+            f"{line['rows_per_second']:.0f} строк/с"
+            for line in self.report()
+        )
+
+
+def score_parallel(rows: Iterable[Tuple[int, Dict[str, str]]],
+                   model_key: str = DEFAULT_MODEL_KEY,
+                   workers: Optional[int] = None,
+                   chunk_size: int = 1000,
+                   max_in_flight: Optional[int] = None,
+                   stats: Optional[ThroughputStats] = None) -> Iterator[ScoredRow]:
+    """Рассчитывает строки в пуле процессов, сохраняя порядок результатов"""
+    check_pool_args(workers, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    pool_factory = functools.partial(ProcessPoolExecutor, max_workers=workers,
+                                     initializer=_init_worker, initargs=(model_key,))
+    return _run_ordered(pool_factory, _score_chunk, rows, chunk_size,
+                        max_in_flight or workers * 2, stats)
+
+
+def score_threaded(rows: Iterable[Tuple[int, Dict[str, str]]],
+                   model_key: str = DEFAULT_MODEL_KEY,
+                   workers: Optional[int] = None,
+                   chunk_size: int = 1000,
+                   max_in_flight: Optional[int] = None,
+                   stats: Optional[ThroughputStats] = None) -> Iterator[ScoredRow]:
+    """Рассчитывает строки в пуле потоков с одной общей MedicalModel"""
+    check_pool_args(workers, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    config, model = create_model(model_key)
+    pool_factory = functools.partial(ThreadPoolExecutor, max_workers=workers,
+                                     thread_name_prefix="medpredict")
+    return _run_ordered(pool_factory, functools.partial(_score_chunk_shared, config, model),
+                        rows, chunk_size, max_in_flight or workers * 2, stats)
+
+
+def score_with_backend(rows: Iterable[Tuple[int, Dict[str, str]]],
+                       model_key: str = DEFAULT_MODEL_KEY,
+                       workers: int = 1,
+                       chunk_size: int = 1000,
+                       backend: str = "auto",
+                       stats: Optional[ThroughputStats] = None) -> Iterator[ScoredRow]:
+    """Рассчитывает строки выбранным (или автоматически определённым) способом"""
+    check_pool_args(workers, chunk_size)
+    backend = choose_backend(workers, backend)
+    if backend == "process":
+        return score_parallel(rows, model_key, workers, chunk_size, stats=stats)
+    if backend == "thread":
+        return score_threaded(rows, model_key, workers, chunk_size, stats=stats)
+    config, model = create_model(model_key)
+    return score_rows(rows, config, model)
+
+
+def _run_ordered(pool_factory: Callable[[], Executor], task, rows: Iterable,
+                 chunk_size: int, max_in_flight: int, stats: Optional[ThroughputStats]) -> Iterator[ScoredRow]:
+    # Пул создаётся при первом next(): генератор, который так и не начали
+    # перебирать, не оставляет незакрытых процессов и потоков
+    pool = pool_factory()
+    pending = deque()
+    try:
+        for chunk in chunked(rows, chunk_size):
+            pending.append(pool.submit(task, chunk))
+            while len(pending) >= max_in_flight:
+                yield from _take(pending.popleft(), stats)
+        while pending:
+            yield from _take(pending.popleft(), stats)
+    finally:
+        # shutdown(cancel_futures=True) есть только с Python 3.9
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def _take(future, stats: Optional[ThroughputStats]) -> List[ScoredRow]:
+    worker, seconds, results = future.result()
+    if stats is not None:
+        stats.record(worker, len(results), seconds)
+    return results
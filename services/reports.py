@@ -0,0 +1,284 @@
+"""
+Массовая выгрузка PDF-отчётов.
+
+Отчёты строятся в пуле процессов; каждый рабочий процесс при старте
+регистрирует шрифты и собирает шаблон отчёта (get_report_template), так
+что на один файл приходится только заполнение данных пациента и запись.
+Ошибка одного файла не прерывает выгрузку, а попадает в список отказов.
+Отчёты можно складывать прямо в zip-архив, без промежуточных файлов.
+"""
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from models.cohort_report import COHORT_TITLE, CohortEntry, CohortReportTemplate, CohortSummary
+from models.model_config import ModelConfig
+from models.pdf_exporter import ReportData, get_report_template
+
+from .batch import (DEFAULT_MODEL_KEY, ScoredRow, clean_row, create_model, format_errors,
+                    read_rows, score_rows)
+
+DEFAULT_NAME_TEMPLATE = "{patient_id}.pdf"
+_UNSAFE = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+@dataclass(frozen=True)
+class ReportJob:
+    """Один отчёт: куда писать и что"""
+    filename: str
+    report: ReportData
+
+
+@dataclass(frozen=True)
+class ExportFailure:
+    filename: str
+    error: str
+
+
+@dataclass
+class BulkExportResult:
+    written: int = 0
+    # Отчёты, которые не удалось построить или записать
+    failed: List[ExportFailure] = field(default_factory=list)
+    # Строки входного файла с ошибками ввода (отчёт не строился)
+    rejected: List[ExportFailure] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+# Вызывается после каждого файла: (готово, с ошибкой, имя файла, ошибка или None)
+ProgressCallback = Callable[[int, int, str, Optional[str]], None]
+
+
+def _init_worker():
+    """Инициализация рабочего процесса: шрифты и стили - один раз"""
+    get_report_template()
+
+
+def _render(job: ReportJob) -> Tuple[Optional[bytes], Optional[str]]:
+    """Пишет отчёт в файл; возвращает (None, ошибка или None)"""
+    try:
+        get_report_template().render(job.filename, job.report)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    return None, None
+
+
+def _render_bytes(job: ReportJob) -> Tuple[Optional[bytes], Optional[str]]:
+    """Строит отчёт в памяти; возвращает (PDF, ошибка или None)"""
+    try:
+        return get_report_template().to_bytes(job.report), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+class FileNamer:
+    """Имена файлов по шаблону ("{patient_id}_{risk_level}.pdf") без совпадений.
+
+    Без overwrite имя не совпадает и с файлами, уже лежащими в output_dir:
+    к нему добавляется номер (_2, _3, ...).
+    """
+
+    def __init__(self, output_dir: str, template: str = DEFAULT_NAME_TEMPLATE,
+                 overwrite: bool = False):
+        self.output_dir = output_dir
+        self.template = template
+        self.overwrite = overwrite
+        self._used: Set[str] = set()
+
+    def _taken(self, name: str) -> bool:
+        if name.lower() in self._used:
+            return True
+        return not self.overwrite and os.path.exists(os.path.join(self.output_dir, name))
+
+    def __call__(self, **fields) -> str:
+        safe = {key: _UNSAFE.sub("_", str(value)).strip() or "_" for key, value in fields.items()}
+        name = self.template.format(**safe)
+        stem, ext = os.path.splitext(name)
+        candidate = name
+        n = 1
+        while self._taken(candidate):
+            n += 1
+            candidate = f"{stem}_{n}{ext}"
+        self._used.add(candidate.lower())
+        return os.path.join(self.output_dir, candidate)
+
+
+def export_reports(jobs: Iterable[ReportJob], workers: Optional[int] = None,
+                   max_in_flight: Optional[int] = None,
+                   progress: Optional[ProgressCallback] = None,
+                   archive: Optional[zipfile.ZipFile] = None) -> BulkExportResult:
+    """Строит отчёты; при workers > 1 - в пуле процессов.
+
+    С archive отчёты пишутся прямо в zip-архив (job.filename - имя внутри
+    архива), минуя файлы на диске. Отчёт попадает в архив только целиком
+    построенным. Возвращает число записанных отчётов и список отказов.
+    """
+    workers = workers or os.cpu_count() or 1
+    result = BulkExportResult()
+    start = time.perf_counter()
+    render = _render if archive is None else _render_bytes
+
+    def record(job: ReportJob, data: Optional[bytes], error: Optional[str]):
+        if error is None and archive is not None:
+            try:
+                archive.writestr(zipfile.ZipInfo(job.filename, time.localtime()[:6]), data)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        if error is None:
+            result.written += 1
+        else:
+            result.failed.append(ExportFailure(job.filename, error))
+        if progress is not None:
+            progress(result.written, len(result.failed), job.filename, error)
+
+    if workers <= 1:
+        _init_worker()
+        for job in jobs:
+            record(job, *render(job))
+        result.seconds = time.perf_counter() - start
+        return result
+
+    max_in_flight = max_in_flight or workers * 4
+    pending: Dict[Future, ReportJob] = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for job in jobs:
+            pending[pool.submit(render, job)] = job
+            if len(pending) >= max_in_flight:
+                _collect(pending, record, FIRST_COMPLETED)
+        while pending:
+            _collect(pending, record, FIRST_COMPLETED)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _collect(pending: Dict[Future, ReportJob], record, return_when):
+    done, _ = wait(pending, return_when=return_when)
+    for future in done:
+        job = pending.pop(future)
+        try:
+            data, error = future.result()
+        except Exception as e:
+            # Например, рабочий процесс завершился аварийно
+            data, error = None, f"{type(e).__name__}: {e}"
+        record(job, data, error)
+
+
+def _report(scored: ScoredRow, config: ModelConfig, doctor_name: str) -> ReportData:
+    evaluation = scored.evaluation
+    values, _ = clean_row(scored.row, config)
+    input_values = {key: (label, values[key]) for label, key in config.fields}
+    return ReportData(config.name, doctor_name, input_values,
+                      evaluation.z_value, evaluation.p_value,
+                      evaluation.conclusion, config.z_formula)
+
+
+def _accepted(scored_rows: Iterable[ScoredRow],
+              rejects: Optional[List[ExportFailure]]) -> Iterator[ScoredRow]:
+    """Рассчитанные строки; строки с ошибками уходят в rejects"""
+    for scored in scored_rows:
+        if scored.evaluation is None:
+            if rejects is not None:
+                rejects.append(ExportFailure(f"строка {scored.line}",
+                                             format_errors(scored.errors)))
+            continue
+        yield scored
+
+
+def _patient_id(scored: ScoredRow) -> str:
+    return scored.row.get("patient_id") or f"line{scored.line}"
+
+
+def jobs_from_rows(scored_rows: Iterable[ScoredRow], config: ModelConfig, namer: FileNamer,
+                   doctor_name: str = "", rejects: Optional[List[ExportFailure]] = None
+                   ) -> Iterator[ReportJob]:
+    """Отчёты по рассчитанным строкам; строки с ошибками уходят в rejects.
+
+    {index} в имени - номер отчёта среди построенных, без пропусков на
+    отклонённых строках ({line} - номер строки входного файла).
+    """
+    for index, scored in enumerate(_accepted(scored_rows, rejects), 1):
+        filename = namer(index=index, line=scored.line, patient_id=_patient_id(scored),
+                         risk_level=scored.evaluation.risk_level)
+        yield ReportJob(filename, _report(scored, config, doctor_name))
+
+
+def cohort_entries(scored_rows: Iterable[ScoredRow], config: ModelConfig,
+                   doctor_name: str = "", rejects: Optional[List[ExportFailure]] = None
+                   ) -> Iterator[CohortEntry]:
+    """Пациенты сводного отчёта; строки с ошибками уходят в rejects"""
+    for scored in _accepted(scored_rows, rejects):
+        yield CohortEntry(_patient_id(scored), _report(scored, config, doctor_name),
+                          scored.evaluation.risk_level)
+
+
+def run_reports(input_path: str, output_dir: str,
+                name_template: str = DEFAULT_NAME_TEMPLATE,
+                model_key: str = DEFAULT_MODEL_KEY, doctor_name: str = "",
+                delimiter: Optional[str] = None, workers: Optional[int] = None,
+                progress: Optional[ProgressCallback] = None,
+                zip_path: Optional[str] = None, overwrite: bool = False) -> BulkExportResult:
+    """Рассчитывает файл пациентов и выгружает по PDF-отчёту на каждого.
+
+    С zip_path отчёты складываются в один zip-архив вместо каталога output_dir.
+    Существующие файлы не перезаписываются без overwrite: отчёты получают
+    свободные имена, а существующий архив - FileExistsError.
+    """
+    config, model = create_model(model_key)
+    archive = None
+    if zip_path is None:
+        os.makedirs(output_dir, exist_ok=True)
+        namer = FileNamer(output_dir, name_template, overwrite)
+    else:
+        # PDF уже сжат внутри, поэтому в архиве - без повторного сжатия
+        archive = zipfile.ZipFile(zip_path, "w" if overwrite else "x", zipfile.ZIP_STORED)
+        namer = FileNamer("", name_template)
+    rejects: List[ExportFailure] = []
+
+    if input_path == "-":
+        stream: TextIO = sys.stdin
+        filename = None
+    else:
+        stream = open(input_path, "r", encoding="utf-8-sig", newline="")
+        filename = input_path
+    try:
+        rows = read_rows(stream, delimiter, filename)
+        jobs = jobs_from_rows(score_rows(rows, config, model), config, namer,
+                              doctor_name, rejects)
+        result = export_reports(jobs, workers, progress=progress, archive=archive)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if archive is not None:
+            archive.close()
+    result.rejected = rejects
+    return result
+
+
+def run_cohort_report(input_path: str, output: str, model_key: str = DEFAULT_MODEL_KEY,
+                      doctor_name: str = "", delimiter: Optional[str] = None,
+                      title: str = COHORT_TITLE,
+                      rejects: Optional[List[ExportFailure]] = None) -> CohortSummary:
+    """Рассчитывает файл пациентов и строит один сводный PDF-отчёт.
+
+    Строки читаются, рассчитываются и выкладываются на страницы потоково.
+    """
+    config, model = create_model(model_key)
+    if input_path == "-":
+        stream: TextIO = sys.stdin
+        filename = None
+    else:
+        stream = open(input_path, "r", encoding="utf-8-sig", newline="")
+        filename = input_path
+    try:
+        rows = read_rows(stream, delimiter, filename)
+        entries = cohort_entries(score_rows(rows, config, model), config, doctor_name, rejects)
+        return CohortReportTemplate().render(output, entries, title=title,
+                                             doctor_name=doctor_name)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
@@ -0,0 +1,98 @@
+"""
+Сравнение запуска: загрузка всех шрифтов Roboto против загрузки по требованию.
+
+Каждый вариант запускается в отдельном процессе несколько раз; замеряются
+время загрузки шрифтов и прирост памяти (RSS) на ней, время от создания
+QApplication до показа главного окна и пиковый RSS процесса (Linux).
+Запуск: python tests/bench_startup.py [-n 5]
+"""
+import argparse
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+if "tests" in base_dir:
+    base_dir = os.path.dirname(base_dir)  # Поднимаемся на уровень выше
+font_dir = os.path.join(base_dir, 'assets', 'fonts')
+
+
+def load_all_fonts():
+    """Прежний вариант: все TTF папки и перебор всех семейств"""
+    from PyQt6.QtGui import QFontDatabase
+    for font_file in os.listdir(font_dir):
+        if font_file.endswith('.ttf') and 'Roboto' in font_file:
+            QFontDatabase.addApplicationFont(os.path.join(font_dir, font_file))
+    return [f for f in QFontDatabase.families() if 'roboto' in f.lower()]
+
+
+def load_startup_fonts():
+    from views.fonts import init_fonts
+    return init_fonts(font_dir)
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def child(mode: str):
+    """Один запуск; печатает время шрифтов и до показа окна (мс), прирост RSS
+    на шрифтах и пиковый RSS (МБ)"""
+    # Пути импорта как в MedicalApp; модули импортируются до замера,
+    # чтобы время шрифтов не включало импорт окна
+    for sub in ('', 'controllers', 'views', 'models'):
+        sys.path.insert(0, os.path.join(base_dir, sub))
+    from PyQt6.QtGui import QFont
+    from PyQt6.QtWidgets import QApplication
+    from views.main_window import MainWindow
+    from controllers.main_controller import MainController
+
+    started = time.perf_counter()
+    app = QApplication(sys.argv[:1])
+    rss_before = rss_mb()
+    fonts_started = time.perf_counter()
+    families = load_all_fonts() if mode == "eager" else load_startup_fonts()
+    app.setFont(QFont("Roboto" if "Roboto" in families else "Segoe UI", 10))
+    fonts_ms = (time.perf_counter() - fonts_started) * 1000
+    fonts_rss = rss_mb() - rss_before
+
+    window = MainWindow()
+    controller = MainController(window, app)
+    window.show()
+    app.processEvents()
+    total_ms = (time.perf_counter() - started) * 1000
+    del controller
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{fonts_ms:.1f} {total_ms:.1f} {fonts_rss:.2f} {peak_rss:.1f}")
+
+
+def run(mode: str, repeats: int):
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, __file__, "--child", mode], env=env,
+                             capture_output=True, text=True, check=True).stdout
+        # Вывод загрузчика шрифтов идёт раньше, замер - последняя строка
+        samples.append([float(x) for x in out.strip().splitlines()[-1].split()])
+    fonts, total, fonts_rss, rss = (statistics.median(column) for column in zip(*samples))
+    print(f"{mode:>6}: шрифты {fonts:6.1f} мс (+{fonts_rss:.2f} МБ), "
+          f"до показа окна {total:6.1f} мс, пиковый RSS {rss:6.1f} МБ (медиана из {repeats})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=5, help="запусков на вариант")
+    parser.add_argument("--child", choices=["eager", "lazy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+    else:
+        print(f"Папка шрифтов: {font_dir}")
+        for mode in ("eager", "lazy"):
+            run(mode, args.n)
@@ -0,0 +1,138 @@
+"""
+Сверка табличной оценки биомаркеров с исходными цепочками условий.
+
+Таблицы точек излома (models/scoring.py) должны давать те же оценки z,
+уровни риска и статусы, что и прежние if/elif по порогам, включая NaN и
+бесконечности; векторный расчёт - совпадать со скалярным побитово.
+Нечисловые значения ("nan", "inf") не должны проходить parse_inputs.
+Запуск: python tests/check_scoring.py
+"""
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+if "tests" in base_dir:
+    base_dir = os.path.dirname(base_dir)  # Поднимаемся на уровень выше
+sys.path.insert(0, base_dir)
+
+from models.medical_model import EndometriosisModel  # noqa: E402
+from models.validation import parse_inputs  # noqa: E402
+
+SPECIAL = (math.nan, math.inf, -math.inf)
+
+
+def reference_score(x, low, high, top):
+    """Оценка z как в прежнем calculate_z"""
+    if x > high:
+        return top
+    elif x > low:
+        return 0.1 + (top - 0.1) * ((x - low) / (high - low))
+    else:
+        return 0.1
+
+
+def reference_risk(x, low, high):
+    """Уровень риска как в прежнем get_biomarker_risk_level"""
+    if x <= low:
+        return 0.1
+    elif x >= high:
+        return 0.9
+    else:
+        return 0.1 + 0.8 * ((x - low) / (high - low))
+
+
+def reference_status(x, first, second, labels):
+    """Статус как в прежнем get_biomarker_status"""
+    return labels[0] if x <= first else labels[1] if x <= second else labels[2]
+
+
+def same(a, b) -> bool:
+    return a == b or (math.isnan(a) and math.isnan(b))
+
+
+def check_tables(model: EndometriosisModel, rng: random.Random) -> int:
+    m = model
+    references = {
+        "tyrosine": ((m.TYROSINE_NORMAL_MAX, m.TYROSINE_THRESHOLD, 3.0),
+                     (m.TYROSINE_NORMAL_MAX, m.TYROSINE_THRESHOLD),
+                     (m.TYROSINE_NORMAL_MAX, m.TYROSINE_THRESHOLD)),
+        "arginine": ((m.ARGININE_NORMAL_MAX, m.ARGININE_THRESHOLD, 2.5),
+                     (m.ARGININE_NORMAL_MAX, m.ARGININE_THRESHOLD),
+                     (m.ARGININE_NORMAL_MAX, m.ARGININE_THRESHOLD)),
+        "no_level": ((m.NO_THRESHOLD, m.NO_DISEASE, 2.0),
+                     (m.NO_HEALTHY_MAX, m.NO_DISEASE),
+                     (m.NO_HEALTHY_MAX, m.NO_THRESHOLD)),
+    }
+    mismatches = 0
+    for spec in m.biomarkers:
+        score_args, risk_args, status_args = references[spec.key]
+        points = [round(rng.uniform(0, 250), 1) for _ in range(5000)]
+        points += [*score_args[:2], *risk_args, *status_args, *SPECIAL]
+        scores = spec.score.evaluate(points)
+        risks = spec.risk.evaluate(points)
+        for i, x in enumerate(points):
+            expected = (reference_score(x, *score_args), reference_risk(x, *risk_args))
+            actual = (spec.score(x), spec.risk(x))
+            batch = (float(scores[i]), float(risks[i]))
+            status = spec.status(x)
+            expected_status = reference_status(x, *status_args, spec.status.labels)
+            if (not all(map(same, expected, actual)) or not all(map(same, actual, batch))
+                    or status != expected_status):
+                mismatches += 1
+                print(f"✗ {spec.key}={x}: ожидалось {expected} {expected_status}, "
+                      f"получено {actual} {batch} {status}")
+    return mismatches
+
+
+def check_batch(model: EndometriosisModel, rng: random.Random) -> int:
+    rows = []
+    for n in range(5000):
+        row = {"age": rng.choice([17, 18, 30, 45, 46]),
+               "tyrosine": round(rng.uniform(60, 120), 1),
+               "arginine": round(rng.uniform(100, 170), 1),
+               "no_level": round(rng.uniform(5, 90), 1),
+               "chronic_pain": rng.randint(0, 1), "dysmenorrhea": rng.randint(0, 1),
+               "infertility": rng.randint(0, 1)}
+        if n % 10 == 0:
+            row[rng.choice(["tyrosine", "arginine", "no_level"])] = rng.choice(SPECIAL)
+        rows.append(row)
+    columns = {key: [row[key] for row in rows] for key in rows[0]}
+    with contextlib.redirect_stdout(io.StringIO()):
+        z = np.array([model.calculate_z(row) for row in rows])
+        p = np.array([model.calculate_probability(row) for row in rows])
+    mismatches = 0
+    for name, scalar, batch in (("z", z, model.calculate_z_batch(columns)),
+                                ("p", p, model.calculate_probability_batch(columns))):
+        differ = ~((scalar == batch) | (np.isnan(scalar) & np.isnan(batch)))
+        if differ.any():
+            mismatches += int(differ.sum())
+            i = int(np.argmax(differ))
+            print(f"✗ {name}: скаляр {scalar[i]} != пакет {batch[i]} для {rows[i]}")
+    return mismatches
+
+
+def check_parse() -> int:
+    values, errors = parse_inputs({"a": "nan", "b": "-inf", "c": "Infinity", "d": "92,4"})
+    if values != {"d": 92.4} or set(errors) != {"a", "b", "c"}:
+        print(f"✗ parse_inputs: {values} {errors}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    model = EndometriosisModel()
+    results = {
+        "таблицы против цепочек условий": check_tables(model, rng),
+        "скалярный и векторный расчёт": check_batch(model, rng),
+        "отклонение nan/inf при разборе": check_parse(),
+    }
+    for name, mismatches in results.items():
+        print(f"{'✓' if not mismatches else '✗'} {name}: расхождений {mismatches}")
+    sys.exit(1 if any(results.values()) else 0)
@@ -0,0 +1,97 @@
+"""
+Загрузка шрифтов Roboto в QFontDatabase.
+
+При запуске регистрируются только начертания, на которые ссылается
+STYLESHEET (обычное, 500, 600, жирное и курсив); остальные файлы папки
+(Light, Black, Condensed, SemiCondensed и т.д.) загружаются через
+load_font, когда нужны: сейчас - если начертаний для запуска в папке нет
+(load_fallback_font). Разбор каждого TTF стоит времени и памяти, а нужны
+из 54 файлов только пять.
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+
+from PyQt6.QtGui import QFontDatabase
+
+FAMILY = "Roboto"
+# Начертания, которые использует STYLESHEET (и PDF-отчёт: Regular и Bold)
+STARTUP_FACES = ("Roboto-Regular", "Roboto-Medium", "Roboto-SemiBold",
+                 "Roboto-Bold", "Roboto-Italic")
+
+
+class FontLoader:
+    """Регистрирует TTF-файлы папки по имени начертания (имя файла без .ttf)"""
+
+    def __init__(self, font_dir: str):
+        self.font_dir = font_dir
+        self._lock = threading.Lock()
+        # Начертание -> семейства; пустой список - файл не загрузился
+        self._loaded: Dict[str, List[str]] = {}
+
+    def available(self) -> List[str]:
+        """Начертания в папке (загруженные и нет)"""
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.font_dir)
+                      if name.endswith('.ttf'))
+
+    def load_font(self, face: str) -> List[str]:
+        """Загружает начертание при первом обращении; возвращает его семейства"""
+        families = self._loaded.get(face)
+        if families is None:
+            with self._lock:
+                families = self._loaded.get(face)
+                if families is None:
+                    families = self._loaded[face] = self._add(face)
+        return families
+
+    def _add(self, face: str) -> List[str]:
+        path = os.path.join(self.font_dir, face + '.ttf')
+        if not os.path.exists(path):
+            print(f"⚠ Шрифт не найден: {path}")
+            return []
+        font_id = QFontDatabase.addApplicationFont(path)
+        if font_id == -1:
+            print(f"⚠ Шрифт не загружен: {path}")
+            return []
+        families = QFontDatabase.applicationFontFamilies(font_id)
+        print(f"Загружен: {face}.ttf -> {families}")
+        return families
+
+    def load_startup_fonts(self) -> List[str]:
+        """Загружает начертания STARTUP_FACES; возвращает найденные семейства"""
+        families: List[str] = []
+        for face in STARTUP_FACES:
+            for family in self.load_font(face):
+                if family not in families:
+                    families.append(family)
+        return families
+
+
+_loader: Optional[FontLoader] = None
+
+
+def init_fonts(font_dir: str) -> List[str]:
+    """Создаёт загрузчик процесса и загружает начертания для запуска"""
+    global _loader
+    _loader = FontLoader(font_dir)
+    return _loader.load_startup_fonts()
+
+
+def load_font(face: str) -> List[str]:
+    """Загружает начертание (например, 'Roboto_Condensed-Bold') по требованию"""
+    if _loader is None:
+        return []
+    return _loader.load_font(face)
+
+
+def load_fallback_font() -> List[str]:
+    """Загружает первое доступное начертание Roboto вне STARTUP_FACES
+    (когда ни одно из них не загрузилось); возвращает его семейства"""
+    if _loader is None:
+        return []
+    for face in _loader.available():
+        if face.startswith(FAMILY) and face not in STARTUP_FACES:
+            families = load_font(face)
+            if families:
+                return families
+    return []
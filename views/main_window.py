@@ -1,7 +1,8 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QLineEdit, QPushButton, QComboBox,
                              QFrame, QScrollArea, QMessageBox, QFileDialog,
-                             QSpacerItem, QSizePolicy, QGridLayout)
+                             QSpacerItem, QSizePolicy, QGridLayout, QTextBrowser,
+                             QDockWidget)
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from widgets import (Card, ModernLineEdit, AnimatedButton,
                      ResultCard, clear_layout)
@@ -14,6 +15,10 @@ class MainWindow(QMainWindow):
     calculate_requested = pyqtSignal()
     clear_requested = pyqtSignal()
     export_requested = pyqtSignal()
+    cancel_export_requested = pyqtSignal()
+    doctor_name_changed = pyqtSignal(str)
+
+    EXPORT_TEXT = "📄 Экспорт в PDF"
 
     def __init__(self):
         super().__init__()
@@ -34,6 +39,11 @@ class MainWindow(QMainWindow):
         self.z_card = None
         self.p_card = None
         self.conclusion_label = None
+        self.report_preview = None
+        self.preview_dock = None
+
+        self.export_btn = None
+        self.cancel_export_btn = None
 
         self.init_ui()
 
@@ -46,6 +56,7 @@ class MainWindow(QMainWindow):
 
         self.create_header(main_layout)
         self.create_grid_content(main_layout)
+        self.create_preview_dock()
 
     def create_header(self, parent_layout):
         header = QFrame()
@@ -138,6 +149,9 @@ class MainWindow(QMainWindow):
         self.doctor_name_entry = ModernLineEdit()
         self.doctor_name_entry.setPlaceholderText("Введите ФИО врача")
         self.doctor_name_entry.setMinimumHeight(50)
+        self.doctor_name_entry.textChanged.connect(
+            lambda text: self.doctor_name_changed.emit(text.strip())
+        )
         doctor_layout.addWidget(self.doctor_name_entry)
 
         doctor_layout.addStretch()
@@ -191,10 +205,26 @@ class MainWindow(QMainWindow):
         first_row.addWidget(clear_btn)
         button_layout.addLayout(first_row)
 
-        export_btn = AnimatedButton("📄 Экспорт в PDF")
-        export_btn.setObjectName("exportButton")
-        export_btn.clicked.connect(lambda: self.export_requested.emit())
-        button_layout.addWidget(export_btn)
+        export_row = QHBoxLayout()
+        export_row.setSpacing(15)
+
+        self.export_btn = AnimatedButton(self.EXPORT_TEXT)
+        self.export_btn.setObjectName("exportButton")
+        self.export_btn.clicked.connect(lambda: self.export_requested.emit())
+        export_row.addWidget(self.export_btn, 1)
+
+        preview_btn = AnimatedButton("👁 Предпросмотр")
+        preview_btn.clicked.connect(
+            lambda: self.preview_dock.setVisible(not self.preview_dock.isVisible())
+        )
+        export_row.addWidget(preview_btn)
+
+        # Видна только во время экспорта
+        self.cancel_export_btn = AnimatedButton("✖ Отменить")
+        self.cancel_export_btn.clicked.connect(lambda: self.cancel_export_requested.emit())
+        self.cancel_export_btn.setVisible(False)
+        export_row.addWidget(self.cancel_export_btn)
+        button_layout.addLayout(export_row)
 
         return button_widget
 
@@ -236,12 +266,25 @@ class MainWindow(QMainWindow):
 
         return card
 
+    def create_preview_dock(self):
+        """Панель предпросмотра отчёта (HTML); PDF строится только при экспорте"""
+        self.report_preview = QTextBrowser()
+        self.report_preview.setObjectName("reportPreview")
+        self.report_preview.setOpenLinks(False)
+
+        self.preview_dock = QDockWidget("📄 Предпросмотр отчёта", self)
+        self.preview_dock.setObjectName("previewDock")
+        self.preview_dock.setWidget(self.report_preview)
+        self.preview_dock.setMinimumWidth(420)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.preview_dock)
+        self.preview_dock.hide()
+
     # === Data & UI helpers ===
 
     def set_model_options(self, models):
         self.model_combo.clear()
-        for key, config in models.items():
-            self.model_combo.addItem(config.name, key)
+        for key, name in models.items():
+            self.model_combo.addItem(name, key)
 
     def set_model_description(self, text):
         self.description_label.setText(f" {text}")
@@ -321,7 +364,15 @@ class MainWindow(QMainWindow):
             f"color: {text_color}; font-size: 17px; font-weight: 600;"
         )
 
+    def set_report_preview(self, html: str):
+        # Сохраняем прокрутку: превью перерисовывается при каждом вводе ФИО
+        bar = self.report_preview.verticalScrollBar()
+        position = bar.value()
+        self.report_preview.setHtml(html)
+        bar.setValue(position)
+
     def clear_results(self):
+        self.report_preview.clear()
         self.z_card.set_value("-", "#4a90e2")
         self.p_card.set_value("-", "#4a90e2")
         self.conclusion_label.setText("-")
@@ -337,6 +388,15 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.information(self, title, text)
 
+    def set_export_progress(self, percent: int):
+        """Показывает ход экспорта на кнопке; percent < 0 - экспорт завершён"""
+        if percent < 0:
+            self.export_btn.setText(self.EXPORT_TEXT)
+            self.cancel_export_btn.setVisible(False)
+        else:
+            self.export_btn.setText(f"⏳ Экспорт в PDF… {percent}%")
+            self.cancel_export_btn.setVisible(True)
+
     def ask_save_filename(self) -> str:
         from datetime import datetime
         default_name = f"Результаты_диагностики_{datetime.now():%Y-%m-%d_%H-%M-%S}.pdf"
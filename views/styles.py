@@ -351,6 +351,13 @@ QRadioButton::indicator:checked {
     background-color: rgba(139, 92, 246, 0.1) !important;
 }
 
+/* Предпросмотр отчёта - как лист бумаги */
+#reportPreview {
+    background-color: #ffffff !important;
+    color: #2c3e50 !important;
+    border-radius: 8px !important;
+}
+
 /* Результаты */
 #resultValue {
     color: #8b5cf6 !important;